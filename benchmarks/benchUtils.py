@@ -0,0 +1,73 @@
+import json
+import statistics
+import threading
+import time
+
+import requests
+from flask import Flask
+
+
+# Shared helpers for the benchmark scripts in this folder.
+# GitHub is simulated in-process: every request sleeps `latency` seconds and is counted.
+
+
+def make_response(status: int = 200, body=None, headers: dict | None = None, url: str = "") -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode("utf-8") if body is not None else b""
+    response.headers.update(headers or {})
+    response.headers.setdefault("Content-Type", "application/json")
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+
+class SimulatedGithubPool:
+    """
+    Drop-in replacement for GithubService.http_pool.
+    `handler(method, url, kwargs)` returns a requests.Response.
+    """
+
+    def __init__(self, handler, latency: float = 0.05):
+        self.handler = handler
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        with self._lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.handler(method, url, kwargs)
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    def getStats(self) -> dict:
+        return {"requests": self.request_count}
+
+    def close(self):
+        pass
+
+
+def bench_app_context():
+    """GithubService logs through flask.current_app."""
+    return Flask("commitary-bench").app_context()
+
+
+def measure(fn, repeat: int = 3) -> dict:
+    """Runs fn `repeat` times and returns wall-clock statistics in milliseconds."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(timings), "min_ms": min(timings), "result": result}
+
+
+def print_table(headers: list, rows: list):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
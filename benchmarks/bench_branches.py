@@ -0,0 +1,73 @@
+"""
+Branch listing benchmark: former REST N+1 path versus the paginated GraphQL refs query.
+
+    python -m benchmarks.bench_branches [--latency 0.05]
+
+Prints upstream request count and wall-clock latency per branch count.
+"""
+import argparse
+from datetime import datetime
+
+from benchmarks.benchUtils import SimulatedGithubPool, bench_app_context, make_response, measure, print_table
+from commitary_backend.dto.gitServiceDTO import BranchDTO
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+
+OWNER, REPO = "bench-owner", "bench-repo"
+COMMIT_DATE = "2025-09-15T09:00:00Z"
+
+
+def branch_handler(branch_count: int):
+    names = sorted(f"feature/{i:04d}" for i in range(branch_count))
+
+    def handler(method, url, kwargs):
+        if url.endswith("/graphql"):
+            variables = kwargs["json"]["variables"]
+            start = int(variables["cursor"] or 0)
+            page = names[start:start + 100]
+            return make_response(200, {"data": {"repository": {"refs": {
+                "pageInfo": {"hasNextPage": start + 100 < len(names), "endCursor": str(start + 100)},
+                "nodes": [{"name": n, "target": {"oid": f"sha-{n}", "committedDate": COMMIT_DATE,
+                                                 "author": {"date": COMMIT_DATE}}} for n in page],
+            }}}})
+        if url.endswith(f"/repos/{OWNER}/{REPO}/branches"):
+            return make_response(200, [{"name": n, "commit": {"sha": f"sha-{n}"}} for n in names])
+        if f"/repos/{OWNER}/{REPO}/commits/" in url:
+            return make_response(200, {"commit": {"author": {"date": COMMIT_DATE}}})
+        return make_response(404, {"message": "Not Found"})
+
+    return handler
+
+
+def legacy_list_branches(service: GithubService, token: str):
+    """The REST implementation replaced by GithubService._list_branches."""
+    branch_list = []
+    for branch in service._make_request("GET", f"/repos/{OWNER}/{REPO}/branches", token):
+        commit_data = service._make_request("GET", f"/repos/{OWNER}/{REPO}/commits/{branch['commit']['sha']}", token)
+        branch_list.append(BranchDTO(
+            repo_id=0, repo_name=REPO, owner_name=OWNER, branch_name=branch['name'],
+            last_modification=datetime.fromisoformat(commit_data['commit']['author']['date'].replace('Z', '+00:00'))
+        ))
+    return branch_list
+
+
+def run(latency: float, branch_counts: list):
+    rows = []
+    with bench_app_context():
+        for count in branch_counts:
+            row = [count]
+            for path in (legacy_list_branches, lambda s, t: s._list_branches(t, OWNER, REPO, repo_id=0)):
+                service = GithubService()
+                service.http_pool = SimulatedGithubPool(branch_handler(count), latency=latency)
+                stats = measure(lambda: path(service, "bench-token"), repeat=1)
+                assert len(stats["result"]) == count
+                row += [service.http_pool.request_count, f"{stats['median_ms']:.0f}"]
+            rows.append(row)
+    print_table(["branches", "rest_requests", "rest_ms", "graphql_requests", "graphql_ms"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per GitHub round trip")
+    parser.add_argument("--branches", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+    run(args.latency, args.branches)
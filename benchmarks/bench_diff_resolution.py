@@ -0,0 +1,108 @@
+"""
+getDiffByIdTime3 SHA resolution benchmark.
+
+Former path : getSingleRepoByID -> getCommitMsgs2 (resolves the repo again) -> /commits/{oldest} -> /compare
+Current path: getSingleRepoByID -> one GraphQL history query with parents(first: 1) -> /compare
+
+    python -m benchmarks.bench_diff_resolution [--latency 0.05]
+
+Caches are disabled for both paths so every run is cold.
+"""
+import argparse
+from datetime import datetime, timezone
+
+from benchmarks.benchUtils import SimulatedGithubPool, bench_app_context, make_response, measure, print_table
+from commitary_backend.commitaryUtils.ttlCache import TTLCache
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+from commitary_backend.services.githubService.compareCache import CompareCache
+
+OWNER, REPO, REPO_ID, BRANCH = "bench-owner", "bench-repo", 1, "main"
+DATETIME_FROM = datetime(2025, 9, 15, tzinfo=timezone.utc)
+DATETIME_TO = datetime(2025, 9, 16, tzinfo=timezone.utc)
+
+REPO_JSON = {
+    "id": REPO_ID, "node_id": "R_1", "name": REPO, "owner": {"id": 1, "login": OWNER},
+    "html_url": f"https://github.com/{OWNER}/{REPO}", "url": f"https://api.github.com/repos/{OWNER}/{REPO}",
+    "full_name": f"{OWNER}/{REPO}", "description": None,
+}
+
+
+def sha(i: int) -> str:
+    return f"{i:040x}"
+
+
+def diff_handler(commit_count: int):
+    # Commit i has parent i+1, index 0 is the newest commit of the range.
+    def node(i):
+        return {"oid": sha(i), "message": f"commit {i}", "committedDate": "2025-09-15T12:00:00Z",
+                "author": {"name": "dev", "email": "dev@example.com", "user": None},
+                "associatedPullRequests": {"nodes": []},
+                "parents": {"nodes": [{"oid": sha(i + 1)}]}}
+
+    def handler(method, url, kwargs):
+        if url.endswith(f"/repositories/{REPO_ID}"):
+            return make_response(200, REPO_JSON)
+        if url.endswith("/graphql"):
+            variables = kwargs["json"]["variables"]
+            start = int(variables["cursor"] or 0)
+            end = min(start + variables["first"], commit_count)
+            return make_response(200, {"data": {"repository": {"ref": {"target": {"history": {
+                "pageInfo": {"hasNextPage": end < commit_count, "endCursor": str(end)},
+                "nodes": [node(i) for i in range(start, end)]}}}}}})
+        if "/commits/" in url:
+            i = int(url.rsplit("/", 1)[1], 16)
+            return make_response(200, {"sha": sha(i), "parents": [{"sha": sha(i + 1)}]})
+        if "/compare/" in url:
+            return make_response(200, {"base_commit": {"sha": sha(commit_count)}, "merge_base_commit": {"sha": sha(commit_count)},
+                                       "files": [{"filename": "app.py", "status": "modified", "additions": 1,
+                                                  "deletions": 1, "changes": 2, "patch": "@@ -1 +1 @@"}]})
+        return make_response(404, {"message": "Not Found"})
+
+    return handler
+
+
+def legacy_getDiffByIdTime3(service: GithubService, token: str):
+    """The resolution sequence used before the single-query path."""
+    repo_dto = service.getSingleRepoByID(token, REPO_ID)
+    commits = service.getCommitMsgs2(REPO_ID, token, BRANCH, DATETIME_FROM.isoformat(), DATETIME_TO.isoformat()).commitList
+    sha_after, oldest = commits[0].sha, commits[-1].sha
+    commit_details = service._make_request("GET", f"/repos/{OWNER}/{REPO}/commits/{oldest}", token)
+    sha_before = commit_details["parents"][0]["sha"]
+    return service.getDiffBySHA(None, token, repo_dto.github_owner_login, repo_dto.github_name, sha_before, sha_after)
+
+
+def current_getDiffByIdTime3(service: GithubService, token: str):
+    return service.getDiffByIdTime3(token, REPO_ID, BRANCH, DATETIME_FROM, DATETIME_TO)
+
+
+def cold_service(commit_count: int, latency: float) -> GithubService:
+    service = GithubService()
+    service.repo_cache = TTLCache(ttl=0)
+    service.compare_cache = CompareCache(root="")
+    service.http_pool = SimulatedGithubPool(diff_handler(commit_count), latency=latency)
+    return service
+
+
+def run(latency: float, commit_counts: list, repeat: int):
+    rows = []
+    with bench_app_context():
+        for count in commit_counts:
+            row = [count]
+            results = []
+            for path in (legacy_getDiffByIdTime3, current_getDiffByIdTime3):
+                service = cold_service(count, latency)
+                stats = measure(lambda: path(service, "bench-token"), repeat=repeat)
+                results.append(stats["result"])
+                row += [service.http_pool.request_count // repeat, f"{stats['median_ms']:.0f}"]
+            assert results[0].commit_before_sha == results[1].commit_before_sha
+            rows.append(row)
+    print_table(["commits", "former_requests", "former_ms", "current_requests", "current_ms"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per GitHub round trip")
+    parser.add_argument("--commits", type=int, nargs="+", default=[5, 50, 250])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.latency, args.commits, args.repeat)
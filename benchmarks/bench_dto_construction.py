@@ -0,0 +1,69 @@
+"""
+DTO construction and response serialization micro-benchmark.
+
+    python -m benchmarks.bench_dto_construction [--commits 10000] [--files 2000]
+
+Builds CommitMDDTOs (GraphQL history nodes) and PatchFileDTOs (/compare files) with validation, as the
+service does, and with model_construct() (no validation). Then serializes the lists the way the routes
+used to (model_dump + jsonify) and do now (model_dump_json). Prints microseconds per object.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from flask import jsonify
+
+from benchmarks.benchUtils import bench_app_context, measure, print_table
+from commitary_backend.commitaryUtils.dtoResponse import dto_response
+from commitary_backend.dto.gitServiceDTO import CommitListDTO, CommitMDDTO, DiffDTO, PatchFileDTO
+
+OWNER, REPO = "bench-owner", "bench-repo"
+
+
+def commit_fields(count: int) -> list:
+    start = datetime(2025, 9, 1, tzinfo=timezone.utc)
+    return [dict(sha=f"{i:040x}", repo_name=REPO, repo_id=1, owner_name=OWNER, branch_sha="main",
+                 author_github_id=1000 + i % 7, author_name="bench-dev", author_email="dev@example.com",
+                 commit_datetime=start + timedelta(minutes=i), commit_msg=f"Commit number {i}\n\nWith a body line.")
+            for i in range(count)]
+
+
+def file_fields(count: int) -> list:
+    patch = "@@ -1,3 +1,3 @@\n context\n-old line\n+new line\n context"
+    return [dict(filename=f"src/pkg_{i // 50}/module_{i}.py", status="modified",
+                 additions=1, deletions=1, changes=2, patch=patch) for i in range(count)]
+
+
+def run(commit_count: int, file_count: int, repeat: int):
+    commits = commit_fields(commit_count)
+    files = file_fields(file_count)
+    rows = []
+    for label, build_commit, build_file in (
+        ("build (validated)", lambda f: CommitMDDTO(**f), lambda f: PatchFileDTO(**f)),
+        ("build (model_construct)", lambda f: CommitMDDTO.model_construct(**f), lambda f: PatchFileDTO.model_construct(**f)),
+    ):
+        commit_stats = measure(lambda: [build_commit(f) for f in commits], repeat)
+        file_stats = measure(lambda: [build_file(f) for f in files], repeat)
+        rows.append([label, f"{commit_stats['median_ms'] * 1000 / commit_count:.2f}",
+                     f"{file_stats['median_ms'] * 1000 / file_count:.2f}"])
+
+    commit_list = CommitListDTO(commitList=[CommitMDDTO(**f) for f in commits])
+    diff = DiffDTO(repo_name=REPO, repo_id=1, owner_name=OWNER, branch_before="main", branch_after="main",
+                   commit_before_sha="a" * 40, commit_after_sha="b" * 40, files=[PatchFileDTO(**f) for f in files])
+    with bench_app_context().app.test_request_context():
+        for label, serialize in (("serialize (model_dump + jsonify)", lambda dto: jsonify(dto.model_dump()).get_data()),
+                                 ("serialize (model_dump_json)", lambda dto: dto_response(dto).get_data())):
+            commit_stats = measure(lambda: serialize(commit_list), repeat)
+            file_stats = measure(lambda: serialize(diff), repeat)
+            rows.append([label, f"{commit_stats['median_ms'] * 1000 / commit_count:.2f}",
+                         f"{file_stats['median_ms'] * 1000 / file_count:.2f}"])
+
+    print_table(["path", f"us/commit ({commit_count})", f"us/file ({file_count})"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.commits, args.files, args.repeat)
@@ -0,0 +1,72 @@
+"""
+JSON codec benchmark: the previous path (requests' response.json() / Flask's default provider) versus jsonCodec.
+
+    python -m benchmarks.bench_json_codec [--files 2000] [--commits 100]
+
+Parses a /compare response with `files` patched files and a GraphQL history page of `commits` nodes,
+then encodes a commit list (datetimes included) with jsonify. Prints milliseconds per document.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.benchUtils import make_response, measure, print_table
+from commitary_backend.commitaryUtils import jsonCodec
+from commitary_backend.commitaryUtils.jsonCodec import FastJSONProvider
+
+
+def compare_payload(file_count: int) -> dict:
+    patch = "\n".join(["@@ -1,40 +1,40 @@"] + [f"-old line {i} with some code();" for i in range(20)]
+                      + [f"+new line {i} with some code();" for i in range(20)])
+    commit = {"sha": "a" * 40, "commit": {"message": "Change", "author": {"name": "dev", "date": "2025-09-01T10:00:00Z"}}}
+    return {"base_commit": commit, "merge_base_commit": commit, "total_commits": 1, "commits": [commit],
+            "files": [{"sha": f"{i:040x}", "filename": f"src/module_{i}.py", "status": "modified", "additions": 20,
+                       "deletions": 20, "changes": 40, "patch": patch} for i in range(file_count)]}
+
+
+def history_payload(commit_count: int) -> dict:
+    nodes = [{"oid": f"{i:040x}", "message": f"Commit {i}\n\nBody text.", "committedDate": "2025-09-01T10:00:00Z",
+              "author": {"name": "dev", "email": "dev@example.com", "user": {"databaseId": 1, "login": "dev"}},
+              "associatedPullRequests": {"nodes": []}} for i in range(commit_count)]
+    return {"data": {"repository": {"ref": {"target": {"history": {
+        "pageInfo": {"hasNextPage": True, "endCursor": "c"}, "nodes": nodes}}}}}}
+
+
+def commit_list(count: int) -> dict:
+    start = datetime(2025, 9, 1, tzinfo=timezone.utc)
+    return {"commitList": [{"sha": f"{i:040x}", "repo_name": "r", "repo_id": 1, "owner_name": "o", "branch_sha": "main",
+                            "commit_msg": f"Commit {i}", "author_github_id": 1, "author_name": "dev",
+                            "author_email": "dev@example.com", "commit_datetime": start + timedelta(minutes=i)}
+                           for i in range(count)]}
+
+
+def run(file_count: int, commit_count: int, repeat: int):
+    rows = []
+    for name, payload in (("parse /compare", compare_payload(file_count)), ("parse GraphQL history", history_payload(commit_count))):
+        response = make_response(200, payload)
+        size_kb = len(response.content) / 1024
+        before = measure(lambda: response.json(), repeat)
+        after = measure(lambda: jsonCodec.loads(response.content), repeat)
+        rows.append([f"{name} ({size_kb:.0f} KiB)", f"{before['median_ms']:.2f}", f"{after['median_ms']:.2f}"])
+
+    document = commit_list(commit_count * 10)
+    timings = []
+    for provider in (DefaultJSONProvider, FastJSONProvider):
+        app = Flask("commitary-bench")
+        app.json = provider(app)
+        with app.test_request_context():
+            timings.append(measure(lambda: jsonify(document).get_data(), repeat))
+    rows.append([f"jsonify {commit_count * 10} commits", f"{timings[0]['median_ms']:.2f}", f"{timings[1]['median_ms']:.2f}"])
+
+    print_table(["document", "previous_ms", f"{jsonCodec.CODEC}_ms"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="files in the /compare response")
+    parser.add_argument("--commits", type=int, default=100, help="nodes in the GraphQL history page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.files, args.commits, args.repeat)
@@ -0,0 +1,116 @@
+"""
+End-to-end route benchmark against the offline fake GitHub (benchmarks/fakeGithubServer.py).
+
+    python -m benchmarks.bench_routes [--commits 500] [--branches 20] [--files 200] [--latency 0.05] [--repeat 20]
+
+Drives the Flask routes through the test client with the real service stack. For every route it
+prints the first (cold) call, p50/p95 of the following calls, and the upstream GitHub requests of
+the cold call and of all warm calls together.
+
+create_app() needs DATABASE_URL, FLASK_SECRET_KEY, GITHUB_CLIENT_ID and GITHUB_CLIENT_SECRET
+(any values for the last three). /createInsight also needs the repository registered in the
+database and an OpenAI key, so it only runs with --with-insight --commitary-id <id>.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from benchmarks.benchUtils import print_table
+from benchmarks.fakeGithubServer import FakeGithubServer, SyntheticRepo
+
+TOKEN = "bench-token"
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def route_cases(repo: SyntheticRepo, commitary_id: int | None) -> list:
+    """(name, method, path, query) of every benchmarked route."""
+    main_commits = repo.history(repo.branches["main"])
+    newest, oldest = main_commits[0]["date"], main_commits[-1]["date"]
+    day_from = (newest - (newest - oldest) / 4).isoformat()
+    day_to = newest.isoformat()
+    feature = sorted(name for name in repo.branches if name != "main")
+    cases = [
+        ("/branches", "GET", "/branches", {"repo_id": repo.repo_id}),
+        ("/githubCommits2", "GET", "/githubCommits2",
+         {"repo_id": repo.repo_id, "branch_name": "main", "datetime_from": day_from, "datetime_to": day_to}),
+        ("/diff (same branch)", "GET", "/diff",
+         {"repo_id": repo.repo_id, "branch_from": "main", "branch_to": "main", "datetime_from": day_from, "datetime_to": day_to}),
+    ]
+    if feature:
+        cases.append(("/diff (cross branch)", "GET", "/diff",
+                      {"repo_id": repo.repo_id, "branch_from": feature[-1], "branch_to": "main",
+                       "datetime_from": day_from, "datetime_to": day_to}))
+    if commitary_id is not None:
+        cases.append(("/createInsight", "POST", "/createInsight",
+                      {"repo_id": repo.repo_id, "commitary_id": commitary_id, "branch": "main", "date_from": day_from}))
+    return cases
+
+
+def run(args) -> list:
+    repo = SyntheticRepo(commits=args.commits, branches=args.branches, files=args.files)
+    server = FakeGithubServer([repo], latency=args.latency, jitter=args.jitter).start()
+    # The service singletons read the API URL at import time.
+    os.environ["GITHUB_API_URL"] = server.url
+    from commitary_backend.app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    rows = []
+    try:
+        for name, method, path, query in route_cases(repo, args.commitary_id if args.with_insight else None):
+            query = dict(query, token=TOKEN)
+            timings = []
+            cold_requests = 0
+            server.reset_counts()
+            for i in range(args.repeat + 1):
+                start = time.perf_counter()
+                response = client.open(path, method=method, query_string=query)
+                elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code >= 400 and response.status_code != 409:  # 409: insight already exists
+                    raise RuntimeError(f"{name} answered {response.status_code}: {response.get_data(as_text=True)[:200]}")
+                if i == 0:
+                    cold_ms, cold_requests = elapsed, server.total()
+                else:
+                    timings.append(elapsed)
+            upstream = server.counts()
+            rows.append({
+                "route": name,
+                "cold_ms": round(cold_ms, 1),
+                "p50_ms": round(statistics.median(timings), 1) if timings else None,
+                "p95_ms": round(percentile(timings, 0.95), 1) if timings else None,
+                "cold_upstream": cold_requests,
+                "warm_upstream": sum(upstream.values()) - cold_requests,
+                "endpoints": upstream,
+            })
+    finally:
+        server.stop()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, default=500)
+    parser.add_argument("--branches", type=int, default=20)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake GitHub request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per request, at most")
+    parser.add_argument("--repeat", type=int, default=20, help="warm calls per route after the cold one")
+    parser.add_argument("--with-insight", action="store_true", help="also benchmark /createInsight (DB + OpenAI)")
+    parser.add_argument("--commitary-id", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the per-endpoint upstream counts as JSON too")
+    args = parser.parse_args()
+    if args.with_insight and args.commitary_id is None:
+        parser.error("--with-insight needs --commitary-id")
+
+    results = run(args)
+    print_table(["route", "cold_ms", "p50_ms", "p95_ms", "cold_upstream", "warm_upstream"],
+                [[r[h] for h in ("route", "cold_ms", "p50_ms", "p95_ms", "cold_upstream", "warm_upstream")] for r in results])
+    if args.json:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,403 @@
+"""
+Offline stand-in for the GitHub REST + GraphQL API.
+
+Serves synthetic repositories over real HTTP, so the whole client stack (session pool, ETags,
+rate limit scheduler, retries) is exercised. Point the service at it with
+
+    GITHUB_API_URL=<server.url>   (GraphQL is served at <server.url>/graphql)
+
+    python -m benchmarks.fakeGithubServer --commits 500 --branches 20 --files 200 --latency 0.05
+
+Every request sleeps `latency` (+ up to `jitter`) seconds and is counted per endpoint
+("GET /repos/:owner/:repo/commits", "POST /graphql GetCommitHistory" ...).
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+from commitary_backend.services.githubService.resilience import endpoint_key
+
+
+def _sha(*parts) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class SyntheticRepo:
+    """
+    A repository with a linear `main` history and feature branches forked from it.
+
+    Commit i of main (0 = root) is dated `start + i * interval` and rewrites one file.
+    Feature branch j forks from main at an evenly spread commit and adds `branch_commits` commits.
+    """
+
+    def __init__(self, owner: str = "bench-owner", name: str = "bench-repo", repo_id: int = 1,
+                 commits: int = 200, branches: int = 5, files: int = 50, branch_commits: int = 3,
+                 start: datetime = datetime(2025, 9, 1, tzinfo=timezone.utc), interval: timedelta = timedelta(hours=1)):
+        self.owner, self.name, self.repo_id = owner, name, repo_id
+        self.commits: Dict[str, dict] = {}
+        self.blobs: Dict[str, str] = {}
+        self.branches: Dict[str, str] = {}
+
+        tree = {}
+        for f in range(files):
+            tree[f"src/module_{f:04d}.py"] = self._blob(f"# module {f}\nVALUE = 0\n")
+        parent = None
+        main_shas = []
+        for i in range(commits):
+            path = f"src/module_{i % files:04d}.py"
+            tree = dict(tree, **{path: self._blob(f"# module {i % files}\nVALUE = {i}\n")})
+            parent = self._commit(f"main:{i}", [parent] if parent else [], start + i * interval, f"Update {path} ({i})", tree)
+            main_shas.append(parent)
+        self.branches["main"] = parent
+
+        for j in range(branches):
+            fork = main_shas[(j * len(main_shas)) // max(branches, 1)]
+            sha, branch_tree = fork, self.commits[fork]["tree"]
+            for k in range(branch_commits):
+                path = f"feature_{j:03d}/file_{k}.py"
+                branch_tree = dict(branch_tree, **{path: self._blob(f"# feature {j} step {k}\n")})
+                date = self.commits[fork]["date"] + (k + 1) * interval / (branch_commits + 1)
+                sha = self._commit(f"feature:{j}:{k}", [sha], date, f"Feature {j} step {k}", branch_tree)
+            self.branches[f"feature/{j:03d}"] = sha
+
+    def _blob(self, text: str) -> str:
+        sha = _sha("blob", text)
+        self.blobs[sha] = text
+        return sha
+
+    def _commit(self, key: str, parents: List[str], date: datetime, message: str, tree: dict) -> str:
+        sha = _sha(self.owner, self.name, key)
+        self.commits[sha] = {"sha": sha, "parents": parents, "date": date, "message": message, "tree": tree}
+        return sha
+
+    # ----- queries
+
+    def resolve(self, revision: str) -> Optional[str]:
+        revision = revision[len("refs/heads/"):] if revision.startswith("refs/heads/") else revision
+        if revision in self.branches:
+            return self.branches[revision]
+        return revision if revision in self.commits else None
+
+    def history(self, head: str, since: datetime | None = None, until: datetime | None = None) -> List[dict]:
+        """First-parent history of `head`, newest first, filtered by commit date."""
+        result = []
+        sha = head
+        while sha:
+            commit = self.commits[sha]
+            if (since is None or commit["date"] >= since) and (until is None or commit["date"] <= until):
+                result.append(commit)
+            sha = commit["parents"][0] if commit["parents"] else None
+        return result
+
+    def ancestors(self, sha: str) -> set:
+        return {commit["sha"] for commit in self.history(sha)}
+
+    def tree_diff(self, base: str, head: str) -> List[dict]:
+        old, new = self.commits[base]["tree"], self.commits[head]["tree"]
+        files = []
+        for path in sorted(set(old) | set(new)):
+            if old.get(path) == new.get(path):
+                continue
+            before = self.blobs[old[path]].splitlines() if path in old else []
+            after = self.blobs[new[path]].splitlines() if path in new else []
+            status = "added" if path not in old else "removed" if path not in new else "modified"
+            patch = [f"@@ -1,{len(before)} +1,{len(after)} @@"] + [f"-{l}" for l in before] + [f"+{l}" for l in after]
+            files.append({"sha": new.get(path) or old[path], "filename": path, "status": status,
+                          "additions": len(after), "deletions": len(before), "changes": len(after) + len(before),
+                          "patch": "\n".join(patch)})
+        return files
+
+    def rest_json(self) -> dict:
+        return {
+            "id": self.repo_id, "node_id": f"R_{self.repo_id}", "name": self.name,
+            "full_name": f"{self.owner}/{self.name}", "description": None,
+            "owner": {"id": self.repo_id, "login": self.owner},
+            "html_url": f"https://github.com/{self.owner}/{self.name}",
+            "url": f"https://api.github.com/repos/{self.owner}/{self.name}",
+            "created_at": "2025-01-01T00:00:00Z", "updated_at": "2025-09-01T00:00:00Z", "pushed_at": "2025-09-01T00:00:00Z",
+        }
+
+    def rest_commit(self, commit: dict, with_files: bool = False) -> dict:
+        data = {
+            "sha": commit["sha"],
+            "parents": [{"sha": p} for p in commit["parents"]],
+            "author": {"id": 1000, "login": "bench-dev"},
+            "commit": {"message": commit["message"],
+                       "author": {"name": "Bench Dev", "email": "dev@example.com", "date": _iso(commit["date"])},
+                       "committer": {"name": "Bench Dev", "email": "dev@example.com", "date": _iso(commit["date"])}},
+        }
+        if with_files:
+            parent = commit["parents"][0] if commit["parents"] else None
+            data["files"] = self.tree_diff(parent, commit["sha"]) if parent else []
+        return data
+
+    def graphql_commit(self, commit: dict) -> dict:
+        # Superset of every selection set the service asks for; clients ignore the rest.
+        return {
+            "oid": commit["sha"], "message": commit["message"], "committedDate": _iso(commit["date"]),
+            "author": {"name": "Bench Dev", "email": "dev@example.com", "date": _iso(commit["date"]),
+                       "user": {"databaseId": 1000, "login": "bench-dev"}},
+            "associatedPullRequests": {"nodes": []},
+            "parents": {"nodes": [{"oid": p} for p in commit["parents"]]},
+        }
+
+
+class FakeGithubServer:
+    """
+    Threaded WSGI server answering the GitHub endpoints used by GithubService and AsyncGithubService.
+    """
+
+    RATE_LIMIT_HEADERS = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999",
+                          "X-RateLimit-Used": "1", "X-RateLimit-Reset": "9999999999"}
+
+    def __init__(self, repos: List[SyntheticRepo], latency: float = 0.0, jitter: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.repos = {(r.owner.lower(), r.name.lower()): r for r in repos}
+        self.repos_by_id = {r.repo_id: r for r in repos}
+        self.latency = latency
+        self.jitter = jitter
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = make_server(host, port, self.wsgi_app, threaded=True)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._server.host}:{self._server.port}"
+
+    def start(self) -> "FakeGithubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-github", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self._counts.clear()
+
+    # ----- dispatch
+
+    def wsgi_app(self, environ, start_response):
+        request = Request(environ)
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        try:
+            if request.path == "/graphql" and request.method == "POST":
+                response = self.graphql(request)
+            else:
+                self._count(endpoint_key(request.method, request.path))
+                response = self.rest(request)
+        except KeyError as e:
+            response = self._json({"message": f"Not Found: {e}"}, 404)
+        response.headers.update(self.RATE_LIMIT_HEADERS)
+        return response(environ, start_response)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    @staticmethod
+    def _json(body, status: int = 200, headers: dict | None = None) -> Response:
+        return Response(json.dumps(body), status=status, headers=headers or {}, mimetype="application/json")
+
+    def _repo(self, owner: str, name: str) -> SyntheticRepo:
+        return self.repos[(owner.lower(), name.lower())]
+
+    # ----- REST
+
+    def rest(self, request: Request) -> Response:
+        path = request.path
+        if path == "/user":
+            return self._json({"id": 1000, "login": "bench-dev", "avatar_url": None, "url": None, "html_url": None})
+        match = re.fullmatch(r"/repositories/(\d+)", path)
+        if match:
+            return self._json(self.repos_by_id[int(match.group(1))].rest_json())
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)(/.*)?", path)
+        if not match:
+            raise KeyError(path)
+        repo = self._repo(match.group(1), match.group(2))
+        rest = match.group(3) or ""
+        args = request.args
+
+        if rest == "":
+            return self._json(repo.rest_json())
+        if rest == "/branches":
+            return self._json([{"name": name, "commit": {"sha": sha}} for name, sha in sorted(repo.branches.items())])
+        if rest == "/commits":
+            head = repo.resolve(args.get("sha", "main"))
+            if head is None:
+                raise KeyError(args.get("sha"))
+            commits = repo.history(head, _parse(args.get("since")), _parse(args.get("until")))
+            return self._paged(request, [repo.rest_commit(c) for c in commits])
+        match = re.fullmatch(r"/commits/([^/]+)", rest)
+        if match:
+            sha = repo.resolve(match.group(1))
+            if sha is None:
+                raise KeyError(match.group(1))
+            return self._json(repo.rest_commit(repo.commits[sha], with_files=True))
+        match = re.fullmatch(r"/compare/(.+)\.\.\.(.+)", rest)
+        if match:
+            return self._compare(request, repo, match.group(1), match.group(2))
+        match = re.fullmatch(r"/git/trees/(.+)", rest)
+        if match:
+            sha = repo.resolve(match.group(1))
+            tree = repo.commits[sha]["tree"]
+            return self._json({"sha": sha, "truncated": False, "tree": [
+                {"path": p, "type": "blob", "mode": "100644", "sha": b, "size": len(repo.blobs[b].encode("utf-8"))}
+                for p, b in sorted(tree.items())]})
+        match = re.fullmatch(r"/tarball/(.+)", rest)
+        if match:
+            return self._tarball(repo, repo.resolve(match.group(1)))
+        raise KeyError(path)
+
+    def _paged(self, request: Request, items: list) -> Response:
+        per_page = int(request.args.get("per_page", 30))
+        page = int(request.args.get("page", 1))
+        chunk = items[(page - 1) * per_page: page * per_page]
+        headers = {}
+        if page * per_page < len(items):
+            query = dict(request.args, page=str(page + 1))
+            next_url = f"{request.host_url.rstrip('/')}{request.path}?" + "&".join(f"{k}={v}" for k, v in query.items())
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return self._json(chunk, headers=headers)
+
+    def _compare(self, request: Request, repo: SyntheticRepo, base_rev: str, head_rev: str) -> Response:
+        base, head = repo.resolve(base_rev), repo.resolve(head_rev)
+        if base is None or head is None:
+            raise KeyError(base_rev if base is None else head_rev)
+        base_ancestors = repo.ancestors(base)
+        range_commits = []
+        merge_base = None
+        for commit in repo.history(head):
+            if commit["sha"] in base_ancestors:
+                merge_base = commit["sha"]
+                break
+            range_commits.append(commit)
+        range_commits.reverse()
+        per_page = int(request.args.get("per_page", 250))
+        page = int(request.args.get("page", 1))
+        files = repo.tree_diff(merge_base, head) if merge_base else []
+        return self._json({
+            "base_commit": repo.rest_commit(repo.commits[base]),
+            "merge_base_commit": repo.rest_commit(repo.commits[merge_base]) if merge_base else None,
+            "total_commits": len(range_commits),
+            "commits": [repo.rest_commit(c) for c in range_commits[(page - 1) * per_page: page * per_page]],
+            "files": files[:300],
+        })
+
+    def _tarball(self, repo: SyntheticRepo, sha: str) -> Response:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for path, blob in sorted(repo.commits[sha]["tree"].items()):
+                data = repo.blobs[blob].encode("utf-8")
+                info = tarfile.TarInfo(f"{repo.owner}-{repo.name}-{sha[:7]}/{path}")
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        return Response(buffer.getvalue(), mimetype="application/x-gzip")
+
+    # ----- GraphQL
+
+    def graphql(self, request: Request) -> Response:
+        payload = json.loads(request.get_data() or b"{}")
+        match = re.search(r"query\s+(\w+)", payload.get("query", ""))
+        operation = match.group(1) if match else "anonymous"
+        self._count(f"POST /graphql {operation}")
+        variables = payload.get("variables") or {}
+        handler = getattr(self, f"_gql_{operation}", None)
+        if handler is None:
+            return self._json({"errors": [{"message": f"Unsupported operation {operation}"}]})
+        repo = self._repo(variables["owner"], variables.get("repo") or variables.get("name"))
+        return self._json({"data": {"repository": handler(repo, variables)}})
+
+    @staticmethod
+    def _page(items: list, cursor: str | None, first: int):
+        start = int(cursor or 0)
+        end = start + first
+        return items[start:end], {"hasNextPage": end < len(items), "endCursor": str(end)}
+
+    def _gql_GetBranchRefs(self, repo: SyntheticRepo, variables: dict) -> dict:
+        names = sorted(repo.branches)
+        page, page_info = self._page(names, variables.get("cursor"), 100)
+        nodes = []
+        for name in page:
+            commit = repo.commits[repo.branches[name]]
+            nodes.append({"name": name, "target": {"oid": commit["sha"], "committedDate": _iso(commit["date"]),
+                                                   "author": {"date": _iso(commit["date"])}}})
+        return {"refs": {"pageInfo": page_info, "nodes": nodes}}
+
+    def _gql_GetCommitHistory(self, repo: SyntheticRepo, variables: dict) -> dict:
+        head = repo.resolve(variables["branch"])
+        if head is None:
+            return {"ref": None}
+        commits = repo.history(head, _parse(variables.get("since")), _parse(variables.get("until")))
+        page, page_info = self._page(commits, variables.get("cursor"), variables.get("first") or 100)
+        return {"ref": {"target": {"history": {"pageInfo": page_info, "nodes": [repo.graphql_commit(c) for c in page]}}}}
+
+    def _gql_GetMergedPullRequests(self, repo: SyntheticRepo, variables: dict) -> dict:
+        # Synthetic repos have no pull requests: branch merges resolve through the commit scan.
+        return {"pullRequests": {"pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": []}}
+
+    def _gql_GetBlobTexts(self, repo: SyntheticRepo, variables: dict) -> dict:
+        result = {}
+        for key, sha in variables.items():
+            if re.fullmatch(r"o\d+", key):
+                text = repo.blobs.get(sha)
+                result[f"b{key[1:]}"] = {"isBinary": False, "text": text} if text is not None else None
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--commits", type=int, default=200)
+    parser.add_argument("--branches", type=int, default=5)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+    repo = SyntheticRepo(commits=args.commits, branches=args.branches, files=args.files)
+    server = FakeGithubServer([repo], latency=args.latency, jitter=args.jitter, port=args.port)
+    print(f"Fake GitHub for {repo.owner}/{repo.name} (id {repo.repo_id}) at {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
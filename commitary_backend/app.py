@@ -1,17 +1,24 @@
 import os
+import hmac
 from urllib.parse import urlparse
 import requests
 import json
 from datetime import datetime, timedelta, timezone
 from commitary_backend.dto.UserDTO import UserInfoDTO
-from flask import Flask, jsonify, request, redirect, url_for, session, render_template
+from flask import Flask, jsonify, request, redirect, url_for, session, render_template, g
 from dotenv import load_dotenv
 from psycopg2 import pool
 
 from commitary_backend.services.githubService.GithubServiceObject import gb_service
+from commitary_backend.services.githubService.AsyncGithubServiceObject import async_gb_service
+from commitary_backend.services.githubService.resilience import operation_deadline
 from commitary_backend.dto.gitServiceDTO import BranchListDTO, CommitListDTO, DiffDTO, RepoDTO, RepoListDTO, UserGBInfoDTO
 from commitary_backend.dto.insightDTO import DailyInsightListDTO, InsightItemDTO, DailyInsightDTO
 from commitary_backend.services.insightService.InsightServiceObject import insight_service
+from commitary_backend.services.webhookService.WebhookServiceObject import webhook_service
+from commitary_backend.commitaryUtils.dtoResponse import dto_response, ndjson_response
+from commitary_backend.commitaryUtils.jsonCodec import FastJSONProvider
+from commitary_backend.commitaryUtils import jsonCodec as json_codec
 
 import traceback
 import psycopg2
@@ -61,6 +68,8 @@ def create_app():
     """
     
     app = Flask(__name__)
+    # jsonify / request.get_json through orjson (stdlib fallback). Datetimes are ISO 8601.
+    app.json = FastJSONProvider(app)
     from flask.logging import default_handler
     
     # Logging added
@@ -91,7 +100,21 @@ def create_app():
     # --- GitHub API Constants ---
     GITHUB_AUTH_URL = "https://github.com/login/oauth/authorize"
     GITHUB_TOKEN_URL = "https://github.com/login/oauth/access_token"
-    GITHUB_API_URL = "https://api.github.com"
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+    # Every request gets one time budget for all of its GitHub calls, retries included.
+    GITHUB_OPERATION_DEADLINE = float(os.getenv("GITHUB_OPERATION_DEADLINE", "60"))
+
+    @app.before_request
+    def startGithubDeadline():
+        g.github_deadline = operation_deadline(GITHUB_OPERATION_DEADLINE)
+        g.github_deadline.__enter__()
+
+    @app.teardown_request
+    def endGithubDeadline(exc):
+        deadline = g.pop("github_deadline", None)
+        if deadline is not None:
+            deadline.__exit__(None, None, None)
 
 
     @app.route("/user",methods=['GET'])
@@ -188,8 +211,7 @@ def create_app():
 
 
         commits_dto:CommitListDTO =  gb_service.getCommitMsgs(repo_id=repo_id,token=user_token,branch=branch,startdatetime=startdatetime,enddatetime=enddatetime)
-        commits_dict:dict = commits_dto.model_dump()
-        return jsonify(commits_dict)
+        return dto_response(commits_dto)
     @app.route("/githubCommits2")
     def getCommits2():
 
@@ -201,9 +223,13 @@ def create_app():
         repo_id = request.args.get('repo_id')
 
 
+        # format=ndjson: a header line, then one commit per line as history pages arrive.
+        if request.args.get('format') == 'ndjson':
+            header = {"repo_id": repo_id, "branch_name": branch, "datetime_from": startdatetime, "datetime_to": enddatetime}
+            return ndjson_response(header, gb_service.iterCommitMsgs2(repo_id=repo_id,token=user_token,branch=branch,startdatetime=startdatetime,enddatetime=enddatetime))
+
         commits_dto:CommitListDTO =  gb_service.getCommitMsgs2(repo_id=repo_id,token=user_token,branch=branch,startdatetime=startdatetime,enddatetime=enddatetime)
-        commits_dict:dict = commits_dto.model_dump()
-        return jsonify(commits_dict)
+        return dto_response(commits_dto)
 
     @app.route("/registerRepo",methods=['POST'])
     @with_db_connection
@@ -357,9 +383,8 @@ def create_app():
         user_token = request.args.get('token')
 
         branchListDTO: BranchListDTO = gb_service.getBranchesByRepoId(user=None,token=user_token,repo_id =repo_id)
-        branch_dict = branchListDTO.model_dump()
         #returns List of branches.  
-        return jsonify(branch_dict)
+        return dto_response(branchListDTO)
     
 
 
@@ -401,6 +426,20 @@ def create_app():
 
         
         
+        # format=ndjson: the DiffDTO header (without files) on the first line, then one file patch per line.
+        if request.args.get('format') == 'ndjson':
+            if branch_to==branch_from:
+                streamed = gb_service.iterDiffByIdTime3(user_token=user_token, repo_id=repo_id, branch=branch_to,
+                                                        datetime_from=datetime_from, datetime_to=datetime_to)
+            else:
+                streamed = gb_service.iterDiffByIdTime2(user_token=user_token, repo_id=repo_id, branch_from=branch_from,
+                                                        branch_to=branch_to, datetime_from=datetime_from, datetime_to=datetime_to,
+                                                        default_merged_branch=default_branch)
+            if not streamed:
+                return "Failed to get the diff. See server logs for details.", 500
+            header, files = streamed
+            return ndjson_response(header.model_dump(mode="json", exclude={"files"}), files)
+
         # Call the core logic function with all the arguments, including the default_branch
         diff_dto:DiffDTO = None
         if branch_to==branch_from:
@@ -427,19 +466,41 @@ def create_app():
             default_merged_branch=default_branch
         )
 
-        # Pydantic's .model_dump() will automatically convert
-        # Python datetime objects into ISO 8601 strings
+        # Serialized by pydantic straight to JSON bytes (no intermediate dict).
 
         if diff_dto:
-            diff_dict = diff_dto.model_dump()
-
             # Debug Line
             # app.logger.debug(diff_dto.model_dump_json())
-            return jsonify(diff_dict)
+            return dto_response(diff_dto)
 
         else:
             return "Failed to get the diff. See server logs for details.", 500
 
+    @app.route("/branchDiffs", methods=['GET'])
+    def getBranchDiffs():
+        """
+        getDiffByIdTime3 of several branches of one repository (comma separated `branches`),
+        fetched concurrently by the async client. Returns {branch: DiffDTO or null}.
+        """
+        repo_id = request.args.get('repo_id')
+        user_token = request.args.get('token')
+        branches = [b for b in request.args.get('branches', '').split(',') if b]
+        datetime_from_str = request.args.get('datetime_from')
+        datetime_to_str = request.args.get('datetime_to')
+
+        if not all([repo_id, user_token, branches, datetime_from_str, datetime_to_str]):
+            return "Missing one or more required parameters.", 400
+        try:
+            repo_id = int(repo_id)
+            datetime_from = datetime.fromisoformat(datetime_from_str.replace('Z', '+00:00'))
+            datetime_to = datetime.fromisoformat(datetime_to_str.replace('Z', '+00:00'))
+        except (ValueError, TypeError) as e:
+            app.logger.debug(f"Invalid parameter type or format. Error: {e}")
+            return "Invalid parameter type or format. Datetime must be in ISO format and repo_id must be an integer.", 400
+
+        diffs = async_gb_service.run_sync(async_gb_service.gatherDiffsByBranches, user_token, repo_id, branches,
+                                          datetime_from, datetime_to)
+        return jsonify({branch: diff.model_dump(mode="json") if diff else None for branch, diff in diffs.items()})
 
 
 
@@ -524,6 +585,64 @@ def create_app():
         return jsonify(insight_list_dto.model_dump())
 
 
+    # Operator secret for /githubStats. Without it the counters are only served by debug builds.
+    GITHUB_STATS_SECRET = os.getenv("GITHUB_STATS_SECRET", "")
+
+    @app.route('/githubStats',methods=['GET'])
+    def getGithubStats():
+        """
+        Runtime counters of the GitHub service layers for this worker process.
+        They name token fingerprints and repositories, so the caller must send GITHUB_STATS_SECRET
+        in the X-Stats-Secret header.
+        """
+        if not GITHUB_STATS_SECRET:
+            if not app.debug:
+                return jsonify({"error": "Not found"}), 404
+        elif not hmac.compare_digest(request.headers.get('X-Stats-Secret', '').encode("utf-8"), GITHUB_STATS_SECRET.encode("utf-8")):
+            return jsonify({"error": "Invalid stats secret"}), 401
+        stats = gb_service.getServiceStats()
+        stats["async_client"] = async_gb_service.getStats()
+        stats["webhooks"] = webhook_service.getStats()
+        return jsonify(stats)
+
+    @app.route('/githubRateLimit',methods=['GET'])
+    def getGithubRateLimit():
+        """
+        Last known GitHub quota (core / graphql ...) of a token and its request queue state.
+        """
+        user_token = request.args.get('token')
+        if not user_token:
+            return jsonify({"error": "Missing token parameter"}), 400
+        return jsonify(gb_service.getRateLimitState(user_token))
+
+    @app.route('/webhooks/github',methods=['POST'])
+    def postGithubWebhook():
+        """
+        GitHub webhook receiver (push, create, delete, pull_request).
+        Verifies the signature, queues the delivery and answers before it is processed.
+        """
+        if not webhook_service.secret:
+            return jsonify({"error": "Webhook secret is not configured"}), 503
+        body = request.get_data()
+        if not webhook_service.verify(body, request.headers.get('X-Hub-Signature-256')):
+            return jsonify({"error": "Invalid signature"}), 401
+
+        event = request.headers.get('X-GitHub-Event', '')
+        delivery_id = request.headers.get('X-GitHub-Delivery')
+        if event == 'ping':
+            return jsonify({"status": "pong"}), 200
+        if not delivery_id:
+            return jsonify({"error": "Missing X-GitHub-Delivery header"}), 400
+        try:
+            payload = json_codec.loads(body)
+        except ValueError:
+            return jsonify({"error": "Invalid JSON payload"}), 400
+
+        status = webhook_service.enqueue(event, delivery_id, payload)
+        http_status = {"queued": 202, "busy": 503}.get(status, 200)
+        return jsonify({"status": status}), http_status
+
+
     return app
     
 
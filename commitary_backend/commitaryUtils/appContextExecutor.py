@@ -0,0 +1,37 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from flask import current_app, has_app_context
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def run_concurrently(fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> Iterator[R]:
+    """
+    Runs fn(item) for every item on a thread pool of `max_workers` threads and yields
+    the results as they complete (not in input order).
+
+    Service code logs through flask.current_app, so the caller's application context
+    is pushed in every worker thread. Context variables of the caller (e.g. the GitHub
+    request priority) are copied into every call.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def call(item):
+        if app is None:
+            return fn(item)
+        with app.app_context():
+            return fn(item)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, TypeVar
+
+from flask import current_app, has_app_context
+
+T = TypeVar("T")
+
+
+class AsyncBridge:
+    """
+    Runs coroutines from synchronous code (Flask routes, worker threads) on one
+    event loop living in a background daemon thread.
+
+    Keeping a single long-lived loop lets async clients (httpx.AsyncClient) keep their
+    connections open between calls. The caller's application context is pushed
+    in the coroutine, so service code can keep logging through flask.current_app.
+    The loop is restarted in a forked child process.
+    """
+
+    def __init__(self, name: str = "commitary-async"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pid = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                thread.start()
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            return self._loop
+
+    def run(self, coroutine_fn: Callable[..., Awaitable[T]], *args: Any, timeout: float | None = None, **kwargs: Any) -> T:
+        """
+        Calls `coroutine_fn(*args, **kwargs)` on the bridge loop and blocks until it returns.
+        Must not be called from the bridge loop itself.
+        """
+        loop = self._ensure_loop()
+        app = current_app._get_current_object() if has_app_context() else None
+
+        async def call():
+            if app is None:
+                return await coroutine_fn(*args, **kwargs)
+            with app.app_context():
+                return await coroutine_fn(*args, **kwargs)
+
+        future = asyncio.run_coroutine_threadsafe(call(), loop)
+        return future.result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = self._thread = self._pid = None
@@ -0,0 +1,152 @@
+import os
+import tempfile
+import threading
+import zlib
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is only serialised inside one process.
+    fcntl = None
+
+
+class DiskLRUStore:
+    '''
+    Compressed key -> bytes store on the local disk, shared by every worker process.
+
+    - Keys are hex digests (e.g. a git blob SHA). Files live in <root>/<key[:2]>/<key[2:]>.z
+    - Writes go to a temp file in the same directory and are published with os.replace,
+      so concurrent readers see either nothing or a complete file.
+    - Reads bump the file mtime. When the store grows past `max_bytes`, the least recently
+      used files are deleted under an exclusive lock file until it is back to 90% of the cap.
+    '''
+
+    def __init__(self, root: str, max_bytes: int, compress_level: int = 6):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _path(self, key: str) -> str:
+        key = key.lower()
+        if len(key) < 3 or any(c not in "0123456789abcdef" for c in key):
+            raise ValueError(f"DiskLRUStore keys must be hex digests, got {key!r}")
+        return os.path.join(self.root, key[:2], f"{key[2:]}.z")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompress(f.read())
+            os.utime(path, None)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (zlib.error, OSError):
+            # Truncated or concurrently evicted file: treat as a miss and drop it.
+            self._remove(path)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return data
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        compressed = zlib.compress(data, self.compress_level)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._stats["writes"] += 1
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(compressed)
+            over_cap = self._approx_bytes > self.max_bytes
+        if over_cap:
+            self.evict()
+
+    def evict(self):
+        '''
+        Deletes least recently used files until the store is under 90% of max_bytes.
+        '''
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, open(os.path.join(self.root, ".lock"), "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                files = []
+                total = 0
+                for path in self._iter_files():
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+                target = int(self.max_bytes * 0.9)
+                files.sort()
+                for _, size, path in files:
+                    if total <= target:
+                        break
+                    if self._remove(path):
+                        total -= size
+                        self._stats["evictions"] += 1
+                self._approx_bytes = total
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _iter_files(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(".z"):
+                    yield os.path.join(shard_dir, name)
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._iter_files():
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+        return total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"root": self.root, "approx_bytes": self._approx_bytes, "max_bytes": self.max_bytes})
+            return stats
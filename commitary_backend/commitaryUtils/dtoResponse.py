@@ -0,0 +1,33 @@
+from typing import Iterable
+
+from flask import Response, current_app, stream_with_context
+from pydantic import BaseModel
+
+from commitary_backend.commitaryUtils import jsonCodec as json_codec
+
+
+def dto_response(dto: BaseModel, status: int = 200) -> Response:
+    """
+    JSON response serialized by pydantic-core in one pass, instead of model_dump() to a dict
+    and jsonify() over it again. Datetimes are ISO 8601 (e.g. "2025-09-01T10:00:00Z").
+    """
+    return Response(dto.model_dump_json(), status=status, mimetype="application/json")
+
+
+def ndjson_response(header: dict, items: Iterable[BaseModel]) -> Response:
+    """
+    Streams `header` on the first line, then one item per line (application/x-ndjson).
+    Items are serialized as the iterable produces them, so nothing is held beyond the current item.
+    The status line is sent before the items are read: a failure while streaming ends the
+    stream with an {"error": ...} record instead of an error status.
+    """
+    def generate():
+        yield json_codec.dumps(header).decode("utf-8") + "\n"
+        try:
+            for item in items:
+                yield item.model_dump_json() + "\n"
+        except Exception as e:
+            current_app.logger.debug(f"ERROR: NDJSON stream interrupted: {e}")
+            yield json_codec.dumps({"error": str(e)}).decode("utf-8") + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -0,0 +1,97 @@
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is pinned in requirements.txt
+    orjson = None
+
+
+# JSON codec shared by GithubService (parsing GitHub responses) and Flask (encoding responses).
+# orjson when installed, the standard library otherwise. Both produce the same documents:
+# compact, UTF-8, datetimes/dates as ISO 8601 with "Z" for UTC.
+#
+# Config (env):
+#     COMMITARY_JSON_CODEC   orjson | stdlib   (default orjson when importable)
+
+CODEC = os.getenv("COMMITARY_JSON_CODEC", "orjson" if orjson is not None else "stdlib")
+if CODEC == "orjson" and orjson is None:
+    CODEC = "stdlib"
+
+JSONDecodeError = json.JSONDecodeError  # orjson.JSONDecodeError is a subclass
+
+
+def _default(obj: Any) -> Any:
+    '''Types neither codec encodes natively; mirrors Flask's default provider.'''
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_default(obj: Any) -> Any:
+    # orjson handles these natively; keep the stdlib output identical.
+    if isinstance(obj, datetime):
+        text = obj.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    return _default(obj)
+
+
+def loads(data: bytes | bytearray | str) -> Any:
+    '''Parses a JSON document. Raises JSONDecodeError (a ValueError) on invalid input.'''
+    if CODEC == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    '''Serializes `obj` to compact UTF-8 JSON bytes.'''
+    if CODEC == "orjson":
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_stdlib_default, sort_keys=sort_keys, ensure_ascii=False,
+                      indent=2 if indent else None, separators=None if indent else (",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    '''
+    Flask JSON provider (jsonify, request.get_json ...) backed by the codec above.
+    Keys stay sorted like Flask's default provider; datetimes are ISO 8601 instead of RFC 822.
+    Calls with json.dumps-specific arguments (e.g. a custom `default` or `cls`) use the standard library.
+    '''
+
+    ensure_ascii = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if set(kwargs) - {"separators", "indent", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys), indent=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys, indent=indent) + b"\n",
+                                        mimetype=self.mimetype)
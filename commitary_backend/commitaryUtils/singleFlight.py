@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters", "futures")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+        # (loop, future) of the coroutines waiting in do_async.
+        self.futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    '''
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key runs `fn`. Callers arriving while it is in flight block
+    until it finishes and receive the same result (or the same exception).
+    Nothing is cached: once the call finishes, the next caller runs `fn` again.
+    `do_async` is the asyncio variant. Both share one table of calls in flight, so a coroutine
+    joins a call started by a thread and the other way round.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            return self._outcome(call)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            self._fail(call, e)
+            raise
+        finally:
+            self._finish(key, call)
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        '''
+        Same as `do` for a coroutine function. Waiting callers await a future instead of blocking the loop.
+        '''
+        future = None
+        call, leader = self._join(key)
+        if not leader:
+            with self._lock:
+                if not call.done.is_set():
+                    future = asyncio.get_running_loop().create_future()
+                    call.futures.append((asyncio.get_running_loop(), future))
+            if future is not None:
+                await future
+            call.done.wait()
+            return self._outcome(call)
+
+        try:
+            call.result = await fn()
+            return call.result
+        except BaseException as e:
+            self._fail(call, e)
+            raise
+        finally:
+            self._finish(key, call)
+
+    def _join(self, key: Hashable) -> Tuple[_Call, bool]:
+        '''(call of the key, True if the caller runs it).'''
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self._stats["executions"] += 1
+            return call, True
+
+    @staticmethod
+    def _outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _fail(self, call: _Call, error: BaseException):
+        call.error = error
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def _finish(self, key: Hashable, call: _Call):
+        with self._lock:
+            self._calls.pop(key, None)
+            futures, call.futures = call.futures, []
+            # Set under the lock: do_async only registers a future while the call is not done.
+            call.done.set()
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed.
+                pass
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        stats["coalesce_rate"] = stats["coalesced"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
@@ -0,0 +1,9 @@
+import hashlib
+
+
+def token_fingerprint(token: str | None) -> str:
+    """
+    Returns a short, non-reversible identifier for a GitHub token.
+    Used to scope cache entries per user without keeping raw tokens in memory keys.
+    """
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
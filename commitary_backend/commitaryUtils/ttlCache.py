@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    '''
+    Thread-safe in-process cache with per-entry expiry and LRU bound.
+
+    `None` is a legal cached value and is used for negative caching
+    (e.g. "this repository does not exist"). Use `TTLCache.MISSING` to detect a miss.
+    '''
+
+    MISSING = object()
+
+    def __init__(self, ttl: float, max_entries: int = 1024, negative_ttl: float | None = None):
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return TTLCache.MISSING
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return TTLCache.MISSING
+            self._entries.move_to_end(key)
+            self._stats["negative_hits" if value is None else "hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self._stats["invalidations"] += 1
+            return removed
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "ttl": self.ttl, "negative_ttl": self.negative_ttl})
+            return stats
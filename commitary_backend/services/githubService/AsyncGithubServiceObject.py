@@ -0,0 +1,452 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from flask import current_app
+
+from commitary_backend.dto.gitServiceDTO import RepoDTO, BranchListDTO, CommitListDTO, DiffDTO, PatchFileDTO
+from commitary_backend.dto.gitServiceDTO import CodebaseDTO
+from commitary_backend.services.githubService.GithubServiceObject import GithubService, gb_service
+from commitary_backend.services.githubService.githubPayloads import BRANCH_REFS_QUERY, HISTORY_QUERY_TEMPLATE
+from commitary_backend.services.githubService.githubPayloads import HISTORY_COMMIT_FIELDS, RANGE_COMMIT_FIELDS
+from commitary_backend.services.githubService.githubPayloads import rest_flight_key, graphql_flight_key, graphql_data
+from commitary_backend.services.githubService.githubPayloads import repo_cache_key, repo_dto_from_rest, branch_refs_page, branch_dtos_from_refs
+from commitary_backend.services.githubService.githubPayloads import clamp_page_size, history_variables, history_page
+from commitary_backend.services.githubService.githubPayloads import commit_dto_from_graphql, commit_range_from_nodes
+from commitary_backend.services.githubService.githubPayloads import diff_header_from_compare, plan_range_diff, relabel_diff
+from commitary_backend.services.githubService.diffAssembler import patch_file_from_compare, patch_file_from_texts
+from commitary_backend.services.githubService.diffAssembler import tree_blobs, tree_changes
+from commitary_backend.services.githubService.resilience import GithubUnavailableError, endpoint_key
+from commitary_backend.commitaryUtils.asyncBridge import AsyncBridge
+from commitary_backend.commitaryUtils.ttlCache import TTLCache
+from commitary_backend.commitaryUtils import jsonCodec as json_codec
+
+
+class _LoopState:
+    '''
+    AsyncClient and fan-out semaphore of one event loop. asyncio objects cannot be shared between loops.
+    '''
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+
+class AsyncGithubService:
+    '''
+    asyncio counterpart of GithubService for fan-out work (multi-branch diffs, snapshot blobs,
+    multi-repository dashboards). Returns the same DTOs as GithubService.
+
+    - One httpx.AsyncClient per event loop with HTTP/2 (when `h2` is installed) and bounded connections.
+    - Caches (repository, ETag, compare, blob store), single-flight, rate limit slots and the payload
+      helpers (githubPayloads, diffAssembler) are shared with the sync service.
+    - Repositories served by the local git clone or the commit mirror, and archive-mode snapshots, are
+      read through the sync service in a worker thread, so both clients return the same data.
+    - `run_sync` runs a coroutine method from sync code (Flask routes) on a background event loop.
+
+    Config (env):
+        GITHUB_ASYNC_HTTP2             use HTTP/2 when available        (default 1)
+        GITHUB_ASYNC_MAX_CONNECTIONS   connections per client           (default 20)
+        GITHUB_ASYNC_MAX_KEEPALIVE     idle keep-alive connections      (default 10)
+        GITHUB_ASYNC_CONCURRENCY       in-flight requests per fan-out   (default 16)
+    '''
+
+    def __init__(self, sync_service: GithubService, transport: httpx.AsyncBaseTransport | None = None):
+        self.sync = sync_service
+        self.transport = transport
+        self.http2 = os.getenv("GITHUB_ASYNC_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("GITHUB_ASYNC_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("GITHUB_ASYNC_MAX_KEEPALIVE", "10")),
+        )
+        self.concurrency = int(os.getenv("GITHUB_ASYNC_CONCURRENCY", "16"))
+        self.bridge = AsyncBridge("github-async")
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "http2_responses": 0}
+
+    # ----- transport
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                http2=self.http2 and self.transport is None,
+                limits=self.limits,
+                timeout=httpx.Timeout(15.0, read=30.0),
+                transport=self.transport,
+            )
+            state = self._states[loop] = _LoopState(client, self.concurrency)
+        return state
+
+    async def _rest_request(self, method: str, url: str, token: str, params=None, json=None):
+        """
+        Sends a REST request and returns (parsed body, parsed Link header).
+        Identical concurrent GETs, from this client or the sync one, share one upstream call.
+        """
+        single_flight = self.sync.single_flight
+        if method != "GET" or single_flight is None:
+            return await self._send_rest_request(method, url, token, params=params, json=json)
+        return await single_flight.do_async(rest_flight_key(token, url, params),
+                                            lambda: self._send_rest_request(method, url, token, params=params))
+
+    async def _send_rest_request(self, method: str, url: str, token: str, params=None, json=None):
+        headers = {
+            "Authorization": f"bearer {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+        cache_key = None
+        cached = None
+        if method == "GET":
+            cache_key = self.sync.etag_cache.make_key(token, url, params)
+            cached = self.sync.etag_cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.conditional_headers())
+
+        response = await self._send(method, url, token, headers=headers, params=params, json=json)
+        if response.status_code == 304 and cached is not None:
+            self.sync.etag_cache.record_not_modified()
+            return cached.body, cached.links
+        response.raise_for_status()
+        data = json_codec.loads(response.content)
+        if cache_key is not None:
+            self.sync.etag_cache.store(cache_key, response, data)
+        return data, response.links
+
+    async def _make_request(self, method: str, endpoint: str, token: str, params=None, json=None):
+        data, _ = await self._rest_request(method, f"{self.sync.api_base_url}{endpoint}", token, params=params, json=json)
+        return data
+
+    async def _execute_graphql(self, query: str, variables: dict, token: str) -> dict:
+        single_flight = self.sync.single_flight
+        if single_flight is None:
+            return await self._send_graphql(query, variables, token)
+        return await single_flight.do_async(graphql_flight_key(token, query, variables),
+                                            lambda: self._send_graphql(query, variables, token))
+
+    async def _send_graphql(self, query: str, variables: dict, token: str) -> dict:
+        headers = {
+            "Authorization": f"bearer {token}",
+            "Content-Type": "application/json"
+        }
+        response = await self._send("POST", self.sync.graphql_url, token, "graphql", headers=headers, json={"query": query, "variables": variables})
+        response.raise_for_status()
+        return graphql_data(json_codec.loads(response.content))
+
+    async def _send(self, method: str, url: str, token: str, resource: str = "core", **kwargs) -> httpx.Response:
+        """
+        Same retry / circuit breaker / deadline policy as GithubService (its ResilientCaller),
+        waiting with asyncio.sleep instead of blocking a thread.
+        Every attempt takes a slot of the token in GithubService.rate_limiter (pacing, priority)
+        and its response updates the shared quota.
+        """
+        state = self._state()
+        resilience = self.sync.resilience
+        key = endpoint_key(method, url)
+        attempt = 0
+        while True:
+            timeout = resilience.before_attempt(key, url, 30.0 if resource == "graphql" else 15.0)
+            try:
+                async with state.semaphore, self.sync.rate_limiter.async_slot(token, resource, url):
+                    response = await state.client.request(method, url, timeout=timeout, **kwargs)
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                delay = resilience.error_delay(key, attempt)
+                if delay is None:
+                    raise
+                current_app.logger.debug(f"WARN: {key} failed ({type(e).__name__}). Retrying in {delay:.2f} seconds...")
+            except GithubUnavailableError:
+                resilience.breaker.release(key)
+                raise
+            except BaseException:
+                resilience.breaker.record_failure(key)
+                raise
+            else:
+                self.sync.rate_limiter.record(token, response, default_resource=resource)
+                with self._lock:
+                    self._stats["requests"] += 1
+                    if response.http_version == "HTTP/2":
+                        self._stats["http2_responses"] += 1
+                delay = resilience.retry_delay(key, response, attempt)
+                if delay is None:
+                    return response
+                current_app.logger.debug(f"WARN: Received status {response.status_code} from {key}. Retrying in {delay:.2f} seconds...")
+            with self._lock:
+                self._stats["retries"] += 1
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # ----- repositories and branches
+
+    async def getSingleRepoByID(self, token: str, repo_id: int) -> Optional[RepoDTO]:
+        """
+        Fetches a single repository by its GitHub ID. Shares the repository cache of GithubService.
+        """
+        cache_key = repo_cache_key(token, repo_id)
+        if cache_key is None:
+            current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found. (invalid ID)")
+            return None
+        cached = self.sync.repo_cache.get(cache_key)
+        if cached is not TTLCache.MISSING:
+            return cached
+        try:
+            repo_data = await self._make_request("GET", f"/repositories/{repo_id}", token)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found.")
+                self.sync.repo_cache.set(cache_key, None)
+                return None
+            raise
+        repo_dto = repo_dto_from_rest(repo_data)
+        self.sync.repo_cache.set(cache_key, repo_dto)
+        return repo_dto
+
+    async def getBranchesByRepoId(self, token: str, repo_id: int) -> BranchListDTO:
+        repo_dto = await self.getSingleRepoByID(token, repo_id)
+        if not repo_dto:
+            return BranchListDTO(branchList=[])
+
+        owner = repo_dto.github_owner_login
+        repo = repo_dto.github_name
+        branch_list = []
+        cursor = None
+        while True:
+            variables = {"owner": owner, "repo": repo, "cursor": cursor}
+            refs = branch_refs_page(await self._execute_graphql(BRANCH_REFS_QUERY, variables, token))
+            if not refs:
+                break
+            branch_list.extend(branch_dtos_from_refs(refs, repo_id, owner, repo))
+            if not refs["pageInfo"]["hasNextPage"]:
+                break
+            cursor = refs["pageInfo"]["endCursor"]
+        return BranchListDTO(branchList=branch_list)
+
+    # ----- commits
+
+    async def _history_nodes(self, token: str, owner: str, repo: str, branch: str,
+                             since_dt: datetime | None, until_dt: datetime | None,
+                             node_fields: str = HISTORY_COMMIT_FIELDS) -> List[dict]:
+        query = HISTORY_QUERY_TEMPLATE % node_fields
+        variables = history_variables(owner, repo, branch, since_dt, until_dt, clamp_page_size(None, self.sync.commit_page_size))
+        nodes = []
+        while True:
+            page, cursor = history_page(await self._execute_graphql(query, variables, token))
+            nodes.extend(page)
+            if cursor is None:
+                return nodes
+            variables["cursor"] = cursor
+
+    async def getCommitMsgs2(self, repo_id: int, token: str, branch: str, startdatetime: str, enddatetime: str) -> CommitListDTO:
+        repo_dto = await self.getSingleRepoByID(token, repo_id)
+        if not repo_dto:
+            return CommitListDTO(commitList=[])
+
+        owner = repo_dto.github_owner_login
+        repo = repo_dto.github_name
+        try:
+            since_dt = datetime.fromisoformat(startdatetime.replace('Z', '+00:00'))
+            until_dt = datetime.fromisoformat(enddatetime.replace('Z', '+00:00'))
+        except ValueError as e:
+            current_app.logger.debug(f"ERROR: Invalid datetime format in getCommitMsgs2. {e}")
+            return CommitListDTO(commitList=[])
+
+        mirrored = await asyncio.to_thread(self._mirrored_commits, token, repo_id, owner, repo, branch, since_dt, until_dt)
+        if mirrored is not None:
+            return CommitListDTO(commitList=mirrored)
+
+        nodes = await self._history_nodes(token, owner, repo, branch, since_dt, until_dt)
+        return CommitListDTO(commitList=[commit_dto_from_graphql(node, repo_id, owner, repo, branch) for node in nodes])
+
+    def _mirrored_commits(self, token: str, repo_id: int, owner: str, repo: str, branch: str,
+                          since_dt: datetime, until_dt: datetime):
+        """Runs in a worker thread: local git / commit mirror commits like getCommitMsgs2, or None."""
+        mirrored = self.sync.iterMirroredCommits(token, repo_id, owner, repo, branch, since_dt, until_dt, flavor="graphql")
+        return list(mirrored) if mirrored is not None else None
+
+    # ----- diffs
+
+    async def getDiffBySHA(self, user: str, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> DiffDTO:
+        """
+        Difference between two commits by two SHAs. Shares the compare cache of GithubService.
+        Repositories served by the local git clone are diffed there, in a worker thread.
+        Truncated compares are completed from the two trees like DiffAssembler, with the blob batches fetched concurrently.
+        """
+        cached = self.sync.compare_cache.get(owner, repo, shaBefore, shaAfter)
+        if cached is not None:
+            return cached
+
+        if self.sync.local_git.handles(owner, repo):
+            local = await asyncio.to_thread(self._local_diff, token, owner, repo, shaBefore, shaAfter)
+            if local is not None:
+                return local
+
+        assembler = self.sync.diff_assembler
+        endpoint = f"/repos/{owner}/{repo}/compare/{shaBefore}...{shaAfter}"
+        first_page = await self._make_request("GET", endpoint, token, params={"per_page": assembler.page_size, "page": 1})
+        files = first_page.get("files", [])
+        if not assembler.is_truncated(files):
+            patch_files = [patch_file_from_compare(file) for file in files]
+        else:
+            complete, deferred, skip = assembler.split_compare_files(files)
+            patch_files = [patch_file_from_compare(file) for file in complete]
+            base = (first_page.get("merge_base_commit") or {}).get("sha") or shaBefore
+            patch_files.extend(await self._tree_diff_files(token, owner, repo, base, shaAfter, deferred, skip))
+
+        diff_dto = diff_header_from_compare(owner, repo, shaBefore, shaAfter, first_page)
+        diff_dto.files = patch_files
+        self._cache_diff(owner, repo, shaBefore, shaAfter, diff_dto)
+        return diff_dto
+
+    def _local_diff(self, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> Optional[DiffDTO]:
+        """Runs in a worker thread: the local git diff like GithubService.getDiffBySHA, or None."""
+        local = self.sync.iterLocalDiff(token, owner, repo, shaBefore, shaAfter)
+        if local is None:
+            return None
+        diff_dto, files = local
+        diff_dto.files = list(files)
+        self._cache_diff(owner, repo, shaBefore, shaAfter, diff_dto)
+        return diff_dto
+
+    def _cache_diff(self, owner: str, repo: str, shaBefore: str, shaAfter: str, diff_dto: DiffDTO):
+        try:
+            self.sync.compare_cache.put(owner, repo, shaBefore, shaAfter, diff_dto)
+        except OSError as e:
+            current_app.logger.debug(f"Warning: Could not write compare result to the cache: {e}")
+
+    async def _tree_diff_files(self, token: str, owner: str, repo: str, base: str, head: str,
+                               deferred: Dict[str, dict], skip: set) -> List[PatchFileDTO]:
+        """Files past the compare cap, from the trees of `base` and `head` (see DiffAssembler)."""
+        assembler = self.sync.diff_assembler
+        engine = self.sync.snapshot_engine
+        trees = await asyncio.gather(*(
+            self._make_request("GET", f"/repos/{owner}/{repo}/git/trees/{revision}", token, params={"recursive": "1"})
+            for revision in (base, head)
+        ))
+        if any(tree.get("truncated") for tree in trees):
+            return list(assembler.incomplete_files(owner, repo, deferred))
+        changes = tree_changes(tree_blobs(trees[0].get("tree", [])), tree_blobs(trees[1].get("tree", [])), skip)
+
+        blobs = {sha: {"path": path, "sha": sha} for path, status, *shas in changes if status != "renamed" for sha in shas if sha}
+        missing = []
+        texts = {entry["sha"]: text for entry, text in engine.iter_stored_blobs(list(blobs.values()), missing)}
+        results = await asyncio.gather(*(self._fetch_blob_batch(token, owner, repo, batch) for batch in engine.batches(missing)))
+        for batch_texts in results:
+            for entry, text in batch_texts:
+                engine.store_blob(entry, text)
+                texts[entry["sha"]] = text
+        assembler.count_tree_diff_files(len(changes))
+        return [patch_file_from_texts(path, status, texts.get(sha_before), texts.get(sha_after))
+                for path, status, sha_before, sha_after in changes]
+
+    async def getDiffByIdTime3(self, user_token: str, repo_id: int, branch: str,
+                               datetime_from: datetime, datetime_to: datetime) -> Optional[DiffDTO]:
+        """
+        Same as GithubService.getDiffByIdTime3: diff from the parent of the first commit in the
+        range to the last commit in the range.
+        """
+        repo_dto = await self.getSingleRepoByID(user_token, repo_id)
+        if not repo_dto:
+            return None
+
+        owner = repo_dto.github_owner_login
+        repo_name = repo_dto.github_name
+        try:
+            nodes = await self._history_nodes(user_token, owner, repo_name, branch, datetime_from, datetime_to,
+                                              node_fields=RANGE_COMMIT_FIELDS)
+        except (httpx.HTTPError, GithubUnavailableError) as e:
+            current_app.logger.debug(f"ERROR: Failed to resolve the commit range: {e}")
+            return None
+        resolved = commit_range_from_nodes(nodes[0] if nodes else None, nodes[-1] if nodes else None)
+
+        header, shas = plan_range_diff(repo_id, owner, repo_name, branch, resolved)
+        if shas is None:
+            return header
+        diff_dto = await self.getDiffBySHA("user_placeholder", user_token, owner, repo_name, *shas)
+        return relabel_diff(diff_dto, header)
+
+    # ----- snapshots
+
+    async def getSnapshotBySHA(self, user: str, token: str, owner: str, repo: str, sha: str) -> CodebaseDTO:
+        """
+        Snapshot of a revision through the tree + batched blob path, with every blob batch in flight at once.
+        Shares the blob store, the filters and the mode choice of GithubService.snapshot_engine: repositories
+        served by the local git clone, and archive-mode snapshots, are built by GithubService in a worker thread.
+        """
+        engine = self.sync.snapshot_engine
+        mode = engine.mode_for(owner, repo)
+        if self.sync.local_git.handles(owner, repo) or mode == "archive":
+            return await asyncio.to_thread(self.sync.getSnapshotBySHA, user, token, owner, repo, sha)
+
+        tree_data = await self._make_request("GET", f"/repos/{owner}/{repo}/git/trees/{sha}", token, params={"recursive": "1"})
+        truncated = bool(tree_data.get("truncated"))
+        blobs, _ = engine.select_blobs(tree_data.get("tree", []))
+        if mode == "auto" and engine.prefers_archive(blobs, truncated):
+            return await asyncio.to_thread(self.sync.getSnapshotBySHA, user, token, owner, repo, sha, "archive")
+        if truncated:
+            current_app.logger.debug(f"Warning: Tree of {owner}/{repo}@{sha} is truncated by GitHub. The snapshot is partial.")
+
+        missing = []
+        texts = list(engine.iter_stored_blobs(blobs, missing))
+        results = await asyncio.gather(*(self._fetch_blob_batch(token, owner, repo, batch) for batch in engine.batches(missing)))
+        for batch_texts in results:
+            for entry, text in batch_texts:
+                engine.store_blob(entry, text)
+                texts.append((entry, text))
+
+        files = sorted((engine.code_file(entry["path"], text) for entry, text in texts), key=lambda f: f.path)
+        return CodebaseDTO(repository_name=f"{owner}/{repo}", files=files)
+
+    async def _fetch_blob_batch(self, token: str, owner: str, repo: str, batch: List[dict]) -> List[Tuple[dict, str]]:
+        engine = self.sync.snapshot_engine
+        query, variables = engine.blob_batch_query(owner, repo, batch)
+        result = await self._execute_graphql(query, variables, token)
+        return engine.parse_blob_batch(result, batch)
+
+    # ----- fan-out helpers
+
+    async def gatherReposByIds(self, token: str, repo_ids: List[int]) -> List[Optional[RepoDTO]]:
+        """Repository metadata of several repositories, in the order of `repo_ids`."""
+        return list(await asyncio.gather(*(self.getSingleRepoByID(token, repo_id) for repo_id in repo_ids)))
+
+    async def gatherBranchesByRepoIds(self, token: str, repo_ids: List[int]) -> Dict[int, BranchListDTO]:
+        """Branch lists of several repositories (e.g. a dashboard), keyed by repository ID."""
+        results = await asyncio.gather(*(self.getBranchesByRepoId(token, repo_id) for repo_id in repo_ids))
+        return dict(zip(repo_ids, results))
+
+    async def gatherDiffsByBranches(self, token: str, repo_id: int, branches: List[str],
+                                    datetime_from: datetime, datetime_to: datetime) -> Dict[str, Optional[DiffDTO]]:
+        """getDiffByIdTime3 of several branches of one repository, keyed by branch name."""
+        results = await asyncio.gather(*(
+            self.getDiffByIdTime3(token, repo_id, branch, datetime_from, datetime_to) for branch in branches
+        ))
+        return dict(zip(branches, results))
+
+    # ----- sync bridge
+
+    def run_sync(self, coroutine_fn, *args, timeout: float | None = None, **kwargs):
+        """
+        Runs one of the coroutine methods from sync code and returns its result, e.g.
+        `async_gb_service.run_sync(async_gb_service.gatherReposByIds, token, repo_ids)`.
+        """
+        return self.bridge.run(coroutine_fn, *args, timeout=timeout, **kwargs)
+
+    async def aclose(self):
+        """Closes the AsyncClient of the running event loop."""
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({"http2": self.http2, "event_loops": len(self._states)})
+        return stats
+
+
+# Singleton instance
+async_gb_service = AsyncGithubService(gb_service)
@@ -1,12 +1,34 @@
 import os
 import re
-from time import sleep
+import time
 from pydantic import ValidationError
 import requests
 from commitary_backend.dto.gitServiceDTO import RepoDTO, RepoListDTO, BranchDTO, BranchListDTO, UserGBInfoDTO, CommitListDTO, CommitMDDTO
 from commitary_backend.dto.gitServiceDTO import PatchFileDTO, DiffDTO
 from commitary_backend.dto.gitServiceDTO import CodeFileDTO, CodebaseDTO
-from typing import List, Dict, Optional
+from commitary_backend.services.githubService.httpSessionPool import GithubSessionPool
+from commitary_backend.services.githubService.conditionalCache import ConditionalRequestCache
+from commitary_backend.services.githubService.snapshotEngine import SnapshotEngine
+from commitary_backend.services.githubService.compareCache import CompareCache
+from commitary_backend.services.githubService.diffAssembler import DiffAssembler
+from commitary_backend.services.githubService.rateLimitScheduler import RateLimitScheduler
+from commitary_backend.services.githubService.resilience import ResilientCaller
+from commitary_backend.services.githubService.commitMirror import CommitMirror
+from commitary_backend.services.githubService.commitTimeline import CommitTimelineIndex
+from commitary_backend.services.githubService.localGitBackend import LocalGitBackend
+from commitary_backend.services.githubService.cassette import Cassette
+from commitary_backend.services.githubService.githubPayloads import BRANCH_REFS_QUERY, HISTORY_QUERY_TEMPLATE
+from commitary_backend.services.githubService.githubPayloads import HISTORY_COMMIT_FIELDS, RANGE_COMMIT_FIELDS
+from commitary_backend.services.githubService.githubPayloads import rest_flight_key, graphql_flight_key, graphql_data
+from commitary_backend.services.githubService.githubPayloads import repo_cache_key, repo_dto_from_rest, branch_refs_page, branch_dtos_from_refs
+from commitary_backend.services.githubService.githubPayloads import clamp_page_size, history_variables, history_page
+from commitary_backend.services.githubService.githubPayloads import commit_dto_from_graphql, commit_range_from_nodes
+from commitary_backend.services.githubService.githubPayloads import diff_header_from_compare, plan_range_diff, relabel_diff
+from commitary_backend.commitaryUtils.ttlCache import TTLCache
+from commitary_backend.commitaryUtils.singleFlight import SingleFlight
+from commitary_backend.commitaryUtils.tokenFingerprint import token_fingerprint
+from commitary_backend.commitaryUtils import jsonCodec as json_codec
+from typing import Iterator, List, Dict, Optional
 
 from datetime import datetime, timezone
 
@@ -14,9 +36,6 @@ from flask import current_app
 import logging
 
 
-
-
-
 class GithubService:
     '''
     This service must be loaded before InsightServiceObject.
@@ -28,70 +47,169 @@ class GithubService:
         Set github url, api, path
         Load keys from env
         ''' 
-        self.api_base_url = "https://api.github.com"
-        self.graphql_url = "https://api.github.com/graphql"
+        # Overridable so the service can run against GitHub Enterprise or the offline fake (benchmarks).
+        self.api_base_url = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+        self.graphql_url = os.getenv("GITHUB_GRAPHQL_URL", f"{self.api_base_url}/graphql")
+        # Keep-alive connection pool shared by every REST and GraphQL call.
+        self.http_pool = GithubSessionPool()
+        # Per-token quota accounting; interactive calls go ahead of background (insight) work.
+        self.rate_limiter = RateLimitScheduler()
+        # Jittered retries, Retry-After, per-endpoint circuit breaker and per-operation deadline.
+        self.resilience = ResilientCaller()
+        # ETag/Last-Modified cache for REST GETs. 304 revalidations are free of rate limit.
+        self.etag_cache = ConditionalRequestCache()
+        # repo_id -> RepoDTO per token. Almost every public method resolves the repo first.
+        self.repo_cache = TTLCache(
+            ttl=float(os.getenv("GITHUB_REPO_CACHE_TTL", "300")),
+            negative_ttl=float(os.getenv("GITHUB_REPO_CACHE_NEGATIVE_TTL", "30")),
+            max_entries=4096,
+        )
+        # Items per page for commit history (REST per_page / GraphQL first), at most 100.
+        self.commit_page_size = int(os.getenv("GITHUB_COMMIT_PAGE_SIZE", "100"))
+        # Recursive tree listing + batched, parallel blob download for weekly snapshots.
+        self.snapshot_engine = SnapshotEngine(self)
+        # Parsed /compare results keyed by (owner, repo, shaBefore, shaAfter), kept on disk.
+        self.compare_cache = CompareCache()
+        # Streams compare files and diffs the two trees past GitHub's 300-file cap.
+        self.diff_assembler = DiffAssembler(self)
+        # Identical concurrent GETs / GraphQL queries share one upstream call.
+        self.single_flight = SingleFlight() if os.getenv("GITHUB_SINGLE_FLIGHT", "1") == "1" else None
+        # (repo, head branch, base branch) -> merged pull requests. New merges show up after the TTL.
+        self.merged_pr_cache = TTLCache(
+            ttl=float(os.getenv("GITHUB_MERGED_PR_CACHE_TTL", "300")),
+            max_entries=4096,
+        )
+        # Postgres index of the history of registered repos. Commit lists only fetch the unseen tail.
+        self.commit_mirror = CommitMirror(self)
+        # Per-branch sorted (commit date, sha) arrays. Datetime -> SHA lookups are a binary search.
+        self.commit_timeline = CommitTimelineIndex(self)
+        # Bare clones of the repos listed in GITHUB_LOCAL_GIT_REPOS serve history, diffs and snapshots.
+        self.local_git = LocalGitBackend(self)
+        # GITHUB_CASSETTE_MODE=record|replay: capture or serve back the upstream traffic (performance tests).
+        self.cassette = Cassette()
 
     def _make_request(self, method, endpoint, token, params=None, json=None):
         """Helper function to make REST API requests with retry logic."""
+        data, _ = self._rest_request(method, f"{self.api_base_url}{endpoint}", token, params=params, json=json)
+        return data
+
+    def _paginate_rest(self, endpoint, token, params=None) -> Iterator[list]:
+        """
+        Yields every page of a paginated REST list endpoint by following the `Link: rel="next"` header.
+        """
+        url = f"{self.api_base_url}{endpoint}"
+        while url:
+            data, links = self._rest_request("GET", url, token, params=params)
+            yield data
+            url = links.get("next", {}).get("url")
+            # The next link already carries the query string.
+            params = None
+
+    def _rest_request(self, method, url, token, params=None, json=None):
+        """
+        Sends a REST request and returns (parsed body, parsed Link header).
+        Concurrent identical GETs are coalesced into one upstream call and share the parsed result.
+        """
+        if method != "GET" or self.single_flight is None:
+            return self._send_rest_request(method, url, token, params=params, json=json)
+        key = rest_flight_key(token, url, params)
+        return self.single_flight.do(key, lambda: self._send_rest_request(method, url, token, params=params))
+
+    def _execute_graphql(self, query, variables, token):
+        """
+        Executes a GraphQL query. Concurrent identical queries (same token, query and variables)
+        are coalesced into one upstream call.
+        """
+        if self.single_flight is None:
+            return self._send_graphql(query, variables, token)
+        key = graphql_flight_key(token, query, variables)
+        return self.single_flight.do(key, lambda: self._send_graphql(query, variables, token))
+
+    def _send_rest_request(self, method, url, token, params=None, json=None):
+        """Sends a REST request and returns (parsed body, parsed Link header)."""
         headers = {
             "Authorization": f"bearer {token}",
             "Accept": "application/vnd.github.v3+json"
         }
-        retries = 3
-        backoff_factor = 0.5
-        for i in range(retries):
-            try:
-                # Add a timeout to prevent requests from hanging indefinitely
-                response = requests.request(method, f"{self.api_base_url}{endpoint}", headers=headers, params=params, json=json, timeout=15)
-                response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
-                # Check for specific server-side errors that are worth retrying
-                if e.response is not None and e.response.status_code in [502, 503, 504]:
-                    current_app.logger.debug(f"WARN: Received status {e.response.status_code}. Retrying in {backoff_factor * (2 ** i)} seconds...")
-                    sleep(backoff_factor * (2 ** i))
-                    continue
-                # For other errors (like 4xx client errors), raise immediately
-                raise e
-        # If all retries fail, raise the last exception
-        raise Exception(f"Failed to make request to {endpoint} after {retries} retries.")
-
-
-    def _execute_graphql(self, query, variables, token):
+        # Conditional GET: revalidate a cached body with its ETag/Last-Modified.
+        cache_key = None
+        cached = None
+        if method == "GET":
+            cache_key = self.etag_cache.make_key(token, url, params)
+            cached = self.etag_cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.conditional_headers())
+
+        # Add a timeout to prevent requests from hanging indefinitely
+        response = self.resilience.call(method, url, lambda timeout: self._pooled_request(
+            token, "core", method, url, headers=headers, params=params, json=json, timeout=timeout
+        ), timeout=15)
+        if response.status_code == 304 and cached is not None:
+            self.etag_cache.record_not_modified()
+            return cached.body, cached.links
+        response.raise_for_status()
+        data = json_codec.loads(response.content)
+        if cache_key is not None:
+            self.etag_cache.store(cache_key, response, data)
+        return data, response.links
+
+    def _pooled_request(self, token, resource, method, url, **kwargs) -> requests.Response:
+        """One HTTP attempt through the connection pool, inside the token's rate limit slot."""
+        if self.cassette.replaying:
+            return self.cassette.replay(method, url, kwargs)
+        with self.rate_limiter.slot(token, resource, url):
+            started = time.monotonic()
+            response = self.http_pool.request(method, url, **kwargs)
+            elapsed = time.monotonic() - started
+        self.rate_limiter.record(token, response, default_resource=resource)
+        if self.cassette.recording:
+            self.cassette.record(method, url, kwargs, response, elapsed)
+        return response
+
+    def _send_graphql(self, query, variables, token):
         """Helper function to execute a GraphQL query with retry logic."""
         headers = {
             "Authorization": f"bearer {token}",
             "Content-Type": "application/json"
         }
         payload = {"query": query, "variables": variables}
-        retries = 3
-        backoff_factor = 0.5
-        for i in range(retries):
-            try:
-                # Add a timeout to the GraphQL request as well
-                response = requests.post(self.graphql_url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                
-                # Check for GraphQL-level errors, which can still return a 200 OK
-                json_response = response.json()
-                if "errors" in json_response:
-                    current_app.logger.debug(f"ERROR: GraphQL query failed with errors: {json_response['errors']}")
-                    # Decide if you want to retry on certain GraphQL errors. For now, we'll just raise.
-                    raise Exception(f"GraphQL query failed: {json_response['errors']}")
-                
-                return json_response
-            except requests.exceptions.RequestException as e:
-                # Retry on 502, 503, 504 status codes
-                if e.response is not None and e.response.status_code in [502, 503, 504]:
-                    current_app.logger.debug(f"WARN: Received status {e.response.status_code} from GraphQL endpoint. Retrying in {backoff_factor * (2 ** i)} seconds...")
-                    sleep(backoff_factor * (2 ** i))
-                    continue
-                # For other errors, raise immediately
-                raise e
-        # If all retries fail, raise the last exception
-        raise Exception(f"Failed to execute GraphQL query after {retries} retries.")
+        # Add a timeout to the GraphQL request as well
+        response = self.resilience.call("POST", self.graphql_url, lambda timeout: self._pooled_request(
+            token, "graphql", "POST", self.graphql_url, json=payload, headers=headers, timeout=timeout
+        ), timeout=30)
+        response.raise_for_status()
+
+        # Check for GraphQL-level errors, which can still return a 200 OK
+        return graphql_data(json_codec.loads(response.content))
+
+    def getServiceStats(self) -> dict:
+        """
+        Returns runtime counters of the service layers (connection pool, caches ...).
+        """
+        return {
+            "http_pool": self.http_pool.getStats(),
+            "rate_limit": self.rate_limiter.getStats(),
+            "resilience": self.resilience.getStats(),
+            "etag_cache": self.etag_cache.getStats(),
+            "repo_cache": self.repo_cache.getStats(),
+            "snapshot": self.snapshot_engine.getStats(),
+            "compare_cache": self.compare_cache.getStats(),
+            "diff_assembler": self.diff_assembler.getStats(),
+            "merged_pr_cache": self.merged_pr_cache.getStats(),
+            "single_flight": self.single_flight.getStats() if self.single_flight else {"enabled": False},
+            "commit_mirror": self.commit_mirror.getStats(),
+            "commit_timeline": self.commit_timeline.getStats(),
+            "local_git": self.local_git.getStats(),
+            "cassette": self.cassette.getStats(),
+        }
 
 
+    def getRateLimitState(self, token: str) -> dict:
+        """
+        Last known REST / GraphQL quota of a token and its scheduler queue state.
+        """
+        return self.rate_limiter.getQuota(token)
+
     def getUserMetadata(self, user: str, token: str) -> UserGBInfoDTO:
         """
         Fetches metadata for the authenticated user from GitHub.
@@ -125,17 +243,7 @@ class GithubService:
         '''
         repos_data = self._make_request("GET", "/user/repos", token, params={"affiliation": "owner,collaborator"})
         
-        repo_list = [RepoDTO(
-            github_id=repo['id'],
-            github_node_id=repo['node_id'],
-            github_name=repo['name'],
-            github_owner_id=repo['owner']['id'],
-            github_owner_login=repo['owner']['login'],
-            github_html_url=repo['html_url'],
-            github_url=repo['url'],
-            github_full_name=repo['full_name'],
-            description=repo.get('description')
-        ) for repo in repos_data]
+        repo_list = [repo_dto_from_rest(repo) for repo in repos_data]
         
         return RepoListDTO(repoList=repo_list)
 
@@ -143,23 +251,28 @@ class GithubService:
         '''
         Returns list of branches for a given repository.
         '''
-        branches_data = self._make_request("GET", f"/repos/{owner}/{repo}/branches", token)
-        
+        return BranchListDTO(branchList=self._list_branches(token, owner, repo, repo_id=0))
+
+    def _list_branches(self, token: str, owner: str, repo: str, repo_id: int) -> List[BranchDTO]:
+        """
+        Lists every branch with the date of its head commit.
+        One GraphQL request per 100 branches, instead of one REST call per branch.
+        """
         branch_list = []
-        for branch in branches_data:
-            commit_sha = branch['commit']['sha']
-            commit_data = self._make_request("GET", f"/repos/{owner}/{repo}/commits/{commit_sha}", token)
-            last_modification_str = commit_data['commit']['author']['date']
-            
-            branch_list.append(BranchDTO(
-                repo_id=0,
-                repo_name=repo,
-                owner_name=owner,
-                branch_name=branch['name'],
-                last_modification=datetime.fromisoformat(last_modification_str.replace('Z', '+00:00'))
-            ))
-            
-        return BranchListDTO(branchList=branch_list)
+        cursor = None
+        while True:
+            variables = {"owner": owner, "repo": repo, "cursor": cursor}
+            refs = branch_refs_page(self._execute_graphql(BRANCH_REFS_QUERY, variables, token))
+            if not refs:
+                break
+
+            branch_list.extend(branch_dtos_from_refs(refs, repo_id, owner, repo))
+
+            if not refs["pageInfo"]["hasNextPage"]:
+                break
+            cursor = refs["pageInfo"]["endCursor"]
+
+        return branch_list
 
 
     def _get_original_branch_from_merge_message(self, message: str) -> Optional[str]:
@@ -185,13 +298,44 @@ class GithubService:
         """
         Returns a list of commit messages for a given branch within a time range.
         Finds the repository by its ID before making the API call.
+        Only failures of the commit requests give an empty list; a failing repository lookup propagates.
+        """
+        query = self._resolve_commit_query(repo_id, token, startdatetime, enddatetime)
+        if query is None:
+            return CommitListDTO(commitList=[])
+
+        try:
+            commit_list = list(self._iter_rest_commits(repo_id, token, branch, *query))
+        except requests.exceptions.RequestException as e:
+            current_app.logger.debug(f"ERROR: REST API request failed: {e}")
+            return CommitListDTO(commitList=[])
+
+        # Debug line
+        current_app.logger.debug(f"DEBUG: Found {len(commit_list)} commits.")
+        return CommitListDTO(commitList=commit_list)
+
+    def iterCommitMsgs(self, repo_id: int, token: str, branch: str, startdatetime: str, enddatetime: str,
+                       page_size: int | None = None) -> Iterator[CommitMDDTO]:
+        """
+        Streaming version of getCommitMsgs.
+        Yields CommitMDDTOs page by page, following the REST `Link` header until the range is exhausted.
+        """
+        query = self._resolve_commit_query(repo_id, token, startdatetime, enddatetime)
+        if query is None:
+            return
+        yield from self._iter_rest_commits(repo_id, token, branch, *query, page_size=page_size)
+
+    def _resolve_commit_query(self, repo_id: int, token: str, startdatetime: str, enddatetime: str) -> Optional[tuple]:
+        """
+        (owner, repo, start datetime, end datetime) of a getCommitMsgs call,
+        or None if the repository is not found or a datetime is invalid.
         """
         # Debug line
         current_app.logger.debug(f"DEBUG: Starting getCommitMsgs with repo_id: {repo_id}")
         repo_dto = self.getSingleRepoByID(token, repo_id)
         if not repo_dto:
             current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found.")
-            return CommitListDTO(commitList=[])
+            return None
 
         owner = repo_dto.github_owner_login
         repo = repo_dto.github_name
@@ -205,72 +349,85 @@ class GithubService:
             end_dt = datetime.fromisoformat(enddatetime.replace('Z', '+00:00'))
         except ValueError as e:
             current_app.logger.debug(f"ERROR: Invalid datetime format. {e}")
-            return CommitListDTO(commitList=[])
+            return None
+        return owner, repo, start_dt, end_dt
+
+    def _iter_rest_commits(self, repo_id: int, token: str, branch: str, owner: str, repo: str,
+                           start_dt: datetime, end_dt: datetime, page_size: int | None = None) -> Iterator[CommitMDDTO]:
+        """
+        Commits of the range from the local mirror, or else from the paginated REST /commits list.
+        """
+        mirrored = self.iterMirroredCommits(token, repo_id, owner, repo, branch, start_dt, end_dt, flavor="rest")
+        if mirrored is not None:
+            current_app.logger.debug(f"DEBUG: Serving commits of repo {repo_id} from the local mirror")
+            yield from mirrored
+            return
 
         # Using REST API to get commits because it returns the integer user ID
         params = {
             "sha": branch,
             "since": start_dt.isoformat(),
-            "until": end_dt.isoformat()
+            "until": end_dt.isoformat(),
+            "per_page": clamp_page_size(page_size, self.commit_page_size)
         }
         commits_endpoint = f"/repos/{owner}/{repo}/commits"
         
         # Debug line
         current_app.logger.debug(f"DEBUG: Using REST API to get commits from {commits_endpoint}")
-        try:
-            commits_data = self._make_request("GET", commits_endpoint, token, params=params)
-        except requests.exceptions.RequestException as e:
-            current_app.logger.debug(f"ERROR: REST API request failed: {e}")
-            return CommitListDTO(commitList=[])
-
-        commit_list = []
-        for commit in commits_data:
-            # Check if author is a valid user and not a bot or a ghost user
-            author_id = commit['author']['id'] if commit.get('author') and commit['author'].get('id') else None
-            author_name = commit['author']['login'] if commit.get('author') and commit['author'].get('login') else commit['commit']['author']['name']
-            author_email = commit['commit']['author']['email']
-            
-            # In some cases, the commit is not associated with a GitHub user account
-            if author_id is None:
-                current_app.logger.debug(f"Warning: Commit {commit['sha']} has no valid GitHub user account ID.")
-            
-            # Determine the correct branch name for the commit
-            commit_branch_name = branch
-            if len(commit['parents']) > 1:
-                # This is a merge commit, try to get the original branch name from the message
-                original_branch = self._get_original_branch_from_merge_message(commit['commit']['message'])
-                if original_branch:
-                    commit_branch_name = original_branch
-
-            commit_list.append(
-                CommitMDDTO(
-                    sha=commit['sha'],
-                    repo_name=repo,
-                    repo_id=repo_id,
-                    owner_name=owner,
-                    branch_sha=commit_branch_name,
-                    author_github_id=author_id,
-                    author_name=author_name,
-                    author_email=author_email,
-                    commit_datetime=datetime.fromisoformat(commit['commit']['author']['date'].replace('Z', '+00:00')),
-                    commit_msg=commit['commit']['message']
-                )
-            )
-
-        # Debug line
-        current_app.logger.debug(f"DEBUG: Found {len(commit_list)} commits.")
-        return CommitListDTO(commitList=commit_list)
+        for commits_data in self._paginate_rest(commits_endpoint, token, params=params):
+            for commit in commits_data:
+                yield self._commit_dto_from_rest(commit, repo_id, owner, repo, branch)
+
+    def _commit_dto_from_rest(self, commit: dict, repo_id: int, owner: str, repo: str, branch: str) -> CommitMDDTO:
+        """Builds a CommitMDDTO from one item of the REST /commits list."""
+        # Check if author is a valid user and not a bot or a ghost user
+        author_id = commit['author']['id'] if commit.get('author') and commit['author'].get('id') else None
+        author_name = commit['author']['login'] if commit.get('author') and commit['author'].get('login') else commit['commit']['author']['name']
+        author_email = commit['commit']['author']['email']
+        
+        # In some cases, the commit is not associated with a GitHub user account
+        if author_id is None:
+            current_app.logger.debug(f"Warning: Commit {commit['sha']} has no valid GitHub user account ID.")
         
+        # Determine the correct branch name for the commit
+        commit_branch_name = branch
+        if len(commit['parents']) > 1:
+            # This is a merge commit, try to get the original branch name from the message
+            original_branch = self._get_original_branch_from_merge_message(commit['commit']['message'])
+            if original_branch:
+                commit_branch_name = original_branch
+
+        return CommitMDDTO(
+            sha=commit['sha'],
+            repo_name=repo,
+            repo_id=repo_id,
+            owner_name=owner,
+            branch_sha=commit_branch_name,
+            author_github_id=author_id,
+            author_name=author_name,
+            author_email=author_email,
+            commit_datetime=datetime.fromisoformat(commit['commit']['author']['date'].replace('Z', '+00:00')),
+            commit_msg=commit['commit']['message']
+        )
+
 
     def getCommitMsgs2(self, repo_id: int, token: str, branch: str, startdatetime: str, enddatetime: str) -> CommitListDTO:
         """
         Returns a list of commit messages for a given branch within a time range using GraphQL
         for more accurate branch association. This version is more robust.
         """
+        return CommitListDTO(commitList=list(self.iterCommitMsgs2(repo_id, token, branch, startdatetime, enddatetime)))
+
+    def iterCommitMsgs2(self, repo_id: int, token: str, branch: str, startdatetime: str, enddatetime: str,
+                        page_size: int | None = None) -> Iterator[CommitMDDTO]:
+        """
+        Streaming version of getCommitMsgs2.
+        Yields CommitMDDTOs newest first, one GraphQL history page at a time, following `pageInfo`.
+        """
         repo_dto = self.getSingleRepoByID(token, repo_id)
         if not repo_dto:
             current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found.")
-            return CommitListDTO(commitList=[])
+            return
 
         owner = repo_dto.github_owner_login
         repo = repo_dto.github_name
@@ -282,165 +439,46 @@ class GithubService:
             until_dt = datetime.fromisoformat(enddatetime.replace('Z', '+00:00'))
         except ValueError as e:
             print(f"ERROR: Invalid datetime format in getCommitMsgs2. {e}")
-            return CommitListDTO(commitList=[])
-
-        query = """
-        query($owner: String!, $repo: String!, $branch: String!, $since: GitTimestamp, $until: GitTimestamp) {
-        repository(owner: $owner, name: $repo) {
-            ref(qualifiedName: $branch) {
-            target {
-                ... on Commit {
-                history(since: $since, until: $until) {
-                    edges {
-                    node {
-                        oid
-                        message
-                        author {
-                        name
-                        email
-                        user {
-                            databaseId
-                            login
-                        }
-                        }
-                        committedDate
-                        associatedPullRequests(first: 1) {
-                        nodes {
-                            headRefName
-                        }
-                        }
-                    }
-                    }
-                }
-                }
-            }
-            }
-        }
-        }
-        """
-
-        variables = {
-            "owner": owner,
-            "repo": repo,
-            "branch": branch,
-            "since": since_dt.isoformat(),
-            "until": until_dt.isoformat()
-        }
+            return
 
-        result = self._execute_graphql(query, variables, token)
-        commit_list = []
+        mirrored = self.iterMirroredCommits(token, repo_id, owner, repo, branch, since_dt, until_dt, flavor="graphql")
+        if mirrored is not None:
+            yield from mirrored
+            return
 
-        if result.get("data") and result["data"].get("repository") and result["data"]["repository"].get("ref"):
-            history = result["data"]["repository"]["ref"]["target"]["history"]["edges"]
-            for edge in history:
-                commit_node = edge["node"]
-                
-                author_data = commit_node.get("author", {})
-                user_data = author_data.get("user") if author_data and author_data.get("user") else {}
+        for commit_node in self._iter_history_nodes(token, owner, repo, branch, since_dt, until_dt, page_size=page_size):
+            yield commit_dto_from_graphql(commit_node, repo_id, owner, repo, branch)
 
-                author_id = user_data.get("databaseId") if user_data else None
-                author_name = user_data.get("login") if user_data else author_data.get("name")
-                
-                commit_branch_name = branch
-                
-                pull_requests = commit_node.get("associatedPullRequests", {}).get("nodes", [])
-                if pull_requests:
-                    commit_branch_name = pull_requests[0]["headRefName"]
-
-                commit_list.append(
-                    CommitMDDTO(
-                        sha=commit_node['oid'],
-                        repo_name=repo,
-                        repo_id=repo_id,
-                        owner_name=owner,
-                        branch_sha=commit_branch_name,
-                        author_github_id=author_id,
-                        author_name=author_name,
-                        author_email=author_data.get("email"),
-                        commit_datetime=datetime.fromisoformat(commit_node['committedDate'].replace('Z', '+00:00')),
-                        commit_msg=commit_node['message']
-                    )
-                )
-
-        return CommitListDTO(commitList=commit_list)
+    def iterMirroredCommits(self, token: str, repo_id: int, owner: str, repo: str, branch: str,
+                            start_dt: datetime, end_dt: datetime, flavor: str) -> Optional[Iterator[CommitMDDTO]]:
+        """
+        Commits of the range from the local git clone or the commit mirror, newest first.
+        Returns None when neither serves the repository, so the caller asks GitHub directly.
+        """
+        mirrored = self.local_git.iter_commits(token, repo_id, owner, repo, branch, start_dt, end_dt, flavor=flavor)
+        if mirrored is None:
+            mirrored = self.commit_mirror.iter_commits(token, repo_id, owner, repo, branch, start_dt, end_dt, flavor=flavor)
+        return mirrored
+
+    def _iter_history_nodes(self, token: str, owner: str, repo: str, branch: str,
+                            since_dt: datetime | None, until_dt: datetime | None,
+                            node_fields: str = HISTORY_COMMIT_FIELDS, page_size: int | None = None) -> Iterator[dict]:
+        """
+        Yields raw commit nodes of a branch history (newest first), following the GraphQL cursor.
+        `node_fields` is the selection set requested for each commit node.
+        """
+        query = HISTORY_QUERY_TEMPLATE % node_fields
+        variables = history_variables(owner, repo, branch, since_dt, until_dt, clamp_page_size(page_size, self.commit_page_size))
+
+        while True:
+            nodes, cursor = history_page(self._execute_graphql(query, variables, token))
+            yield from nodes
+            if cursor is None:
+                return
+            variables["cursor"] = cursor
     
     
     
-    def _get_sha_by_datetime_after_merge(self, token: str, owner: str, repo: str, merged_into_branch: str, source_branch: str, target_datetime: datetime) -> Optional[str]:
-        """
-        Finds the latest commit SHA from a source branch that was merged into another
-        branch, before a specific datetime.
-        
-        This function searches for the merge commit on the target branch.
-        
-        :param token: GitHub Personal Access Token.
-        :param owner: The repository owner.
-        :param repo: The repository name.
-        :param merged_into_branch: The branch the source branch was merged into (e.g., 'main').
-        :param source_branch: The branch that was merged (e.g., 'feature/my-new-feature').
-        :param target_datetime: The datetime to search commits until.
-        :return: The SHA of the commit from the source branch, or None if not found.
-        """
-        try:
-            # A merge commit usually has a message like "Merge pull request #<number> from <source_branch>"
-            # or "Merge branch '<source_branch>' into '<target_branch>'".
-            # We can use this pattern to filter.
-            merge_commit_message_pattern = f"Merge pull request from {source_branch}"
-            current_app.logger.debug('merge_commit_message_pattern') 
-            params = {
-                "sha": merged_into_branch,
-                "until": target_datetime.isoformat(),
-                "per_page": 50  # We need to look through more than one commit.
-            }
-            
-            commits_endpoint = f"/repos/{owner}/{repo}/commits"
-            
-            # Use a loop to handle pagination, as the merge commit might not be in the first page.
-            # This is a simplified example, a full implementation would need proper pagination.
-            page = 1
-            while True:
-                params['page'] = page
-                commits_data = self._make_request("GET", commits_endpoint, token, params=params)
-                
-                if not commits_data:
-                    # No more commits to fetch
-                    current_app.logger.debug(f"DEBUG: No more commits found on branch '{merged_into_branch}'.")
-                    break
-                
-                for commit in commits_data:
-                    # A merge commit has more than one parent
-                    if len(commit['parents']) > 1:
-                        commit_message = commit['commit']['message']
-                        # Check if the commit message contains the source branch name
-                        # Note: This is a fragile check. A more robust solution might use
-                        # a dedicated API endpoint or more sophisticated parent analysis.
-                        if source_branch in commit_message:
-                            current_app.logger.debug(f"DEBUG: Found merge commit '{commit['sha']}' for branch '{source_branch}'.")
-                            
-                            # The second parent of the merge commit is the head of the merged branch.
-                            # This is a common convention but can vary.
-                            if len(commit['parents']) > 1:
-                                return commit['parents'][1]['sha']
-
-                # If we went through a full page and didn't find the commit, get the next page.
-                if len(commits_data) < 50:
-                    break
-                page += 1
-
-            current_app.logger.debug(f"Warning: No merge commit found for branch '{source_branch}' merged into '{merged_into_branch}' before '{target_datetime.isoformat()}'.")
-            return None
-
-        except requests.exceptions.RequestException as e:
-            current_app.logger.debug(f"ERROR: GitHub API request failed with status code {e.response.status_code}")
-            current_app.logger.debug(f"ERROR: Response body: {e.response.text}")
-            return None
-        except Exception as e:
-            current_app.logger.debug(f"ERROR: An unexpected error occurred: {e}")
-            return None 
-
-
- 
-
     def getDiffByTime(self, user: str, token: str, owner: str, repo: str, branch: str, beforeDatetime: datetime, afterDatetime: datetime) -> DiffDTO | None:
         """
         Difference between two points in time on a given branch.
@@ -471,84 +509,89 @@ class GithubService:
     def getDiffBySHA(self, user: str, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> DiffDTO:
         '''
         Difference between two commits by two SHAs.
+        Results for two full SHAs are immutable and served from the persistent compare cache.
+        The cache is shared between tokens: callers resolve repository access first (getSingleRepoByID).
         '''
-        diff_data = self._make_request("GET", f"/repos/{owner}/{repo}/compare/{shaBefore}...{shaAfter}", token)
-        
-        files = [PatchFileDTO(
-            filename=file['filename'],
-            status=file['status'],
-            additions=file['additions'],
-            deletions=file['deletions'],
-            changes=file['changes'],
-            patch=file.get('patch', '')
-        ) for file in diff_data.get('files', [])]
-
-        return DiffDTO(
-            repo_name=repo,
-            repo_id=0,
-            owner_name=owner,
-            branch_before=shaBefore,
-            branch_after=shaAfter,
-            commit_before_sha=diff_data['base_commit']['sha'],
-            commit_after_sha=diff_data['merge_base_commit']['sha'],
-            files=files
-        )
+        cached = self.compare_cache.get(owner, repo, shaBefore, shaAfter)
+        if cached is not None:
+            current_app.logger.debug(f"DEBUG: Compare {shaBefore[:7]}...{shaAfter[:7]} served from cache.")
+            return cached
 
-    def _fetch_codebase_snapshot(self, owner: str, repo_name: str, token: str, expression: str) -> CodebaseDTO:
-        """
-        Internal helper to retrieve a codebase snapshot using GraphQL based on an expression (branch or SHA).
-        """
-        TREE_QUERY = """
-        query GetRepositoryTree($owner: String!, $name: String!, $expression: String!) {
-          repository(owner: $owner, name: $name) {
-            object(expression: $expression) {
-              ... on Tree {
-                entries {
-                  name
-                  path
-                  type
-                  object {
-                    ... on Blob {
-                      byteSize
-                      text
-                    }
-                  }
-                }
-              }
-            }
-          }
-        }
+        diff_dto, files = self._iter_diff_by_sha(token, owner, repo, shaBefore, shaAfter)
+        diff_dto.files = list(files)
+        try:
+            self.compare_cache.put(owner, repo, shaBefore, shaAfter, diff_dto)
+        except OSError as e:
+            current_app.logger.debug(f"Warning: Could not write compare result to the cache: {e}")
+        return diff_dto
+
+    def iterDiffBySHA(self, user: str, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> tuple[DiffDTO, Iterator[PatchFileDTO]]:
+        '''
+        Streaming version of getDiffBySHA.
+        Returns the DiffDTO header (with an empty file list) and a lazy iterator over the changed files.
+        '''
+        cached = self.compare_cache.get(owner, repo, shaBefore, shaAfter)
+        if cached is not None:
+            files = cached.files
+            cached.files = []
+            return cached, iter(files)
+        return self._iter_diff_by_sha(token, owner, repo, shaBefore, shaAfter)
+
+    def _iter_diff_by_sha(self, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> tuple[DiffDTO, Iterator[PatchFileDTO]]:
+        local = self.iterLocalDiff(token, owner, repo, shaBefore, shaAfter)
+        if local is not None:
+            return local
+
+        diff_data = self.diff_assembler.fetch_first_page(token, owner, repo, shaBefore, shaAfter)
+        diff_dto = diff_header_from_compare(owner, repo, shaBefore, shaAfter, diff_data)
+        return diff_dto, self.diff_assembler.iter_files(token, owner, repo, shaBefore, shaAfter, diff_data)
+
+    def iterLocalDiff(self, token: str, owner: str, repo: str, shaBefore: str, shaAfter: str) -> Optional[tuple[DiffDTO, Iterator[PatchFileDTO]]]:
         """
-        variables = {"owner": owner, "name": repo_name, "expression": expression}
-        tree_data = self._execute_graphql(TREE_QUERY, variables, token)
-        
-        parsed_files = []
-        entries = tree_data.get('data', {}).get('repository', {}).get('object', {}).get('entries', [])
+        Diff from the local git clone, or None when the repository is not served locally.
+        If git fails while the files are streamed, the rest of the files come from GitHub.
+        """
+        def github_files():
+            first_page = self.diff_assembler.fetch_first_page(token, owner, repo, shaBefore, shaAfter)
+            return self.diff_assembler.iter_files(token, owner, repo, shaBefore, shaAfter, first_page)
 
-        for entry in entries:
-            if entry['type'] == 'blob' and entry['object'] and entry['object'].get('text') is not None:
-                parsed_files.append(CodeFileDTO(
-                    filename=entry['name'],
-                    path=entry['path'],
-                    code_content=entry['object']['text'],
-                    last_modified_at=datetime.now() 
-                ))
+        return self.local_git.diff(token, owner, repo, shaBefore, shaAfter, fallback=github_files)
 
-        return CodebaseDTO(repository_name=f"{owner}/{repo_name}", files=parsed_files)
+    def _fetch_codebase_snapshot(self, owner: str, repo_name: str, token: str, revision: str, mode: str | None = None) -> CodebaseDTO:
+        """
+        Internal helper to retrieve a full (recursive) codebase snapshot of a revision (branch or SHA).
+        Repos served by the local git backend are read from their bare clone unless a mode is forced.
+        """
+        local = self.local_git.iter_snapshot(
+            token, owner, repo_name, revision, fallback=lambda: self.snapshot_engine.iter_snapshot(token, owner, repo_name, revision)
+        ) if mode is None else None
+        if local is not None:
+            return CodebaseDTO(repository_name=f"{owner}/{repo_name}", files=sorted(local, key=lambda f: f.path))
+        return self.snapshot_engine.snapshot(token, owner, repo_name, revision, mode=mode)
 
     def getSnapshotByTime(self, user: str, token: str, owner: str, repo: str, branch: str, time: datetime) -> CodebaseDTO:
         '''
         Gets a snapshot of the repository at a specific time. Simplified for now.
         '''
-        expression = f"{branch}:"
-        return self._fetch_codebase_snapshot(owner, repo, token, expression)
+        return self._fetch_codebase_snapshot(owner, repo, token, branch)
 
-    def getSnapshotBySHA(self, user: str, token: str, owner: str, repo: str, sha: str) -> CodebaseDTO:
+    def getSnapshotBySHA(self, user: str, token: str, owner: str, repo: str, sha: str, mode: str | None = None) -> CodebaseDTO:
         '''
         Gets a snapshot of the repository at a specific commit SHA.
+        mode: "api" (tree + batched blobs), "archive" (tarball stream), "auto" or None for the repo's configured mode.
         '''
-        expression = f"{sha}:"
-        return self._fetch_codebase_snapshot(owner, repo, token, expression)
+        return self._fetch_codebase_snapshot(owner, repo, token, sha, mode=mode)
+
+    def iterSnapshotBySHA(self, user: str, token: str, owner: str, repo: str, sha: str, mode: str | None = None) -> Iterator[CodeFileDTO]:
+        '''
+        Streaming version of getSnapshotBySHA. Files are yielded as soon as they are downloaded/extracted.
+        '''
+        local = self.local_git.iter_snapshot(
+            token, owner, repo, sha, fallback=lambda: self.snapshot_engine.iter_snapshot(token, owner, repo, sha)
+        ) if mode is None else None
+        if local is not None:
+            return local
+        return self.snapshot_engine.iter_snapshot(token, owner, repo, sha, mode=mode)
 
 
 
@@ -558,25 +601,46 @@ class GithubService:
     def getSingleRepoByID(self, token: str, repo_id: int) -> RepoDTO:
         """
         Fetches a single repository by its GitHub ID.
+        Results (including 404s) are cached per token for GITHUB_REPO_CACHE_TTL seconds.
         """
+        cache_key = repo_cache_key(token, repo_id)
+        if cache_key is None:
+            current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found. (invalid ID)")
+            return None
+        cached = self.repo_cache.get(cache_key)
+        if cached is not TTLCache.MISSING:
+            if cached is None:
+                current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found. (cached)")
+            return cached
+
         try:
             repo_data = self._make_request("GET", f"/repositories/{repo_id}", token)
-            return RepoDTO(
-                github_id=repo_data['id'],
-                github_node_id=repo_data['node_id'],
-                github_name=repo_data['name'],
-                github_owner_id=repo_data['owner']['id'],
-                github_owner_login=repo_data['owner']['login'],
-                github_html_url=repo_data['html_url'],
-                github_url=repo_data['url'],
-                github_full_name=repo_data['full_name'],
-                description=repo_data.get('description')
-            )
+            repo_dto = repo_dto_from_rest(repo_data)
+            self.repo_cache.set(cache_key, repo_dto)
+            return repo_dto
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 current_app.logger.debug(f"Warning: Repository with ID {repo_id} not found.")
+                self.repo_cache.set(cache_key, None)
                 return None
             raise
+
+    def invalidateRepo(self, repo_id: int, token: str | None = None) -> int:
+        """
+        Drops cached metadata of a repository, for one token or for every token.
+        Returns the number of removed entries.
+        """
+        repo_id = int(repo_id)
+        if token is not None:
+            return int(self.repo_cache.invalidate((token_fingerprint(token), repo_id)))
+        return self.repo_cache.invalidate_where(lambda key: key[1] == repo_id)
+    
+    def invalidateMergedPullRequests(self, owner: str, repo: str) -> int:
+        """
+        Drops the cached merged pull request lists of a repository (every token and branch pair).
+        """
+        owner, repo = owner.lower(), repo.lower()
+        return self.merged_pr_cache.invalidate_where(lambda key: key[1] == owner and key[2] == repo)
     
     def getBranchesByRepoId(self, token: str, repo_id: int,user: str=None) -> BranchListDTO:
         """
@@ -589,23 +653,7 @@ class GithubService:
         owner = repo_dto.github_owner_login
         repo_name = repo_dto.github_name
         
-        branches_data = self._make_request("GET", f"/repos/{owner}/{repo_name}/branches", token)
-        
-        branch_list = []
-        for branch in branches_data:
-            commit_sha = branch['commit']['sha']
-            commit_data = self._make_request("GET", f"/repos/{owner}/{repo_name}/commits/{commit_sha}", token)
-            last_modification_str = commit_data['commit']['author']['date']
-            
-            branch_list.append(BranchDTO(
-                repo_id=repo_id, 
-                repo_name=repo_name,
-                owner_name=owner,
-                branch_name=branch['name'],
-                last_modification=datetime.fromisoformat(last_modification_str.replace('Z', '+00:00'))
-            ))
-            
-        return BranchListDTO(branchList=branch_list)
+        return BranchListDTO(branchList=self._list_branches(token, owner, repo_name, repo_id=repo_id))
     
 
     # Added 20250913
@@ -617,11 +665,80 @@ class GithubService:
         """
         Finds the latest commit SHA from a source branch that was merged into another
         branch, before a specific datetime.
-        
-        This function searches for a merge commit on the target branch.
+
+        Merged pull requests are looked up by head/base branch with one GraphQL request.
+        Branches merged without a pull request fall back to scanning merge commits.
+        """
+        try:
+            merged_prs = self._get_merged_pull_requests(token, owner, repo, merged_into_branch, source_branch)
+        except requests.exceptions.RequestException as e:
+            current_app.logger.debug(f"Warning: Merged pull request lookup failed, scanning merge commits instead: {e}")
+            merged_prs = []
+        # Naive datetimes are read as UTC, like the `until` parameter of the REST API.
+        cutoff = target_datetime if target_datetime.tzinfo else target_datetime.replace(tzinfo=timezone.utc)
+        for merged_at, head_oid in merged_prs:
+            if merged_at <= cutoff:
+                current_app.logger.debug(f"DEBUG: Found pull request from '{source_branch}' merged into '{merged_into_branch}' at {merged_at.isoformat()}.")
+                return head_oid
+        return self._scan_merge_commits(token, owner, repo, merged_into_branch, source_branch, target_datetime)
+
+    def _get_merged_pull_requests(self, token: str, owner: str, repo: str, base_branch: str, head_branch: str) -> List[tuple[datetime, str]]:
+        """
+        (mergedAt, headRefOid) of every pull request merged from head_branch into base_branch, newest first.
+        Cached per (token, repository, head branch, base branch) and independent of the requested datetime.
+        """
+        cache_key = (token_fingerprint(token), owner.lower(), repo.lower(), head_branch, base_branch)
+        cached = self.merged_pr_cache.get(cache_key)
+        if cached is not TTLCache.MISSING:
+            return cached
+
+        MERGED_PULL_REQUESTS_QUERY = """
+        query GetMergedPullRequests($owner: String!, $repo: String!, $head: String!, $base: String!, $cursor: String) {
+          repository(owner: $owner, name: $repo) {
+            pullRequests(headRefName: $head, baseRefName: $base, states: MERGED, first: 100, after: $cursor) {
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
+              nodes {
+                mergedAt
+                headRefOid
+                mergeCommit {
+                  oid
+                }
+              }
+            }
+          }
+        }
+        """
+        merged_prs = []
+        cursor = None
+        while True:
+            variables = {"owner": owner, "repo": repo, "head": head_branch, "base": base_branch, "cursor": cursor}
+            result = self._execute_graphql(MERGED_PULL_REQUESTS_QUERY, variables, token)
+            pull_requests = ((result.get("data") or {}).get("repository") or {}).get("pullRequests")
+            if not pull_requests:
+                break
+            for node in pull_requests["nodes"]:
+                if not node.get("mergedAt") or not node.get("mergeCommit"):
+                    continue
+                merged_at = datetime.fromisoformat(node["mergedAt"].replace('Z', '+00:00'))
+                merged_prs.append((merged_at, node["headRefOid"]))
+            if not pull_requests["pageInfo"]["hasNextPage"]:
+                break
+            cursor = pull_requests["pageInfo"]["endCursor"]
+
+        merged_prs.sort(key=lambda pr: pr[0], reverse=True)
+        self.merged_pr_cache.set(cache_key, merged_prs)
+        return merged_prs
+
+    def _scan_merge_commits(self, token: str, owner: str, repo: str, merged_into_branch: str, source_branch: str, target_datetime: datetime) -> Optional[str]:
+        """
+        Searches the target branch for a merge commit that mentions the source branch.
+        Used for branches merged without a pull request.
         """
         # Debug line
-        current_app.logger.debug(f"DEBUG: Entering _get_sha_by_datetime_after_merge. Source branch: {source_branch}, Merged into: {merged_into_branch}, Until datetime: {target_datetime.isoformat()}")
+        current_app.logger.debug(f"DEBUG: Entering _scan_merge_commits. Source branch: {source_branch}, Merged into: {merged_into_branch}, Until datetime: {target_datetime.isoformat()}")
         try:
             params = {
                 "sha": merged_into_branch,
@@ -722,9 +839,12 @@ class GithubService:
         """
         Finds the latest commit SHA on a branch before a specific datetime.
         
-        This function uses a simple approach: it queries the GitHub API for the latest
-        commit up to the target_datetime.
+        Answered from the branch timeline when possible. Otherwise it queries the GitHub API
+        for the latest commit up to the target_datetime.
         """
+        sha = self.commit_timeline.sha_until(token, owner, repo, branch, target_datetime)
+        if sha is not None:
+            return sha
         try:
             params = {
                 "sha": branch,
@@ -757,7 +877,11 @@ class GithubService:
     def _get_first_commit_sha_after_datetime(self, token: str, owner: str, repo: str, branch: str, target_datetime: datetime) -> Optional[str]:
         """
         Finds the first commit SHA on a branch after a specific datetime.
+        Like the REST query below, the branch timeline returns the newest commit since the datetime.
         """
+        sha = self.commit_timeline.sha_since(token, owner, repo, branch, target_datetime)
+        if sha is not None:
+            return sha
         try:
             params = {
                 "sha": branch,
@@ -784,6 +908,25 @@ class GithubService:
         Corrects the SHA finding logic.
         """
         current_app.logger.debug("DEBUG: Starting getDiffByIdTime2 function.")
+        plan = self._plan_diff_by_id_time2(user_token, repo_id, branch_from, branch_to, datetime_from, datetime_to, default_merged_branch)
+        return self._run_diff_plan(user_token, plan)
+
+    def iterDiffByIdTime2(self, user_token: str, repo_id: int, branch_from: str, branch_to: str,
+                          datetime_from: datetime, datetime_to: datetime,
+                          default_merged_branch: str = 'main') -> Optional[tuple[DiffDTO, Iterator[PatchFileDTO]]]:
+        """
+        Streaming version of getDiffByIdTime2.
+        Returns the DiffDTO header (with an empty file list) and a lazy iterator over the changed files, or None.
+        """
+        plan = self._plan_diff_by_id_time2(user_token, repo_id, branch_from, branch_to, datetime_from, datetime_to, default_merged_branch)
+        return self._run_diff_plan(user_token, plan, stream=True)
+
+    def _plan_diff_by_id_time2(self, user_token: str, repo_id: int, branch_from: str, branch_to: str,
+                               datetime_from: datetime, datetime_to: datetime,
+                               default_merged_branch: str) -> Optional[tuple[DiffDTO, Optional[tuple[str, str]]]]:
+        """
+        Resolves the SHAs compared by getDiffByIdTime2. See _run_diff_plan for the returned plan.
+        """
         repo_dto = self.getSingleRepoByID(user_token, repo_id)
         if not repo_dto:
             current_app.logger.debug("Error: Repository not found.")
@@ -825,17 +968,43 @@ class GithubService:
                 commit_before_sha=shaBefore,
                 commit_after_sha=shaAfter,
                 files=[]
-            )
+            ), None
+
+        header = DiffDTO(
+            repo_name=repo_name,
+            repo_id=repo_id,
+            owner_name=owner,
+            branch_before=branch_from,
+            branch_after=branch_to,
+            commit_before_sha=shaBefore,
+            commit_after_sha=shaAfter,
+            files=[]
+        )
+        return header, (shaBefore, shaAfter)
+
+    def _run_diff_plan(self, user_token: str, plan: Optional[tuple[DiffDTO, Optional[tuple[str, str]]]], stream: bool = False):
+        """
+        Finishes a diff planned by _plan_diff_by_id_time2 / _plan_diff_by_id_time3.
+        A plan is None (nothing to compare), (final DiffDTO, None) when no compare is needed,
+        or (header, (shaBefore, shaAfter)). The compare result is relabelled with the header's
+        repo id and branches. Returns a DiffDTO, or (header, file iterator) when streaming.
+        """
+        if plan is None:
+            return None
+        header, shas = plan
+        if shas is None:
+            return (header, iter(())) if stream else header
+
+        if stream:
+            diff_dto, files = self.iterDiffBySHA("user_placeholder", user_token, header.owner_name, header.repo_name, *shas)
+        else:
+            diff_dto, files = self.getDiffBySHA("user_placeholder", user_token, header.owner_name, header.repo_name, *shas), None
 
-        diff_dto = self.getDiffBySHA("user_placeholder", user_token, owner, repo_name, shaBefore, shaAfter)
-        
         if diff_dto:
-            diff_dto.repo_id = repo_id
-            diff_dto.branch_before = branch_from
-            diff_dto.branch_after = branch_to
+            relabel_diff(diff_dto, header)
             current_app.logger.debug("DEBUG: Successfully generated DiffDTO.")
-        
-        return diff_dto
+
+        return (diff_dto, files) if stream else diff_dto
     
     def getSnapshotByIdDatetime(self, token: str, repo_id: int, branch: str, time: datetime) -> Optional[CodebaseDTO]:
         '''
@@ -852,7 +1021,40 @@ class GithubService:
             return None
         
         return self.getSnapshotBySHA(user=None, token=token, owner=owner, repo=repo_name, sha=sha)
+
+    def iterSnapshotByIdDatetime(self, token: str, repo_id: int, branch: str, time: datetime) -> Optional[Iterator[CodeFileDTO]]:
+        '''
+        Streaming version of getSnapshotByIdDatetime. Returns None if the repository or the commit is not found.
+        '''
+        repo_dto = self.getSingleRepoByID(token, repo_id)
+        if not repo_dto:
+            return None
+        owner = repo_dto.github_owner_login
+        repo_name = repo_dto.github_name
+
+        sha = self._get_sha_by_datetime(token, owner, repo_name, branch, time)
+        if not sha:
+            return None
+
+        return self.iterSnapshotBySHA(user=None, token=token, owner=owner, repo=repo_name, sha=sha)
     
+    def _resolve_commit_range(self, token: str, owner: str, repo: str, branch: str,
+                              datetime_from: datetime, datetime_to: datetime) -> Optional[tuple]:
+        """
+        Resolves (newest sha, oldest sha, parent sha of the oldest) of a branch history range
+        from a single GraphQL history query that requests `parents(first: 1)`.
+        Returns None when the range has no commit. The parent is None for a root commit.
+        """
+        newest_node = None
+        oldest_node = None
+        for node in self._iter_history_nodes(token, owner, repo, branch, datetime_from, datetime_to,
+                                             node_fields=RANGE_COMMIT_FIELDS):
+            if newest_node is None:
+                newest_node = node
+            oldest_node = node
+
+        return commit_range_from_nodes(newest_node, oldest_node)
+
     def getDiffByIdTime3(self, user_token: str, repo_id: int, branch: str, 
                         datetime_from: datetime, datetime_to: datetime) -> Optional[DiffDTO]:
         """
@@ -862,6 +1064,23 @@ class GithubService:
         period on that specific branch are included.
         """
         current_app.logger.debug(f"{datetime.now()} DEBUG: Starting getDiffByIdTime3 function.")
+        plan = self._plan_diff_by_id_time3(user_token, repo_id, branch, datetime_from, datetime_to)
+        return self._run_diff_plan(user_token, plan)
+
+    def iterDiffByIdTime3(self, user_token: str, repo_id: int, branch: str,
+                          datetime_from: datetime, datetime_to: datetime) -> Optional[tuple[DiffDTO, Iterator[PatchFileDTO]]]:
+        """
+        Streaming version of getDiffByIdTime3.
+        Returns the DiffDTO header (with an empty file list) and a lazy iterator over the changed files, or None.
+        """
+        plan = self._plan_diff_by_id_time3(user_token, repo_id, branch, datetime_from, datetime_to)
+        return self._run_diff_plan(user_token, plan, stream=True)
+
+    def _plan_diff_by_id_time3(self, user_token: str, repo_id: int, branch: str,
+                               datetime_from: datetime, datetime_to: datetime) -> Optional[tuple[DiffDTO, Optional[tuple[str, str]]]]:
+        """
+        Resolves the SHAs compared by getDiffByIdTime3. See _run_diff_plan for the returned plan.
+        """
         repo_dto = self.getSingleRepoByID(user_token, repo_id)
         if not repo_dto:
             current_app.logger.debug("Error: Repository not found.")
@@ -871,82 +1090,15 @@ class GithubService:
         repo_name = repo_dto.github_name
         current_app.logger.debug(f"DEBUG: Found repository '{repo_name}' owned by '{owner}'.")
 
-        # Use getCommitMsgs2 to get an accurate commit history for the branch in the time range
-        commits_in_range_dto = self.getCommitMsgs2(
-            repo_id=repo_id,
-            token=user_token,
-            branch=branch,
-            startdatetime=datetime_from.isoformat(),
-            enddatetime=datetime_to.isoformat()
-        )
-
-        # If no commits are found, it means there was no activity in the given range.
-        if not commits_in_range_dto or not commits_in_range_dto.commitList:
-            current_app.logger.debug("DEBUG: No commits found in the specified time range on this branch.")
-            return DiffDTO(
-                repo_name=repo_name,
-                repo_id=repo_id,
-                owner_name=owner,
-                branch_before=branch,
-                branch_after=branch,
-                commit_before_sha="",
-                commit_after_sha="",
-                files=[]
-            )
-
-        # getCommitMsgs2 returns commits in descending order (newest first).
-        shaAfter = commits_in_range_dto.commitList[0].sha
-        oldest_commit_in_range_sha = commits_in_range_dto.commitList[-1].sha
-
+        # One lightweight GraphQL history query resolves the newest commit, the oldest commit
+        # and the oldest commit's parent. Only pages on ranges with more than 100 commits.
         try:
-            # We need to find the parent of the oldest commit to create a diff
-            # representing all the work done in the specified time range.
-            commit_details = self._make_request("GET", f"/repos/{owner}/{repo_name}/commits/{oldest_commit_in_range_sha}", user_token)
-            
-            if not commit_details.get('parents'):
-                current_app.logger.debug(f"Warning: The oldest commit in range {oldest_commit_in_range_sha} has no parents (it might be the first commit).")
-                # In this case, we'll compare from the commit itself, which might not show all changes if it's not the absolute first commit.
-                # A better approach could be to use the empty tree SHA, but for simplicity, we'll diff against itself which results in an empty diff.
-                # Or diff against its own sha~1 if possible. Let's get the parent.
-                return DiffDTO(
-                    repo_name=repo_name, repo_id=repo_id, owner_name=owner,
-                    branch_before=branch, branch_after=branch,
-                    commit_before_sha=oldest_commit_in_range_sha, commit_after_sha=shaAfter,
-                    files=[] # This will likely be empty. A more advanced implementation might be needed if this is a common case.
-                )
-
-            shaBefore = commit_details['parents'][0]['sha']
-
+            resolved = self._resolve_commit_range(user_token, owner, repo_name, branch, datetime_from, datetime_to)
         except requests.exceptions.RequestException as e:
-            current_app.logger.debug(f"ERROR: Failed to fetch commit details to find parent SHA: {e}")
+            current_app.logger.debug(f"ERROR: Failed to resolve the commit range: {e}")
             return None
 
-
-        current_app.logger.debug(f"DEBUG: Found SHA_before (parent of first commit in range): {shaBefore}")
-        current_app.logger.debug(f"DEBUG: Found SHA_after (last commit in range): {shaAfter}")
-
-        if shaBefore == shaAfter:
-            current_app.logger.debug("Warning: The start and end commits for the diff are the same.")
-            return DiffDTO(
-                repo_name=repo_name,
-                repo_id=repo_id,
-                owner_name=owner,
-                branch_before=branch,
-                branch_after=branch,
-                commit_before_sha=shaBefore,
-                commit_after_sha=shaAfter,
-                files=[]
-            )
-
-        diff_dto = self.getDiffBySHA("user_placeholder", user_token, owner, repo_name, shaBefore, shaAfter)
-        
-        if diff_dto:
-            diff_dto.repo_id = repo_id
-            diff_dto.branch_before = branch
-            diff_dto.branch_after = branch
-            current_app.logger.debug("DEBUG: Successfully generated DiffDTO.")
-        
-        return diff_dto    
+        return plan_range_diff(repo_id, owner, repo_name, branch, resolved)
     
     
     
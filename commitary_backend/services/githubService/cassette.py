@@ -0,0 +1,188 @@
+import atexit
+import base64
+import gzip
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+
+
+# Record / replay of the GitHub traffic of GithubService, for deterministic performance tests.
+# A cassette is a gzip file of JSON lines: one header line, then one line per HTTP exchange.
+
+CASSETTE_VERSION = 1
+
+# Response headers the service reads. Everything else (cookies, request ids ...) is dropped.
+KEPT_RESPONSE_HEADERS = (
+    "content-type", "etag", "last-modified", "link", "retry-after",
+    "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-used", "x-ratelimit-reset", "x-ratelimit-resource",
+)
+
+# GitHub token formats (classic, OAuth, user-to-server, server-to-server, refresh, fine-grained).
+TOKEN_PATTERN = re.compile(r"\b(?:gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,})\b")
+SCRUBBED_PARAMS = ("access_token", "client_id", "client_secret", "code")
+SCRUBBED = "<scrubbed>"
+
+
+class CassetteMissError(requests.exceptions.RequestException):
+    '''Replay mode received a request that is not in the cassette.'''
+
+
+class Cassette:
+    '''
+    Records the HTTP exchanges of GithubService to a compressed cassette, or serves them back.
+
+    - Record: every response that went through `_pooled_request` is stored with its elapsed time.
+      Authorization and other request headers are never written, credentials are scrubbed from queries
+      and bodies, and only the response headers the service reads are kept.
+    - Replay: requests are matched on method, path, query and JSON body, ignoring the host, so a
+      cassette recorded against api.github.com replays against any GITHUB_API_URL. Identical
+      requests are answered in recorded order; once they are used up the last answer repeats.
+      Replayed calls skip the network and the rate limit scheduler, and wait the recorded time
+      (`original`) or not at all (`zero`).
+
+    Record with a single worker process: exchanges are appended to one file.
+
+    Config (env):
+        GITHUB_CASSETTE_MODE    off | record | replay                                 (default off)
+        GITHUB_CASSETTE_PATH    cassette file, e.g. cassettes/big-repo.jsonl.gz       (required unless off)
+        GITHUB_CASSETTE_TIMING  replay delay: original | zero                         (default zero)
+        GITHUB_CASSETTE_SCRUB   extra comma separated regexes replaced in recorded bodies (e.g. e-mails)
+    '''
+
+    MODES = ("off", "record", "replay")
+
+    def __init__(self, mode: str | None = None, path: str | None = None, timing: str | None = None,
+                 scrub: list | None = None):
+        self.mode = (mode or os.getenv("GITHUB_CASSETTE_MODE", "off")).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"GITHUB_CASSETTE_MODE must be one of {self.MODES}, got '{self.mode}'")
+        self.path = path or os.getenv("GITHUB_CASSETTE_PATH", "")
+        if self.mode != "off" and not self.path:
+            raise ValueError("GITHUB_CASSETTE_PATH is required when GITHUB_CASSETTE_MODE is set")
+        self.timing = (timing or os.getenv("GITHUB_CASSETTE_TIMING", "zero")).lower()
+        extra = scrub if scrub is not None else [p for p in os.getenv("GITHUB_CASSETTE_SCRUB", "").split(",") if p]
+        self._scrub_patterns = [TOKEN_PATTERN] + [re.compile(p) for p in extra]
+        self._lock = threading.Lock()
+        self._file = None
+        self._interactions: Dict[Tuple, deque] = defaultdict(deque)
+        self._last: Dict[Tuple, dict] = {}
+        self._stats = {"recorded": 0, "replayed": 0, "repeated": 0, "misses": 0}
+        if self.mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    # ----- matching
+
+    @staticmethod
+    def request_key(method: str, url: str, params: Optional[dict] = None, json_body=None) -> Tuple:
+        parsed = urlparse(url)
+        query = parse_qsl(parsed.query, keep_blank_values=True)
+        query += [(str(k), str(v)) for k, v in (params or {}).items() if v is not None]
+        query = sorted((k, SCRUBBED if k in SCRUBBED_PARAMS else v) for k, v in query)
+        body = json.dumps(json_body, sort_keys=True, separators=(",", ":")) if json_body is not None else ""
+        return method.upper(), parsed.path.rstrip("/"), tuple(query), body
+
+    # ----- record
+
+    def record(self, method: str, url: str, kwargs: dict, response: requests.Response, elapsed: float):
+        content = response.content
+        if kwargs.get("stream"):
+            # Streaming callers (tarball) read response.raw; hand them the buffered body instead.
+            response.raw = io.BytesIO(content)
+        method, path, query, body = self.request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        entry = {
+            "method": method, "path": path, "query": query,
+            "body": self._scrub(body),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in KEPT_RESPONSE_HEADERS},
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            entry["text"] = self._scrub(content.decode("utf-8"))
+        except UnicodeDecodeError:
+            entry["base64"] = base64.b64encode(content).decode("ascii")
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = gzip.open(self.path, "wt", encoding="utf-8")
+                atexit.register(self.close)
+                self._file.write(json.dumps({"version": CASSETTE_VERSION,
+                                             "recorded_at": datetime.now(timezone.utc).isoformat()}) + "\n")
+            self._file.write(line)
+            self._stats["recorded"] += 1
+
+    def _scrub(self, text: str) -> str:
+        for pattern in self._scrub_patterns:
+            text = pattern.sub(SCRUBBED, text)
+        return text
+
+    def close(self):
+        '''Finishes the cassette file of a recording. Safe to call more than once.'''
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ----- replay
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('version')} in {self.path}")
+            for line in f:
+                entry = json.loads(line)
+                key = (entry["method"], entry["path"], tuple(tuple(p) for p in entry["query"]), entry["body"])
+                self._interactions[key].append(entry)
+
+    def replay(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        key = self.request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        key = key[:3] + (self._scrub(key[3]),)
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                entry = self._last[key] = queue.popleft()
+                self._stats["replayed"] += 1
+            elif key in self._last:
+                entry = self._last[key]
+                self._stats["repeated"] += 1
+            else:
+                self._stats["misses"] += 1
+                raise CassetteMissError(f"No recorded response for {key[0]} {key[1]} in {self.path}")
+        if self.timing == "original" and entry["elapsed"]:
+            time.sleep(entry["elapsed"])
+        return self._response(entry, url)
+
+    @staticmethod
+    def _response(entry: dict, url: str) -> requests.Response:
+        content = base64.b64decode(entry["base64"]) if "base64" in entry else entry["text"].encode("utf-8")
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response._content = content
+        response.raw = io.BytesIO(content)
+        response.headers.update(entry["headers"])
+        response.url = url
+        response.encoding = "utf-8"
+        response.request = requests.Request(entry["method"], url).prepare()
+        return response
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, mode=self.mode, pending=sum(len(q) for q in self._interactions.values()))
@@ -0,0 +1,375 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from flask import current_app
+from psycopg2.extras import execute_values
+
+from commitary_backend.dto.gitServiceDTO import CommitMDDTO
+
+
+COMMIT_MIRROR_DDL = '''
+CREATE TABLE IF NOT EXISTS "commit_mirror" (
+    repo_id BIGINT NOT NULL,
+    sha CHAR(40) NOT NULL,
+    parents TEXT[] NOT NULL,
+    author_github_id BIGINT,
+    author_login TEXT,
+    author_name TEXT,
+    author_email TEXT,
+    authored_at TIMESTAMPTZ,
+    committed_at TIMESTAMPTZ NOT NULL,
+    message TEXT NOT NULL,
+    pr_head_ref TEXT,
+    PRIMARY KEY (repo_id, sha)
+);
+
+CREATE TABLE IF NOT EXISTS "commit_mirror_branch" (
+    repo_id BIGINT NOT NULL,
+    branch TEXT NOT NULL,
+    sha CHAR(40) NOT NULL,
+    committed_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (repo_id, branch, sha)
+);
+
+CREATE INDEX IF NOT EXISTS commit_mirror_branch_time_idx
+    ON "commit_mirror_branch" (repo_id, branch, committed_at DESC);
+
+CREATE TABLE IF NOT EXISTS "commit_mirror_state" (
+    repo_id BIGINT NOT NULL,
+    branch TEXT NOT NULL,
+    head_sha CHAR(40),
+    covered_since TIMESTAMPTZ NOT NULL,
+    synced_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (repo_id, branch)
+);
+'''
+
+# Selection set of a commit node stored in the mirror. Covers both getCommitMsgs and getCommitMsgs2.
+MIRROR_COMMIT_FIELDS = """
+                    oid
+                    message
+                    committedDate
+                    parents(first: 10) {
+                    nodes {
+                        oid
+                    }
+                    }
+                    author {
+                    name
+                    email
+                    date
+                    user {
+                        databaseId
+                        login
+                    }
+                    }
+                    associatedPullRequests(first: 1) {
+                    nodes {
+                        headRefName
+                    }
+                    }
+"""
+
+
+def _parse_dt(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class CommitMirror:
+    '''
+    Local Postgres index of the commit history of registered repositories (rows of `repos`).
+
+    Each (repo, branch) keeps the last synced head SHA and the time `covered_since` from which
+    its history is complete. A read first syncs the branch:
+      - tail     : history from the branch tip down to the known head (usually one small request),
+      - backfill : only when the read starts before `covered_since`, the missing older window.
+    If the known head is not reachable any more (force push), the branch membership is rebuilt.
+    The requested range is then answered from the mirror.
+
+    Config (env):
+        GITHUB_COMMIT_MIRROR  1 enables the mirror when a database pool is configured (default 1)
+    '''
+
+    TAIL_PAGE_SIZE = 25
+    # Fetch rounds before a sync racing with other workers gives up (the read then falls back to GitHub).
+    SYNC_ATTEMPTS = 3
+
+    def __init__(self, service):
+        self.service = service
+        self.enabled = os.getenv("GITHUB_COMMIT_MIRROR", "1") == "1"
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        self._stats = {"reads": 0, "synced_commits": 0, "tail_syncs": 0, "backfills": 0, "rewrites": 0, "conflicts": 0, "errors": 0}
+
+    # ----- connection / schema
+
+    @contextmanager
+    def connection(self):
+        '''
+        Own connection of the app's pool, or None when the mirror cannot be used.
+        Not the request connection (`g.db_conn`): mirror commits must not commit the caller's transaction.
+        '''
+        if not self.enabled or "db_pool" not in current_app.extensions:
+            yield None
+            return
+        db_pool = current_app.extensions['db_pool']
+        conn = db_pool.getconn()
+        try:
+            if not self._schema_ready:
+                with conn.cursor() as cur:
+                    cur.execute(COMMIT_MIRROR_DDL)
+                conn.commit()
+                self._schema_ready = True
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db_pool.putconn(conn)
+
+    @staticmethod
+    def is_registered(conn, repo_id: int) -> bool:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM repos WHERE github_id = %s LIMIT 1", (repo_id,))
+            return cur.fetchone() is not None
+
+    # ----- sync
+
+    @staticmethod
+    def plan(state: Optional[Tuple[Optional[str], datetime]], since_dt: datetime) -> List[str]:
+        '''
+        Steps needed before the mirror can answer a read starting at `since_dt`.
+        state is (head_sha, covered_since) or None for a branch never synced.
+        '''
+        if state is None:
+            return ["full"]
+        _, covered_since = state
+        steps = ["tail"]
+        if since_dt < covered_since:
+            steps.append("backfill")
+        return steps
+
+    def sync(self, conn, token: str, repo_id: int, owner: str, repo: str, branch: str, since_dt: datetime):
+        '''
+        Brings the mirror of (repo_id, branch) up to date and complete from `since_dt`.
+        GitHub is read first, outside any transaction. The writes then run in one transaction under
+        the branch's advisory lock. If another worker changed the branch state in between, the
+        fetch is planned again from the new state.
+        '''
+        since_dt = _utc(since_dt)
+        for _ in range(self.SYNC_ATTEMPTS):
+            with conn.cursor() as cur:
+                state = self._read_state(cur, repo_id, branch)
+            # End the read transaction: no connection stays "idle in transaction" during GitHub calls.
+            conn.commit()
+            fetched = self._fetch(token, owner, repo, branch, state, since_dt)
+            with conn.cursor() as cur:
+                # Serialises concurrent syncs of the same branch across workers.
+                cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"commit_mirror:{repo_id}:{branch}",))
+                if self._read_state(cur, repo_id, branch) == state:
+                    self._write(cur, repo_id, branch, state, since_dt, fetched)
+                    conn.commit()
+                    return
+            conn.commit()
+            self._count("conflicts")
+        raise RuntimeError(f"branch '{branch}' of repo {repo_id} kept changing during the mirror sync")
+
+    @staticmethod
+    def _read_state(cur, repo_id: int, branch: str) -> Optional[Tuple[Optional[str], datetime]]:
+        '''(head_sha, covered_since) of the branch, None if it was never synced.'''
+        cur.execute(
+            "SELECT head_sha, covered_since FROM commit_mirror_state WHERE repo_id = %s AND branch = %s",
+            (repo_id, branch)
+        )
+        row = cur.fetchone()
+        return (row[0].strip() if row[0] else None, row[1]) if row else None
+
+    def _fetch(self, token: str, owner: str, repo: str, branch: str,
+               state: Optional[Tuple[Optional[str], datetime]], since_dt: datetime) -> dict:
+        '''
+        GitHub reads of every planned step, by step name. No database access.
+        '''
+        head_sha, covered_since = state if state else (None, since_dt)
+        fetched = {}
+        for step in self.plan(state, since_dt):
+            if step == "full":
+                fetched["full"] = list(self.service._iter_history_nodes(token, owner, repo, branch, since_dt, None,
+                                                                        node_fields=MIRROR_COMMIT_FIELDS))
+            elif step == "tail":
+                fetched["tail"] = self._fetch_tail(token, owner, repo, branch, head_sha, covered_since)
+            elif step == "backfill":
+                fetched["backfill"] = list(self.service._iter_history_nodes(token, owner, repo, branch, since_dt, covered_since,
+                                                                            node_fields=MIRROR_COMMIT_FIELDS))
+        return fetched
+
+    def _fetch_tail(self, token: str, owner: str, repo: str, branch: str,
+                    head_sha: Optional[str], covered_since: datetime) -> Tuple[List[dict], bool]:
+        '''
+        Commits above the known head, and whether the head was found (False after a force push).
+        '''
+        nodes = []
+        for node in self.service._iter_history_nodes(token, owner, repo, branch, covered_since, None,
+                                                     node_fields=MIRROR_COMMIT_FIELDS, page_size=self.TAIL_PAGE_SIZE):
+            if node["oid"] == head_sha:
+                return nodes, True
+            nodes.append(node)
+        return nodes, head_sha is None
+
+    def _write(self, cur, repo_id: int, branch: str, state: Optional[Tuple[Optional[str], datetime]],
+               since_dt: datetime, fetched: dict):
+        '''
+        Stores what _fetch read and the new branch state.
+        '''
+        head_sha, covered_since = state if state else (None, since_dt)
+        if "full" in fetched:
+            nodes = fetched["full"]
+            self._store(cur, repo_id, branch, nodes)
+            head_sha = nodes[0]["oid"] if nodes else None
+        if "tail" in fetched:
+            nodes, found_head = fetched["tail"]
+            self._count("tail_syncs")
+            if not found_head:
+                # The old head is gone from the branch (force push): rebuild its membership.
+                current_app.logger.debug(f"DEBUG: Branch '{branch}' of repo {repo_id} was rewritten. Rebuilding its mirror.")
+                self._count("rewrites")
+                cur.execute("DELETE FROM commit_mirror_branch WHERE repo_id = %s AND branch = %s", (repo_id, branch))
+            self._store(cur, repo_id, branch, nodes)
+            head_sha = nodes[0]["oid"] if nodes else head_sha
+        if "backfill" in fetched:
+            self._store(cur, repo_id, branch, fetched["backfill"])
+            self._count("backfills")
+            covered_since = since_dt
+
+        cur.execute(
+            """
+            INSERT INTO commit_mirror_state (repo_id, branch, head_sha, covered_since, synced_at)
+            VALUES (%s, %s, %s, %s, now())
+            ON CONFLICT (repo_id, branch) DO UPDATE
+            SET head_sha = EXCLUDED.head_sha, covered_since = EXCLUDED.covered_since, synced_at = now()
+            """,
+            (repo_id, branch, head_sha, min(covered_since, since_dt))
+        )
+
+    def _store(self, cur, repo_id: int, branch: str, nodes: List[dict]):
+        if not nodes:
+            return
+        commits = []
+        membership = []
+        for node in nodes:
+            author = node.get("author") or {}
+            user = author.get("user") or {}
+            pull_requests = (node.get("associatedPullRequests") or {}).get("nodes") or []
+            committed_at = _parse_dt(node["committedDate"])
+            commits.append((
+                repo_id, node["oid"], [p["oid"] for p in (node.get("parents") or {}).get("nodes") or []],
+                user.get("databaseId"), user.get("login"), author.get("name"), author.get("email"),
+                _parse_dt(author.get("date")), committed_at, node["message"],
+                pull_requests[0]["headRefName"] if pull_requests else None,
+            ))
+            membership.append((repo_id, branch, node["oid"], committed_at))
+
+        execute_values(cur, """
+            INSERT INTO commit_mirror (repo_id, sha, parents, author_github_id, author_login, author_name,
+                                       author_email, authored_at, committed_at, message, pr_head_ref)
+            VALUES %s
+            ON CONFLICT (repo_id, sha) DO UPDATE SET pr_head_ref = EXCLUDED.pr_head_ref
+        """, commits)
+        execute_values(cur, """
+            INSERT INTO commit_mirror_branch (repo_id, branch, sha, committed_at) VALUES %s
+            ON CONFLICT DO NOTHING
+        """, membership)
+        with self._lock:
+            self._stats["synced_commits"] += len(nodes)
+
+    def forget_branch(self, repo_id: int, branch: str) -> bool:
+        '''
+        Drops the membership and sync state of a deleted branch. Commit rows stay: other branches share them.
+        '''
+        try:
+            with self.connection() as conn:
+                if conn is None:
+                    return False
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM commit_mirror_branch WHERE repo_id = %s AND branch = %s", (repo_id, branch))
+                    cur.execute("DELETE FROM commit_mirror_state WHERE repo_id = %s AND branch = %s", (repo_id, branch))
+                conn.commit()
+                return True
+        except Exception as e:
+            current_app.logger.debug(f"Warning: Could not drop the mirror of branch '{branch}' of repo {repo_id}: {e}")
+            self._count("errors")
+            return False
+
+    # ----- reads
+
+    def iter_commits(self, token: str, repo_id: int, owner: str, repo: str, branch: str,
+                     start_dt: datetime, end_dt: datetime, flavor: str) -> Optional[Iterator[CommitMDDTO]]:
+        '''
+        Commits of the branch in [start_dt, end_dt], newest first, served from the mirror.
+        flavor "rest" mirrors getCommitMsgs, "graphql" mirrors getCommitMsgs2.
+        Returns None when the repository is not mirrored, so the caller asks GitHub directly.
+        '''
+        try:
+            with self.connection() as conn:
+                if conn is None or not self.is_registered(conn, repo_id):
+                    return None
+                self.sync(conn, token, repo_id, owner, repo, branch, start_dt)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT c.sha, c.parents, c.author_github_id, c.author_login, c.author_name, c.author_email,
+                               c.authored_at, c.committed_at, c.message, c.pr_head_ref
+                        FROM commit_mirror_branch b
+                        JOIN commit_mirror c ON c.repo_id = b.repo_id AND c.sha = b.sha
+                        WHERE b.repo_id = %s AND b.branch = %s AND b.committed_at BETWEEN %s AND %s
+                        ORDER BY b.committed_at DESC
+                        """,
+                        (repo_id, branch, _utc(start_dt), _utc(end_dt))
+                    )
+                    rows = cur.fetchall()
+                conn.commit()
+        except Exception as e:
+            # The mirror is an optimisation: any failure falls back to GitHub.
+            current_app.logger.debug(f"Warning: Commit mirror unavailable for repo {repo_id}: {e}")
+            self._count("errors")
+            return None
+
+        self._count("reads")
+        return (self._commit_dto(row, repo_id, owner, repo, branch, flavor) for row in rows)
+
+    def _commit_dto(self, row: tuple, repo_id: int, owner: str, repo: str, branch: str, flavor: str) -> CommitMDDTO:
+        sha, parents, author_id, login, name, email, authored_at, committed_at, message, pr_head_ref = row
+        if flavor == "rest":
+            commit_branch_name = branch
+            if len(parents) > 1:
+                commit_branch_name = self.service._get_original_branch_from_merge_message(message) or branch
+            commit_datetime = authored_at or committed_at
+        else:
+            commit_branch_name = pr_head_ref or branch
+            commit_datetime = committed_at
+        return CommitMDDTO(
+            sha=sha.strip(),
+            repo_name=repo,
+            repo_id=repo_id,
+            owner_name=owner,
+            branch_sha=commit_branch_name,
+            author_github_id=author_id,
+            author_name=login or name,
+            author_email=email,
+            commit_datetime=commit_datetime,
+            commit_msg=message
+        )
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled)
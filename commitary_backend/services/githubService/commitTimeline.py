@@ -0,0 +1,251 @@
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+
+
+# Selection set of a timeline entry: the SHA and its commit date.
+TIMELINE_COMMIT_FIELDS = """
+                    oid
+                    committedDate
+"""
+
+
+def _timestamp(dt: datetime) -> float:
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class _Timeline:
+    '''
+    Commits of one branch from `covered_since` up to `head`, as parallel arrays sorted by commit date.
+    '''
+    __slots__ = ("lock", "dates", "shas", "head", "covered_since", "complete", "checked_at")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dates: List[float] = []
+        self.shas: List[str] = []
+        self.head: Optional[str] = None
+        self.covered_since: Optional[float] = None
+        # True once the root commit is in the timeline: nothing older to fetch.
+        self.complete = False
+        self.checked_at = 0.0
+
+    def add(self, nodes: List[dict]):
+        known = set(self.shas)
+        for node in nodes:
+            if node["oid"] in known:
+                continue
+            date = _timestamp(datetime.fromisoformat(node["committedDate"].replace('Z', '+00:00')))
+            index = bisect.bisect_right(self.dates, date)
+            self.dates.insert(index, date)
+            self.shas.insert(index, node["oid"])
+
+    def reset(self):
+        self.dates.clear()
+        self.shas.clear()
+        self.head = None
+        self.covered_since = None
+        self.complete = False
+
+    def latest_until(self, target: float) -> Optional[str]:
+        '''Newest commit dated at or before `target`, or None when it is not in the timeline.'''
+        index = bisect.bisect_right(self.dates, target) - 1
+        return self.shas[index] if index >= 0 else None
+
+    def newest_since(self, target: float) -> Optional[str]:
+        '''Newest commit dated at or after `target` (what REST `since` + `per_page=1` returns).'''
+        return self.shas[-1] if self.dates and self.dates[-1] >= target else None
+
+    def covers(self, target: float) -> bool:
+        return self.complete or (self.covered_since is not None and self.covered_since <= target)
+
+
+class CommitTimelineIndex:
+    '''
+    In-memory timestamp -> SHA index per branch, so datetime lookups are a binary search.
+
+    - Built from GraphQL history (`oid` + `committedDate` only), covering at least `lookback` days.
+    - Refreshed at most every `ttl` seconds: the history above the known head is appended
+      (fast forward). When the known head is no longer in the history (force push), the
+      timeline is dropped and rebuilt.
+    - Older targets backfill the missing window once.
+
+    Lookups follow GitHub's `since` / `until` semantics on commit dates.
+    Returns None whenever the timeline cannot answer; the caller then asks the REST API.
+
+    Config (env):
+        GITHUB_TIMELINE_TTL            seconds before the branch head is checked again   (default 30)
+        GITHUB_TIMELINE_LOOKBACK_DAYS  history loaded on the first lookup of a branch     (default 90)
+        GITHUB_TIMELINE_MAX_BRANCHES   timelines kept in memory (LRU)                     (default 512)
+    '''
+
+    REFRESH_PAGE_SIZE = 25
+
+    def __init__(self, service):
+        self.service = service
+        self.ttl = float(os.getenv("GITHUB_TIMELINE_TTL", "30"))
+        self.lookback = timedelta(days=float(os.getenv("GITHUB_TIMELINE_LOOKBACK_DAYS", "90")))
+        self.max_branches = int(os.getenv("GITHUB_TIMELINE_MAX_BRANCHES", "512"))
+        self._lock = threading.Lock()
+        self._timelines: "OrderedDict[Tuple[str, str, str], _Timeline]" = OrderedDict()
+        self._stats = {"lookups": 0, "answered": 0, "builds": 0, "refreshes": 0, "backfills": 0, "rewrites": 0, "errors": 0}
+
+    @staticmethod
+    def _key(owner: str, repo: str, branch: str) -> Tuple[str, str, str]:
+        return owner.lower(), repo.lower(), branch
+
+    def _timeline(self, owner: str, repo: str, branch: str) -> _Timeline:
+        key = self._key(owner, repo, branch)
+        with self._lock:
+            timeline = self._timelines.get(key)
+            if timeline is None:
+                timeline = self._timelines[key] = _Timeline()
+                while len(self._timelines) > self.max_branches:
+                    self._timelines.popitem(last=False)
+            self._timelines.move_to_end(key)
+            return timeline
+
+    # ----- lookups
+
+    def sha_until(self, token: str, owner: str, repo: str, branch: str, target: datetime) -> Optional[str]:
+        '''Latest commit of the branch at or before `target`.'''
+        return self._lookup(token, owner, repo, branch, target, _Timeline.latest_until)
+
+    def sha_since(self, token: str, owner: str, repo: str, branch: str, target: datetime) -> Optional[str]:
+        '''Newest commit of the branch at or after `target`.'''
+        return self._lookup(token, owner, repo, branch, target, _Timeline.newest_since)
+
+    def _lookup(self, token, owner, repo, branch, target: datetime, find) -> Optional[str]:
+        self._count("lookups")
+        timeline = self._timeline(owner, repo, branch)
+        target_ts = _timestamp(target)
+        try:
+            with timeline.lock:
+                self._ensure(timeline, token, owner, repo, branch, target_ts)
+                sha = find(timeline, target_ts)
+        except Exception as e:
+            current_app.logger.debug(f"Warning: Commit timeline of '{owner}/{repo}:{branch}' unavailable: {e}")
+            self._count("errors")
+            return None
+        if sha is not None:
+            self._count("answered")
+        return sha
+
+    # ----- maintenance (timeline lock held)
+
+    def _ensure(self, timeline: _Timeline, token: str, owner: str, repo: str, branch: str, target_ts: float):
+        now = time.monotonic()
+        if timeline.head is None:
+            since_ts = min(target_ts, time.time() - self.lookback.total_seconds())
+            self._build(timeline, token, owner, repo, branch, since_ts)
+        elif now - timeline.checked_at > self.ttl:
+            self._refresh(timeline, token, owner, repo, branch)
+        if not timeline.covers(target_ts):
+            self._backfill(timeline, token, owner, repo, branch, target_ts)
+
+    def _history(self, token, owner, repo, branch, since_ts: float | None, until_ts: float | None, page_size=None):
+        to_dt = lambda ts: datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+        return self.service._iter_history_nodes(token, owner, repo, branch, to_dt(since_ts), to_dt(until_ts),
+                                                node_fields=TIMELINE_COMMIT_FIELDS, page_size=page_size)
+
+    def _build(self, timeline: _Timeline, token, owner, repo, branch, since_ts: float):
+        self._count("builds")
+        timeline.reset()
+        nodes = list(self._history(token, owner, repo, branch, since_ts, None))
+        timeline.add(nodes)
+        timeline.head = nodes[0]["oid"] if nodes else None
+        timeline.covered_since = since_ts
+        timeline.checked_at = time.monotonic()
+        if timeline.head is None:
+            # Quiet branch: anchor the head so the next lookups only refresh.
+            newest = next(iter(self._history(token, owner, repo, branch, None, None, page_size=1)), None)
+            if newest is not None:
+                timeline.add([newest])
+                timeline.head = newest["oid"]
+
+    def _refresh(self, timeline: _Timeline, token, owner, repo, branch):
+        self._count("refreshes")
+        new_nodes = []
+        found_head = False
+        for node in self._history(token, owner, repo, branch, timeline.covered_since, None, page_size=self.REFRESH_PAGE_SIZE):
+            if node["oid"] == timeline.head:
+                found_head = True
+                break
+            new_nodes.append(node)
+        if not found_head and not self._head_is_older(timeline):
+            # Non fast-forward move of the branch: the timeline no longer describes it.
+            current_app.logger.debug(f"DEBUG: Branch '{branch}' of {owner}/{repo} moved non fast-forward. Rebuilding its timeline.")
+            self._count("rewrites")
+            self._build(timeline, token, owner, repo, branch, timeline.covered_since)
+            return
+        timeline.add(new_nodes)
+        if new_nodes:
+            timeline.head = new_nodes[0]["oid"]
+        timeline.checked_at = time.monotonic()
+
+    @staticmethod
+    def _head_is_older(timeline: _Timeline) -> bool:
+        '''True when the known head predates the covered window, so the refresh query could not reach it.'''
+        if timeline.head not in timeline.shas:
+            return False
+        return timeline.dates[timeline.shas.index(timeline.head)] < timeline.covered_since
+
+    def _backfill(self, timeline: _Timeline, token, owner, repo, branch, target_ts: float):
+        self._count("backfills")
+        since_ts = target_ts - self.lookback.total_seconds()
+        nodes = list(self._history(token, owner, repo, branch, since_ts, timeline.covered_since))
+        timeline.add(nodes)
+        timeline.covered_since = since_ts
+        if not nodes:
+            # Nothing between the window and the old coverage; check whether history goes further back.
+            older = next(iter(self._history(token, owner, repo, branch, None, since_ts, page_size=1)), None)
+            timeline.complete = older is None
+
+    # ----- push notifications
+
+    def apply_push(self, owner: str, repo: str, branch: str, before: str, after: str,
+                   commits: List[dict], forced: bool) -> str:
+        '''
+        Applies a push webhook to a loaded timeline without calling GitHub.
+        `commits` are the push payload commits ({"id", "timestamp"}), oldest first.
+        Returns "applied", "invalidated" or "ignored" (branch not loaded).
+        '''
+        key = self._key(owner, repo, branch)
+        with self._lock:
+            timeline = self._timelines.get(key)
+        if timeline is None:
+            return "ignored"
+        with timeline.lock:
+            # Payloads list at most 20 commits; a longer push may be incomplete.
+            if forced or timeline.head != before or not commits or len(commits) >= 20:
+                self.invalidate(owner, repo, branch)
+                return "invalidated"
+            timeline.add([{"oid": c["id"], "committedDate": c["timestamp"]} for c in commits])
+            timeline.head = after
+            timeline.checked_at = time.monotonic()
+        return "applied"
+
+    # ----- invalidation
+
+    def invalidate(self, owner: str, repo: str, branch: str | None = None) -> int:
+        '''Drops the timelines of one branch, or of every branch of the repository.'''
+        owner, repo = owner.lower(), repo.lower()
+        with self._lock:
+            keys = [key for key in self._timelines if key[:2] == (owner, repo) and (branch is None or key[2] == branch)]
+            for key in keys:
+                del self._timelines[key]
+        return len(keys)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, branches=len(self._timelines))
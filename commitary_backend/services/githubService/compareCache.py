@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import Optional
+
+from commitary_backend.commitaryUtils.diskLruStore import DiskLRUStore
+from commitary_backend.dto.gitServiceDTO import DiffDTO
+
+
+FULL_SHA_PATTERN = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+class CompareCache:
+    '''
+    Persistent cache of parsed /compare results.
+
+    The diff between two fixed commit SHAs never changes, so entries never expire and are
+    only dropped by the size-capped LRU eviction of the underlying DiskLRUStore.
+    Branch names and short SHAs are not cached because they can move.
+
+    Config (env):
+        GITHUB_COMPARE_CACHE_DIR        ("" disables the cache)
+        GITHUB_COMPARE_CACHE_MAX_BYTES  (default 256MB)
+    '''
+
+    def __init__(self, root: str | None = None, max_bytes: int | None = None):
+        if root is None:
+            root = os.getenv("GITHUB_COMPARE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "commitary", "compare"))
+        max_bytes = max_bytes or int(os.getenv("GITHUB_COMPARE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.store = DiskLRUStore(root, max_bytes=max_bytes) if root else None
+
+    @staticmethod
+    def make_key(owner: str, repo: str, sha_before: str, sha_after: str) -> Optional[str]:
+        if not (FULL_SHA_PATTERN.match(sha_before or "") and FULL_SHA_PATTERN.match(sha_after or "")):
+            return None
+        raw = f"{owner}/{repo}:{sha_before}...{sha_after}".lower()
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, owner: str, repo: str, sha_before: str, sha_after: str) -> Optional[DiffDTO]:
+        key = self.make_key(owner, repo, sha_before, sha_after)
+        if self.store is None or key is None:
+            return None
+        data = self.store.get(key)
+        if data is None:
+            return None
+        return DiffDTO.model_validate_json(data)
+
+    def put(self, owner: str, repo: str, sha_before: str, sha_after: str, diff_dto: DiffDTO):
+        key = self.make_key(owner, repo, sha_before, sha_after)
+        if self.store is None or key is None:
+            return
+        self.store.put(key, diff_dto.model_dump_json().encode("utf-8"))
+
+    def getStats(self) -> dict:
+        if self.store is None:
+            return {"enabled": False}
+        stats = self.store.getStats()
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({"enabled": True, "hit_rate": stats["hits"] / lookups if lookups else 0.0})
+        return stats
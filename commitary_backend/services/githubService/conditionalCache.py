@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from commitary_backend.commitaryUtils.tokenFingerprint import token_fingerprint
+
+
+# ETag / Last-Modified cache for GitHub REST GET requests.
+# GitHub answers a matching If-None-Match with 304, which does not count against the rate limit.
+
+
+class CachedResponse:
+    '''
+    Validators and parsed body of a previously received 200 response.
+    '''
+    __slots__ = ("etag", "last_modified", "body", "links", "size")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], body: Any, links: dict, size: int):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.links = links
+        self.size = size
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ConditionalRequestCache:
+    '''
+    LRU cache of REST responses keyed by (token fingerprint, URL, params).
+    Bounded both by entry count and by the total size of cached response bodies.
+    '''
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries or int(os.getenv("GITHUB_ETAG_CACHE_ENTRIES", "2048"))
+        self.max_bytes = max_bytes or int(os.getenv("GITHUB_ETAG_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(token: str, url: str, params: Optional[dict]) -> tuple:
+        params_key = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (token_fingerprint(token), url, params_key)
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def store(self, key: tuple, response, body: Any):
+        '''
+        Stores the parsed body of a 200 response if it carries a validator.
+        '''
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        size = len(response.content or b"")
+        if size > self.max_bytes:
+            return
+
+        entry = CachedResponse(etag, last_modified, body, dict(response.links), size)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+
+    def invalidate(self, predicate) -> int:
+        '''
+        Drops every entry whose URL satisfies `predicate(url)`. Returns the number removed.
+        '''
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key[1])]
+            for key in keys:
+                self._bytes -= self._entries.pop(key).size
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "bytes": self._bytes,
+                          "max_entries": self.max_entries, "max_bytes": self.max_bytes})
+            return stats
@@ -0,0 +1,181 @@
+import difflib
+import threading
+from typing import Dict, Iterator, List, Set, Tuple
+
+from flask import current_app
+
+from commitary_backend.dto.gitServiceDTO import PatchFileDTO
+
+
+# GitHub lists at most 300 changed files in a /compare response and omits the patch of large files.
+COMPARE_FILE_LIMIT = 300
+
+
+# ----- payload helpers (shared with AsyncGithubService)
+
+def is_complete(file: dict) -> bool:
+    '''True if a /compare file entry carries its patch (or has nothing to patch).'''
+    return "patch" in file or not file.get("changes")
+
+
+def patch_file_from_compare(file: dict) -> PatchFileDTO:
+    return PatchFileDTO(
+        filename=file['filename'],
+        status=file['status'],
+        additions=file['additions'],
+        deletions=file['deletions'],
+        changes=file['changes'],
+        patch=file.get('patch', '')
+    )
+
+
+def tree_blobs(entries: List[dict]) -> Dict[str, str]:
+    '''path -> blob SHA of the blob entries of a recursive git/trees listing.'''
+    return {entry["path"]: entry["sha"] for entry in entries if entry.get("type") == "blob"}
+
+
+def tree_changes(before: Dict[str, str], after: Dict[str, str], skip: Set[str]) -> List[Tuple[str, str, str | None, str | None]]:
+    '''
+    Net changes between two trees (path -> blob SHA), sorted by path, without the paths in `skip`.
+    Returns (path, status, blob SHA before, blob SHA after). A removed and an added path with the
+    same blob are reported once, as "renamed".
+    '''
+    changes = {}
+    for path in before.keys() | after.keys():
+        if path in skip or before.get(path) == after.get(path):
+            continue
+        sha_before, sha_after = before.get(path), after.get(path)
+        status = "added" if sha_before is None else "removed" if sha_after is None else "modified"
+        changes[path] = (path, status, sha_before, sha_after)
+
+    removed_by_blob = {}
+    for path, status, sha_before, _ in sorted(changes.values()):
+        if status == "removed":
+            removed_by_blob.setdefault(sha_before, path)
+    for path, status, _, sha_after in sorted(changes.values()):
+        if status == "added" and sha_after in removed_by_blob:
+            old_path = removed_by_blob.pop(sha_after)
+            del changes[old_path]
+            changes[path] = (path, "renamed", sha_after, sha_after)
+    return [changes[path] for path in sorted(changes)]
+
+
+def patch_file_from_texts(path: str, status: str, before: str | None, after: str | None) -> PatchFileDTO:
+    '''
+    PatchFileDTO with a unified diff (hunks only, like GitHub's `patch`) of two blob texts.
+    `None` stands for a missing side (added / removed file). Binary blobs get an empty patch.
+    '''
+    if status == "renamed" or (before is None and status != "added") or (after is None and status != "removed"):
+        return PatchFileDTO(filename=path, status=status, additions=0, deletions=0, changes=0, patch="")
+    lines = difflib.unified_diff((before or "").splitlines(), (after or "").splitlines(), lineterm="", n=3)
+    patch = [line for index, line in enumerate(lines) if index >= 2]  # drop the ---/+++ header
+    additions = sum(1 for line in patch if line.startswith("+"))
+    deletions = sum(1 for line in patch if line.startswith("-"))
+    return PatchFileDTO(filename=path, status=status, additions=additions, deletions=deletions,
+                        changes=additions + deletions, patch="\n".join(patch))
+
+
+class DiffAssembler:
+    '''
+    Streams the changed files between two commits.
+
+    The first /compare page is used as is when it is complete. When GitHub truncated it
+    (300 files listed, or patches omitted), the remaining files come from the trees of the
+    merge base and the head: the recursive tree listings give the net set of changed paths,
+    and each file's patch is computed from its blob texts at both sides (blob store + batched
+    GraphQL, see SnapshotEngine). Files are resolved and yielded a batch at a time, so only
+    the two path -> SHA maps and one batch of texts are held in memory.
+
+    Renames are detected for identical blobs only; an edited rename shows as removed + added.
+    If GitHub truncates a tree as well (~100k entries), the files it cannot recover keep their
+    compare entry without a patch, and files past the compare cap are missing from the diff.
+    '''
+
+    def __init__(self, service):
+        self.service = service
+        self.page_size = 100
+        self._lock = threading.Lock()
+        self._stats = {"diffs": 0, "truncated_diffs": 0, "tree_diff_files": 0, "incomplete_diffs": 0}
+
+    def fetch_first_page(self, token: str, owner: str, repo: str, sha_before: str, sha_after: str) -> dict:
+        '''
+        First /compare page. It holds the base commits and the (possibly truncated) file list.
+        '''
+        return self.service._make_request(
+            "GET", f"/repos/{owner}/{repo}/compare/{sha_before}...{sha_after}", token,
+            params={"per_page": self.page_size, "page": 1}
+        )
+
+    def is_truncated(self, files: List[dict]) -> bool:
+        '''
+        True if GitHub cut the compare file list or left out patches. Counted in the stats.
+        '''
+        truncated = len(files) >= COMPARE_FILE_LIMIT or not all(is_complete(f) for f in files)
+        with self._lock:
+            self._stats["diffs"] += 1
+            if truncated:
+                self._stats["truncated_diffs"] += 1
+        return truncated
+
+    @staticmethod
+    def split_compare_files(files: List[dict]) -> Tuple[List[dict], Dict[str, dict], Set[str]]:
+        '''
+        (complete entries, entries without a patch by filename, paths the tree diff must skip).
+        '''
+        complete = [file for file in files if is_complete(file)]
+        deferred = {file["filename"]: file for file in files if not is_complete(file)}
+        skip = {file["filename"] for file in complete} | {file["previous_filename"] for file in files if file.get("previous_filename")}
+        return complete, deferred, skip
+
+    def iter_files(self, token: str, owner: str, repo: str, sha_before: str, sha_after: str,
+                   first_page: dict) -> Iterator[PatchFileDTO]:
+        files = first_page.get("files", [])
+        if not self.is_truncated(files):
+            for file in files:
+                yield patch_file_from_compare(file)
+            return
+
+        complete, deferred, skip = self.split_compare_files(files)
+        for file in complete:
+            yield patch_file_from_compare(file)
+
+        current_app.logger.debug(
+            f"DEBUG: Compare {sha_before[:7]}...{sha_after[:7]} is truncated ({len(files)} files). "
+            f"Diffing the trees."
+        )
+        engine = self.service.snapshot_engine
+        base = (first_page.get("merge_base_commit") or {}).get("sha") or sha_before
+        before_entries, before_truncated = engine.list_tree(token, owner, repo, base)
+        after_entries, after_truncated = engine.list_tree(token, owner, repo, sha_after)
+        if before_truncated or after_truncated:
+            yield from self.incomplete_files(owner, repo, deferred)
+            return
+        changes = tree_changes(tree_blobs(before_entries), tree_blobs(after_entries), skip)
+        del before_entries, after_entries
+
+        window = max(engine.batch_size * engine.parallelism, 1)
+        for start in range(0, len(changes), window):
+            batch = changes[start:start + window]
+            blobs = {sha: {"path": path, "sha": sha} for path, status, *shas in batch if status != "renamed" for sha in shas if sha}
+            texts = {entry["sha"]: text for entry, text in engine.fetch_blob_texts(token, owner, repo, list(blobs.values()))}
+            for path, status, sha_before_blob, sha_after_blob in batch:
+                yield patch_file_from_texts(path, status, texts.get(sha_before_blob), texts.get(sha_after_blob))
+        self.count_tree_diff_files(len(changes))
+
+    def incomplete_files(self, owner: str, repo: str, deferred: Dict[str, dict]) -> Iterator[PatchFileDTO]:
+        '''
+        Compare entries without a patch, for a diff whose trees GitHub truncated too.
+        '''
+        current_app.logger.debug(f"Warning: Trees of {owner}/{repo} are truncated by GitHub. The diff is partial.")
+        with self._lock:
+            self._stats["incomplete_diffs"] += 1
+        for file in deferred.values():
+            yield patch_file_from_compare(file)
+
+    def count_tree_diff_files(self, count: int):
+        with self._lock:
+            self._stats["tree_diff_files"] += count
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,302 @@
+import json as jsonlib
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import requests
+from flask import current_app
+
+from commitary_backend.dto.gitServiceDTO import RepoDTO, BranchDTO, CommitMDDTO, DiffDTO
+from commitary_backend.commitaryUtils.tokenFingerprint import token_fingerprint
+
+
+# Queries and payload -> DTO helpers shared by GithubService and AsyncGithubService.
+# Nothing here does I/O, so both transports build the same DTOs from the same responses.
+
+
+# Selection set of a commit node used to build CommitMDDTOs from GraphQL history.
+HISTORY_COMMIT_FIELDS = """
+                    oid
+                    message
+                    author {
+                    name
+                    email
+                    user {
+                        databaseId
+                        login
+                    }
+                    }
+                    committedDate
+                    associatedPullRequests(first: 1) {
+                    nodes {
+                        headRefName
+                    }
+                    }
+"""
+
+# Minimal selection set used to resolve the SHAs bounding a history range.
+RANGE_COMMIT_FIELDS = """
+                    oid
+                    parents(first: 1) {
+                    nodes {
+                        oid
+                    }
+                    }
+"""
+
+# Paginated branch listing with the date of each head commit.
+BRANCH_REFS_QUERY = """
+query GetBranchRefs($owner: String!, $repo: String!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    refs(refPrefix: "refs/heads/", first: 100, after: $cursor, orderBy: {field: ALPHABETICAL, direction: ASC}) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        name
+        target {
+          ... on Commit {
+            oid
+            committedDate
+            author {
+              date
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Commit history of a branch between two timestamps. %s is the selection set of a commit node.
+HISTORY_QUERY_TEMPLATE = """
+query GetCommitHistory($owner: String!, $repo: String!, $branch: String!, $since: GitTimestamp, $until: GitTimestamp, $first: Int!, $cursor: String) {
+repository(owner: $owner, name: $repo) {
+    ref(qualifiedName: $branch) {
+    target {
+        ... on Commit {
+        history(since: $since, until: $until, first: $first, after: $cursor) {
+            pageInfo {
+            hasNextPage
+            endCursor
+            }
+            nodes {
+            %s
+            }
+        }
+        }
+    }
+    }
+}
+}
+"""
+
+
+class GithubGraphQLError(requests.exceptions.RequestException):
+    '''A GraphQL response carried `errors` (permission, unknown field ...) despite its 200 status.'''
+
+
+def graphql_data(json_response: dict) -> dict:
+    '''Returns a GraphQL response, raising GithubGraphQLError if it reports errors.'''
+    if "errors" in json_response:
+        current_app.logger.debug(f"ERROR: GraphQL query failed with errors: {json_response['errors']}")
+        raise GithubGraphQLError(f"GraphQL query failed: {json_response['errors']}")
+    return json_response
+
+
+# ----- request keys
+
+def canonical(payload) -> str:
+    '''Order-independent representation of request params / GraphQL variables.'''
+    return jsonlib.dumps(payload, sort_keys=True, default=str) if payload else ""
+
+
+def rest_flight_key(token: str, url: str, params=None) -> tuple:
+    '''SingleFlight key of a REST GET. Identical GETs of the sync and async clients share it.'''
+    return ("REST", token_fingerprint(token), url, canonical(params))
+
+
+def graphql_flight_key(token: str, query: str, variables: dict) -> tuple:
+    '''SingleFlight key of a GraphQL query.'''
+    return ("GRAPHQL", token_fingerprint(token), query, canonical(variables))
+
+
+# ----- repositories and branches
+
+def repo_cache_key(token: str, repo_id) -> Optional[tuple]:
+    '''Repository cache key, None for an id GitHub cannot know (non-numeric query arg).'''
+    try:
+        return token_fingerprint(token), int(repo_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def repo_dto_from_rest(repo: dict) -> RepoDTO:
+    '''Builds a RepoDTO from a REST repository object.'''
+    return RepoDTO(
+        github_id=repo['id'],
+        github_node_id=repo['node_id'],
+        github_name=repo['name'],
+        github_owner_id=repo['owner']['id'],
+        github_owner_login=repo['owner']['login'],
+        github_html_url=repo['html_url'],
+        github_url=repo['url'],
+        github_full_name=repo['full_name'],
+        description=repo.get('description')
+    )
+
+
+def branch_refs_page(result: dict) -> Optional[dict]:
+    '''The `refs` connection of a GetBranchRefs response, None if the repository is gone.'''
+    return ((result.get("data") or {}).get("repository") or {}).get("refs")
+
+
+def branch_dtos_from_refs(refs: dict, repo_id: int, owner: str, repo: str) -> List[BranchDTO]:
+    '''Builds BranchDTOs from one page of the GetBranchRefs query.'''
+    branch_list = []
+    for node in refs["nodes"]:
+        target = node.get("target") or {}
+        # Keep the author date used by the former REST implementation, committedDate as fallback.
+        last_modification_str = (target.get("author") or {}).get("date") or target.get("committedDate")
+        if not last_modification_str:
+            continue
+        branch_list.append(BranchDTO(
+            repo_id=repo_id,
+            repo_name=repo,
+            owner_name=owner,
+            branch_name=node["name"],
+            last_modification=datetime.fromisoformat(last_modification_str.replace('Z', '+00:00'))
+        ))
+    return branch_list
+
+
+# ----- commit history
+
+def clamp_page_size(page_size: int | None, default: int) -> int:
+    '''GitHub caps list pages at 100 items.'''
+    return max(1, min(page_size or default, 100))
+
+
+def history_variables(owner: str, repo: str, branch: str, since_dt: datetime | None, until_dt: datetime | None,
+                      first: int) -> dict:
+    '''Variables of the first HISTORY_QUERY_TEMPLATE page. Later pages set "cursor".'''
+    return {
+        "owner": owner,
+        "repo": repo,
+        "branch": branch,
+        "since": since_dt.isoformat() if since_dt else None,
+        "until": until_dt.isoformat() if until_dt else None,
+        "first": first,
+        "cursor": None
+    }
+
+
+def history_page(result: dict) -> Tuple[List[dict], Optional[str]]:
+    '''(commit nodes, cursor of the next page or None) of one history response.'''
+    ref = ((result.get("data") or {}).get("repository") or {}).get("ref")
+    if not ref or not ref.get("target"):
+        return [], None
+    history = ref["target"]["history"]
+    return history["nodes"], history["pageInfo"]["endCursor"] if history["pageInfo"]["hasNextPage"] else None
+
+
+def commit_dto_from_graphql(commit_node: dict, repo_id: int, owner: str, repo: str, branch: str) -> CommitMDDTO:
+    '''Builds a CommitMDDTO from one node of a GraphQL commit history.'''
+    author_data = commit_node.get("author", {})
+    user_data = author_data.get("user") if author_data and author_data.get("user") else {}
+
+    author_id = user_data.get("databaseId") if user_data else None
+    author_name = user_data.get("login") if user_data else author_data.get("name")
+
+    commit_branch_name = branch
+
+    pull_requests = commit_node.get("associatedPullRequests", {}).get("nodes", [])
+    if pull_requests:
+        commit_branch_name = pull_requests[0]["headRefName"]
+
+    return CommitMDDTO(
+        sha=commit_node['oid'],
+        repo_name=repo,
+        repo_id=repo_id,
+        owner_name=owner,
+        branch_sha=commit_branch_name,
+        author_github_id=author_id,
+        author_name=author_name,
+        author_email=author_data.get("email"),
+        commit_datetime=datetime.fromisoformat(commit_node['committedDate'].replace('Z', '+00:00')),
+        commit_msg=commit_node['message']
+    )
+
+
+def commit_range_from_nodes(newest_node: dict | None, oldest_node: dict | None) -> Optional[tuple]:
+    '''(newest sha, oldest sha, parent sha of the oldest) from the first and last RANGE_COMMIT_FIELDS nodes.'''
+    if newest_node is None:
+        return None
+    parents = (oldest_node.get("parents") or {}).get("nodes") or []
+    return newest_node["oid"], oldest_node["oid"], parents[0]["oid"] if parents else None
+
+
+# ----- diffs
+
+def diff_header_from_compare(owner: str, repo: str, sha_before: str, sha_after: str, first_page: dict) -> DiffDTO:
+    '''DiffDTO (without files) of a /compare response.'''
+    return DiffDTO(
+        repo_name=repo,
+        repo_id=0,
+        owner_name=owner,
+        branch_before=sha_before,
+        branch_after=sha_after,
+        commit_before_sha=first_page['base_commit']['sha'],
+        commit_after_sha=first_page['merge_base_commit']['sha'],
+        files=[]
+    )
+
+
+def plan_range_diff(repo_id: int, owner: str, repo_name: str, branch: str,
+                    resolved: Optional[tuple]) -> tuple[DiffDTO, Optional[tuple[str, str]]]:
+    '''
+    Plan of getDiffByIdTime3 from the resolved commit range (see commit_range_from_nodes):
+    (final DiffDTO, None) when no compare is needed, or (header, (shaBefore, shaAfter)).
+    '''
+    def header(sha_before: str, sha_after: str) -> DiffDTO:
+        return DiffDTO(
+            repo_name=repo_name,
+            repo_id=repo_id,
+            owner_name=owner,
+            branch_before=branch,
+            branch_after=branch,
+            commit_before_sha=sha_before,
+            commit_after_sha=sha_after,
+            files=[]
+        )
+
+    # If no commits are found, it means there was no activity in the given range.
+    if resolved is None:
+        current_app.logger.debug("DEBUG: No commits found in the specified time range on this branch.")
+        return header("", ""), None
+
+    shaAfter, oldest_commit_in_range_sha, shaBefore = resolved
+
+    if not shaBefore:
+        current_app.logger.debug(f"Warning: The oldest commit in range {oldest_commit_in_range_sha} has no parents (it might be the first commit).")
+        # Diffing the root commit against itself gives an empty diff.
+        # A more advanced implementation might diff against the empty tree if this is a common case.
+        return header(oldest_commit_in_range_sha, shaAfter), None
+
+    current_app.logger.debug(f"DEBUG: Found SHA_before (parent of first commit in range): {shaBefore}")
+    current_app.logger.debug(f"DEBUG: Found SHA_after (last commit in range): {shaAfter}")
+
+    if shaBefore == shaAfter:
+        current_app.logger.debug("Warning: The start and end commits for the diff are the same.")
+        return header(shaBefore, shaAfter), None
+
+    return header(shaBefore, shaAfter), (shaBefore, shaAfter)
+
+
+def relabel_diff(diff_dto: DiffDTO, header: DiffDTO) -> DiffDTO:
+    '''Gives a compare result the repo id and branches of the planned header.'''
+    diff_dto.repo_id = header.repo_id
+    diff_dto.branch_before = header.branch_before
+    diff_dto.branch_after = header.branch_after
+    return diff_dto
@@ -0,0 +1,136 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# Pooled keep-alive HTTP sessions shared by every GithubService call.
+# One adapter (and therefore one urllib3 pool per host) is shared by all threads,
+# each thread gets its own lightweight requests.Session mounted on that adapter.
+
+
+class ConnectionStats:
+    '''
+    Thread-safe counters for requests sent and TCP/TLS connections opened.
+    A request is counted once, however many attempts urllib3 makes for it.
+    reused_connections = requests - new_connections
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+            }
+
+
+def _counting_pool_class(base_class, stats: ConnectionStats):
+    """Builds a urllib3 connection pool class that reports into `stats`."""
+
+    class CountingConnectionPool(base_class):
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+    CountingConnectionPool.__name__ = f"Counting{base_class.__name__}"
+    return CountingConnectionPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    '''
+    HTTPAdapter whose per-host pools count new connections versus reused ones.
+    '''
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        # Counted here rather than in urlopen, which urllib3 calls again for each retry.
+        self.stats.record_request()
+        return super().send(request, *args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+
+class GithubSessionPool:
+    '''
+    Shared keep-alive connection pool for the GitHub REST and GraphQL APIs.
+
+    pool_size  : max connections kept alive per host (GITHUB_HTTP_POOL_SIZE)
+    pool_hosts : number of per-host pools to cache (GITHUB_HTTP_POOL_HOSTS)
+    '''
+
+    def __init__(self, pool_size: int | None = None, pool_hosts: int | None = None):
+        self.pool_size = pool_size or int(os.getenv("GITHUB_HTTP_POOL_SIZE", "20"))
+        self.pool_hosts = pool_hosts or int(os.getenv("GITHUB_HTTP_POOL_HOSTS", "4"))
+        self.stats = ConnectionStats()
+        self._lock = threading.Lock()
+        self._build_adapter()
+
+    def _build_adapter(self):
+        # Remember the owning pid. A gunicorn worker forked after import must not
+        # reuse sockets opened by the master process.
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self.adapter = CountingHTTPAdapter(
+            self.stats,
+            pool_connections=self.pool_hosts,
+            pool_maxsize=self.pool_size,
+            pool_block=False,
+        )
+
+    def session(self) -> requests.Session:
+        '''
+        Returns the calling thread's session. All sessions share the same adapter.
+        '''
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._build_adapter()
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["Connection"] = "keep-alive"
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session().request(method, url, **kwargs)
+
+    def getStats(self) -> dict:
+        stats = self.stats.snapshot()
+        stats.update({"pool_size": self.pool_size, "pool_hosts": self.pool_hosts})
+        return stats
+
+    def close(self):
+        self.adapter.close()
@@ -0,0 +1,380 @@
+import base64
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+
+from commitary_backend.dto.gitServiceDTO import CommitMDDTO, CodeFileDTO, DiffDTO, PatchFileDTO
+
+
+class LocalGitError(Exception):
+    '''A git command of the local backend failed.'''
+
+
+# `git diff --raw` status letter -> status of a GitHub compare file.
+_DIFF_STATUS = {"A": "added", "D": "removed", "M": "modified", "T": "modified", "R": "renamed", "C": "copied"}
+
+# Field / record separators of the `git log` format.
+_FS = "\x1f"
+_LOG_FORMAT = _FS.join(["%H", "%P", "%an", "%ae", "%aI", "%cI", "%B"])
+
+
+class LocalGitBackend:
+    '''
+    Serves commit history, compare diffs and snapshots of selected repositories from local bare clones.
+
+    A clone is created on first use and kept up to date with incremental `git fetch` (every branch
+    as refs/heads/*), at most every `fetch_interval` seconds, or right away when a requested revision
+    is unknown. Results have the shapes of the GitHub path (CommitMDDTO, DiffDTO + PatchFileDTO,
+    CodeFileDTO). Git does not know GitHub accounts: author_github_id is None and author_name is the
+    git author name.
+
+    Every method returns None when the repository is not served locally or git fails, so the caller
+    uses the GitHub API instead. Diffs and snapshots are streamed: if git fails after files were
+    yielded, the stream continues from the caller's `fallback` iterator (the GitHub path) and skips
+    the files already yielded.
+
+    Config (env):
+        GITHUB_LOCAL_GIT_REPOS            comma separated owner/repo served locally, "*" for all (default none)
+        GITHUB_LOCAL_GIT_DIR              directory of the bare clones
+        GITHUB_LOCAL_GIT_REMOTE           clone URL template (default https://github.com/{owner}/{repo}.git)
+        GITHUB_LOCAL_GIT_FETCH_INTERVAL   seconds between fetches of a clone (default 60)
+    '''
+
+    def __init__(self, service):
+        self.service = service
+        self.repos = {
+            name.strip().lower() for name in os.getenv("GITHUB_LOCAL_GIT_REPOS", "").split(",") if name.strip()
+        }
+        self.root = os.getenv("GITHUB_LOCAL_GIT_DIR", os.path.join(tempfile.gettempdir(), "commitary", "git"))
+        self.remote_template = os.getenv("GITHUB_LOCAL_GIT_REMOTE", "https://github.com/{owner}/{repo}.git")
+        self.fetch_interval = float(os.getenv("GITHUB_LOCAL_GIT_FETCH_INTERVAL", "60"))
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._stats = {"clones": 0, "fetches": 0, "commit_lists": 0, "diffs": 0, "snapshots": 0, "errors": 0}
+
+    def handles(self, owner: str, repo: str) -> bool:
+        return "*" in self.repos or f"{owner}/{repo}".lower() in self.repos
+
+    # ----- git plumbing
+
+    def _path(self, owner: str, repo: str) -> str:
+        return os.path.join(self.root, owner.lower(), f"{repo.lower()}.git")
+
+    @staticmethod
+    def _env(token: str | None) -> dict:
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if token:
+            # Passed through the environment so the token never shows up in the process list or in git config.
+            basic = base64.b64encode(f"x-access-token:{token}".encode("utf-8")).decode("ascii")
+            env.update(GIT_CONFIG_COUNT="1", GIT_CONFIG_KEY_0="http.extraHeader",
+                       GIT_CONFIG_VALUE_0=f"Authorization: Basic {basic}")
+        return env
+
+    def _git(self, git_dir: str, *args: str, token: str | None = None, check: bool = True) -> bytes:
+        result = subprocess.run(["git", "--git-dir", git_dir, *args], capture_output=True, env=self._env(token))
+        if check and result.returncode != 0:
+            raise LocalGitError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout
+
+    def _resolve(self, git_dir: str, revision: str) -> Optional[str]:
+        out = self._git(git_dir, "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}", check=False)
+        return out.decode("ascii").strip() or None
+
+    def _repo_lock(self, git_dir: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(git_dir, threading.Lock())
+
+    def sync(self, token: str, owner: str, repo: str, revisions: List[str] = ()) -> str:
+        '''
+        Makes sure the bare clone exists, is recent and contains `revisions`. Returns its git dir.
+        '''
+        git_dir = self._path(owner, repo)
+        with self._repo_lock(git_dir):
+            if not os.path.isdir(git_dir):
+                self._clone(token, owner, repo, git_dir)
+            stale = time.monotonic() - self._fetched_at.get(git_dir, 0.0) > self.fetch_interval
+            if stale or any(self._resolve(git_dir, revision) is None for revision in revisions):
+                self._git(git_dir, "fetch", "--prune", "--quiet", "origin", token=token)
+                self._fetched_at[git_dir] = time.monotonic()
+                self._count("fetches")
+        return git_dir
+
+    def mark_stale(self, owner: str, repo: str):
+        '''The next read of the repository fetches first (e.g. after a push webhook).'''
+        self._fetched_at.pop(self._path(owner, repo), None)
+
+    def _clone(self, token: str, owner: str, repo: str, git_dir: str):
+        '''
+        Creates the bare clone next to its final place and moves it in once the first fetch is done,
+        so a failed or concurrent clone never leaves a half-initialised repository behind.
+        '''
+        os.makedirs(os.path.dirname(git_dir), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".clone-", dir=os.path.dirname(git_dir))
+        try:
+            subprocess.run(["git", "init", "--bare", "--quiet", staging], check=True, capture_output=True)
+            self._git(staging, "remote", "add", "origin", self.remote_template.format(owner=owner, repo=repo))
+            self._git(staging, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*")
+            self._git(staging, "fetch", "--quiet", "origin", token=token)
+            try:
+                os.rename(staging, git_dir)
+            except OSError:
+                # Another worker finished its clone first.
+                pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._fetched_at[git_dir] = time.monotonic()
+        self._count("clones")
+
+    _ERRORS = (LocalGitError, OSError, subprocess.CalledProcessError)
+
+    def _guard(self, what: str, owner: str, repo: str, fn):
+        if not self.handles(owner, repo):
+            return None
+        try:
+            return fn()
+        except self._ERRORS as e:
+            current_app.logger.debug(f"Warning: Local git {what} of {owner}/{repo} failed, using the GitHub API: {e}")
+            self._count("errors")
+            return None
+
+    def _stream_with_fallback(self, what: str, owner: str, repo: str, local: Iterator, fallback: Callable[[], Iterator],
+                              key: Callable) -> Iterator:
+        '''
+        Yields from `local`. If git fails part way, continues with `fallback()`, skipping the items
+        (by `key`) that were already yielded.
+        '''
+        emitted = set()
+        try:
+            for item in local:
+                emitted.add(key(item))
+                yield item
+            return
+        except self._ERRORS as e:
+            current_app.logger.debug(f"Warning: Local git {what} of {owner}/{repo} failed after {len(emitted)} files, "
+                                     f"using the GitHub API for the rest: {e}")
+            self._count("errors")
+        for item in fallback():
+            if key(item) not in emitted:
+                yield item
+
+    # ----- commit history
+
+    def iter_commits(self, token: str, repo_id: int, owner: str, repo: str, branch: str,
+                     since_dt: datetime, until_dt: datetime, flavor: str) -> Optional[Iterator[CommitMDDTO]]:
+        '''
+        Commits of the branch between the two datetimes (commit dates), newest first.
+        flavor "rest" dates commits by author date like getCommitMsgs, "graphql" by commit date like getCommitMsgs2.
+        '''
+        def run():
+            git_dir = self.sync(token, owner, repo, [f"refs/heads/{branch}"])
+            out = self._git(git_dir, "log", "-z", f"--format={_LOG_FORMAT}",
+                            f"--since={since_dt.isoformat()}", f"--until={until_dt.isoformat()}", f"refs/heads/{branch}", "--")
+            self._count("commit_lists")
+            records = [record for record in out.decode("utf-8", "replace").split("\0") if record]
+            try:
+                # Built here so a malformed record falls back to GitHub instead of failing the route.
+                return iter([self._commit_dto(record, repo_id, owner, repo, branch, flavor) for record in records])
+            except ValueError as e:
+                raise LocalGitError(f"unexpected git log output: {e}")
+        return self._guard("log", owner, repo, run)
+
+    def _commit_dto(self, record: str, repo_id: int, owner: str, repo: str, branch: str, flavor: str) -> CommitMDDTO:
+        sha, parents, name, email, authored, committed, message = record.split(_FS, 6)
+        commit_branch_name = branch
+        if len(parents.split()) > 1:
+            commit_branch_name = self.service._get_original_branch_from_merge_message(message) or branch
+        return CommitMDDTO(
+            sha=sha,
+            repo_name=repo,
+            repo_id=repo_id,
+            owner_name=owner,
+            branch_sha=commit_branch_name,
+            author_github_id=None,
+            author_name=name,
+            author_email=email,
+            commit_datetime=datetime.fromisoformat(authored if flavor == "rest" else committed),
+            # GitHub returns the message without the trailing newline git stores.
+            commit_msg=message.rstrip("\n")
+        )
+
+    # ----- compare
+
+    def diff(self, token: str, owner: str, repo: str, sha_before: str, sha_after: str,
+             fallback: Callable[[], Iterator[PatchFileDTO]]) -> Optional[Tuple[DiffDTO, Iterator[PatchFileDTO]]]:
+        '''
+        Same result as GitHub's compare `sha_before...sha_after`: changes from the merge base to `sha_after`.
+        `fallback` returns the GitHub file stream, used if git fails while the files are streamed.
+        '''
+        def run():
+            git_dir = self.sync(token, owner, repo, [sha_before, sha_after])
+            before = self._resolve(git_dir, sha_before)
+            after = self._resolve(git_dir, sha_after)
+            if before is None or after is None:
+                raise LocalGitError(f"unknown revision {sha_before if before is None else sha_after}")
+            merge_base = self._git(git_dir, "merge-base", before, after).decode("ascii").strip()
+            self._count("diffs")
+            diff_dto = DiffDTO(
+                repo_name=repo,
+                repo_id=0,
+                owner_name=owner,
+                branch_before=sha_before,
+                branch_after=sha_after,
+                commit_before_sha=before,
+                commit_after_sha=merge_base,
+                files=[]
+            )
+            changes = self._diff_changes(git_dir, merge_base, after)
+            files = self._iter_patch_files(git_dir, merge_base, after, changes)
+            return diff_dto, self._stream_with_fallback("diff", owner, repo, files, fallback, key=lambda f: f.filename)
+        return self._guard("diff", owner, repo, run)
+
+    def _diff_changes(self, git_dir: str, base: str, head: str) -> List[Tuple[str, str]]:
+        '''
+        (status letter, file name) of every changed file. The NUL separated raw listing never quotes paths.
+        '''
+        raw = self._git(git_dir, "diff", "-z", "--raw", "-M", base, head).decode("utf-8", "replace").split("\0")
+        changes = []
+        index = 0
+        while index < len(raw) - 1:
+            status = raw[index].split()[-1][0]
+            if status in "RC":
+                changes.append((status, raw[index + 2]))
+                index += 3
+            else:
+                changes.append((status, raw[index + 1]))
+                index += 2
+        return changes
+
+    def _iter_patch_files(self, git_dir: str, base: str, head: str, changes: List[Tuple[str, str]]) -> Iterator[PatchFileDTO]:
+        # The patch lists the same files in the same order, one "diff --git" block each.
+        process = subprocess.Popen(["git", "--git-dir", git_dir, "diff", "-M", "--no-color", "--no-ext-diff", base, head],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=self._env(None))
+        try:
+            count = 0
+            for block in self._iter_diff_blocks(process.stdout):
+                if count == len(changes):
+                    raise LocalGitError(f"git diff listed more files than the {len(changes)} of the raw listing")
+                status, filename = changes[count]
+                count += 1
+                yield self._patch_file(_DIFF_STATUS.get(status, "modified"), filename, block)
+            returncode = process.wait()
+            if returncode != 0:
+                raise LocalGitError(f"git diff failed with exit code {returncode}")
+            if count != len(changes):
+                raise LocalGitError(f"git diff returned {count} of {len(changes)} files")
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    @staticmethod
+    def _iter_diff_blocks(stream) -> Iterator[List[str]]:
+        block = None
+        for raw_line in stream:
+            line = raw_line.decode("utf-8", "replace").rstrip("\n")
+            if line.startswith("diff --git "):
+                if block is not None:
+                    yield block
+                block = []
+            elif block is not None:
+                block.append(line)
+        if block is not None:
+            yield block
+
+    @staticmethod
+    def _patch_file(status: str, filename: str, block: List[str]) -> PatchFileDTO:
+        '''
+        PatchFileDTO of one "diff --git" block. Like GitHub, the patch starts at the first hunk
+        and binary files have an empty patch.
+        '''
+        hunk_start = next((i for i, line in enumerate(block) if line.startswith("@@")), len(block))
+        hunks = block[hunk_start:]
+        additions = sum(1 for line in hunks if line.startswith("+"))
+        deletions = sum(1 for line in hunks if line.startswith("-"))
+        return PatchFileDTO(
+            filename=filename,
+            status=status,
+            additions=additions,
+            deletions=deletions,
+            changes=additions + deletions,
+            patch="\n".join(hunks)
+        )
+
+    # ----- snapshot
+
+    def iter_snapshot(self, token: str, owner: str, repo: str, revision: str,
+                      fallback: Callable[[], Iterator[CodeFileDTO]]) -> Optional[Iterator[CodeFileDTO]]:
+        '''
+        Every text file of `revision`, filtered like the GitHub snapshot (SnapshotEngine.is_wanted).
+        `fallback` returns the GitHub snapshot stream, used if git fails while the files are streamed.
+        '''
+        def run():
+            git_dir = self.sync(token, owner, repo, [revision])
+            commit = self._resolve(git_dir, revision)
+            if commit is None:
+                raise LocalGitError(f"unknown revision {revision}")
+            listing = self._git(git_dir, "ls-tree", "-r", "-z", "--long", commit).decode("utf-8", "replace")
+            self._count("snapshots")
+            files = self._iter_blob_files(git_dir, self._select_blobs(listing))
+            return self._stream_with_fallback("snapshot", owner, repo, files, fallback, key=lambda f: f.path)
+        return self._guard("snapshot", owner, repo, run)
+
+    def _select_blobs(self, listing: str) -> List[Tuple[str, str]]:
+        engine = self.service.snapshot_engine
+        blobs = []
+        for entry in listing.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            mode, object_type, sha, size = meta.split()
+            # Symlinks (120000) are blobs in git but not files of the snapshot.
+            if object_type != "blob" or mode == "120000":
+                continue
+            if not size.isdigit():
+                # ls-tree prints "-" / "BAD" when it cannot read the blob.
+                raise LocalGitError(f"git ls-tree could not read {path} ({sha})")
+            if engine.is_wanted(path, int(size)):
+                blobs.append((path, sha))
+        return blobs
+
+    def _iter_blob_files(self, git_dir: str, blobs: List[Tuple[str, str]]) -> Iterator[CodeFileDTO]:
+        engine = self.service.snapshot_engine
+        process = subprocess.Popen(["git", "--git-dir", git_dir, "cat-file", "--batch"],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=self._env(None))
+        try:
+            for path, sha in blobs:
+                process.stdin.write(f"{sha}\n".encode("ascii"))
+                process.stdin.flush()
+                # "<sha> <type> <size>", or "<sha> missing"; nothing at all if cat-file died.
+                header = process.stdout.readline().split()
+                if len(header) != 3 or not header[2].isdigit():
+                    raise LocalGitError(f"git cat-file could not read {path} ({sha}): {b' '.join(header).decode('ascii', 'replace') or 'no output'}")
+                size = int(header[2])
+                content = process.stdout.read(size)
+                if len(content) != size or process.stdout.read(1) != b"\n":
+                    raise LocalGitError(f"git cat-file returned a short read for {path} ({sha})")
+                if b"\0" in content:
+                    continue
+                try:
+                    yield engine.code_file(path, content.decode("utf-8"))
+                except UnicodeDecodeError:
+                    continue
+        finally:
+            process.stdin.close()
+            process.stdout.close()
+            process.wait()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, repos=sorted(self.repos))
@@ -0,0 +1,362 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Tuple
+
+from flask import current_app
+
+from commitary_backend.commitaryUtils.tokenFingerprint import token_fingerprint
+from commitary_backend.services.githubService.resilience import GithubUnavailableError, deadline_remaining
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority of the GitHub calls made by the current thread / task. Routes are interactive by default.
+github_priority: contextvars.ContextVar[int] = contextvars.ContextVar("github_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    '''
+    Marks the GitHub calls made inside the block (or the decorated function) as background work.
+    Background calls yield to interactive ones and keep a reserve of the quota untouched.
+    '''
+    reset_token = github_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        github_priority.reset(reset_token)
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Quota:
+    '''
+    Last known rate limit state of one (token, resource) pair.
+    '''
+    __slots__ = ("limit", "remaining", "used", "reset_at", "updated_at")
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.used = None
+        self.reset_at = None
+        self.updated_at = None
+
+    def to_dict(self) -> dict:
+        return {"limit": self.limit, "remaining": self.remaining, "used": self.used,
+                "reset_at": self.reset_at, "updated_at": self.updated_at}
+
+
+class _TokenState:
+    __slots__ = ("quotas", "blocked_until", "in_flight", "interactive_waiting", "background_waiting", "next_background_at")
+
+    def __init__(self):
+        self.quotas: Dict[str, _Quota] = {}
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.interactive_waiting = 0
+        self.background_waiting = 0
+        self.next_background_at = 0.0
+
+
+class RateLimitScheduler:
+    '''
+    Per-token GitHub quota accounting and request gating.
+
+    - Quotas (core, graphql, search ...) are read from the X-RateLimit-* headers of every response.
+    - Retry-After and secondary rate limit responses block the token until the given time.
+    - A token has at most `concurrency` requests in flight. Interactive calls are admitted before
+      waiting background calls.
+    - Background calls leave `reserve` of the quota to interactive calls and are paced so the
+      remaining budget lasts until the quota resets.
+    - Waits never outlast the operation deadline (resilience.operation_deadline): the call fails
+      with a 504 GithubUnavailableError instead.
+    - `async_slot` is the asyncio variant used by AsyncGithubService; it awaits a future that
+      releases and quota updates resolve, instead of blocking the loop.
+
+    Config (env):
+        GITHUB_RATE_LIMIT_CONCURRENCY   in-flight requests per token                  (default 8)
+        GITHUB_RATE_LIMIT_RESERVE       share of the quota kept for interactive calls (default 0.1)
+        GITHUB_RATE_LIMIT_MAX_WAIT      longest interactive wait in seconds           (default 30)
+        GITHUB_RATE_LIMIT_MAX_BACKGROUND_WAIT  longest background wait in seconds     (default 900)
+    '''
+
+    def __init__(self):
+        self.concurrency = int(os.getenv("GITHUB_RATE_LIMIT_CONCURRENCY", "8"))
+        self.reserve = float(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "0.1"))
+        self.max_wait = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "30"))
+        self.max_background_wait = float(os.getenv("GITHUB_RATE_LIMIT_MAX_BACKGROUND_WAIT", "900"))
+        self._condition = threading.Condition()
+        self._tokens: Dict[str, _TokenState] = {}
+        # (loop, future) of the coroutines waiting in acquire_async, woken by _notify.
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._stats = {"requests": 0, "background_requests": 0, "waits": 0, "wait_ms": 0.0, "blocked_responses": 0}
+
+    def _state(self, fingerprint: str) -> _TokenState:
+        state = self._tokens.get(fingerprint)
+        if state is None:
+            state = self._tokens[fingerprint] = _TokenState()
+        return state
+
+    # ----- gating
+
+    @contextmanager
+    def slot(self, token: str, resource: str = "core", url: str = ""):
+        '''
+        Holds one request slot of the token while the block runs. Waits for quota / priority first.
+        '''
+        fingerprint = token_fingerprint(token)
+        self.acquire(fingerprint, resource, url)
+        try:
+            yield
+        finally:
+            self.release(fingerprint)
+
+    @asynccontextmanager
+    async def async_slot(self, token: str, resource: str = "core", url: str = ""):
+        '''
+        asyncio variant of `slot`.
+        '''
+        fingerprint = token_fingerprint(token)
+        await self.acquire_async(fingerprint, resource, url)
+        try:
+            yield
+        finally:
+            self.release(fingerprint)
+
+    def _wait_limit(self, started: float, background: bool) -> Tuple[float, bool]:
+        '''
+        (monotonic time after which the caller stops waiting, True if that is the operation deadline).
+        '''
+        give_up_at = started + (self.max_background_wait if background else self.max_wait)
+        remaining = deadline_remaining()
+        if remaining is not None and started + remaining <= give_up_at:
+            return started + remaining, True
+        return give_up_at, False
+
+    def _stop_waiting(self, fingerprint: str, url: str, at_deadline: bool):
+        if at_deadline:
+            raise GithubUnavailableError(f"Deadline exceeded while waiting for the rate limit of token {fingerprint}", url, 504)
+        # Give up waiting and let GitHub answer; the response updates the quota.
+        current_app.logger.debug(f"WARN: Rate limit wait for token {fingerprint} exceeded. Sending anyway.")
+
+    def acquire(self, fingerprint: str, resource: str, url: str = ""):
+        background = github_priority.get() == BACKGROUND
+        started = time.monotonic()
+        give_up_at, at_deadline = self._wait_limit(started, background)
+        waited = False
+        with self._condition:
+            state = self._state(fingerprint)
+            self._enqueue(state, background)
+            try:
+                while True:
+                    delay = self._admission_delay(state, resource, background)
+                    if delay <= 0:
+                        break
+                    remaining_wait = give_up_at - time.monotonic()
+                    if remaining_wait <= 0:
+                        self._stop_waiting(fingerprint, url, at_deadline)
+                        break
+                    waited = True
+                    self._condition.wait(min(delay, remaining_wait))
+            finally:
+                self._dequeue(state, background)
+            self._admit(state, resource, background, started, waited)
+
+    async def acquire_async(self, fingerprint: str, resource: str, url: str = ""):
+        background = github_priority.get() == BACKGROUND
+        started = time.monotonic()
+        give_up_at, at_deadline = self._wait_limit(started, background)
+        waited = False
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            state = self._state(fingerprint)
+            self._enqueue(state, background)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._admission_delay(state, resource, background)
+                    if delay <= 0:
+                        self._dequeue(state, background)
+                        self._admit(state, resource, background, started, waited)
+                        return
+                    # Registered under the lock so a release between the check and the wait is not missed.
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                remaining_wait = give_up_at - time.monotonic()
+                if remaining_wait <= 0:
+                    self._stop_waiting(fingerprint, url, at_deadline)
+                    with self._condition:
+                        self._dequeue(state, background)
+                        self._admit(state, resource, background, started, waited)
+                    return
+                waited = True
+                await asyncio.wait((woken,), timeout=min(delay, remaining_wait))
+        except BaseException:
+            with self._condition:
+                self._dequeue(state, background)
+            raise
+
+    def _enqueue(self, state: _TokenState, background: bool):
+        if background:
+            state.background_waiting += 1
+        else:
+            state.interactive_waiting += 1
+
+    def _dequeue(self, state: _TokenState, background: bool):
+        if background:
+            state.background_waiting -= 1
+        else:
+            state.interactive_waiting -= 1
+            # Background callers held back for this one may go now.
+            self._notify()
+
+    def _admit(self, state: _TokenState, resource: str, background: bool, started: float, waited: bool):
+        '''Takes the slot. Called with the lock held.'''
+        state.in_flight += 1
+        if background:
+            state.next_background_at = time.monotonic() + self._background_interval(state, resource)
+            self._stats["background_requests"] += 1
+        self._stats["requests"] += 1
+        if waited:
+            self._stats["waits"] += 1
+            self._stats["wait_ms"] += (time.monotonic() - started) * 1000
+
+    def release(self, fingerprint: str):
+        with self._condition:
+            self._state(fingerprint).in_flight -= 1
+            self._notify()
+
+    def _notify(self):
+        '''Wakes the threads and coroutines waiting for admission. Called with the lock held.'''
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed.
+                pass
+
+    def _admission_delay(self, state: _TokenState, resource: str, background: bool) -> float:
+        '''
+        Seconds to wait before the next request may start (0 = go). Called with the lock held.
+        A positive delay is also returned (as a poll interval) while waiting for a free slot.
+        '''
+        now = time.monotonic()
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        if state.in_flight >= self.concurrency:
+            return 1.0
+        quota = state.quotas.get(resource)
+        exhausted_for = self._seconds_to_reset(quota)
+        if quota is not None and quota.remaining is not None and quota.remaining <= 0 and exhausted_for > 0:
+            return exhausted_for
+        if not background:
+            return 0.0
+
+        if state.interactive_waiting > 0:
+            return 1.0
+        if quota is not None and quota.remaining is not None and quota.limit:
+            if quota.remaining <= quota.limit * self.reserve and exhausted_for > 0:
+                return exhausted_for
+        return max(0.0, state.next_background_at - now)
+
+    def _background_interval(self, state: _TokenState, resource: str) -> float:
+        '''
+        Spacing between background requests that spreads the usable budget until the reset.
+        No pacing while more than half of the quota is left.
+        '''
+        quota = state.quotas.get(resource)
+        if quota is None or quota.remaining is None or not quota.limit or quota.remaining > quota.limit / 2:
+            return 0.0
+        usable = max(quota.remaining - quota.limit * self.reserve, 1)
+        return self._seconds_to_reset(quota) / usable
+
+    @staticmethod
+    def _seconds_to_reset(quota: _Quota | None) -> float:
+        if quota is None or quota.reset_at is None:
+            return 0.0
+        return max(0.0, quota.reset_at - time.time())
+
+    # ----- accounting
+
+    def record(self, token: str, response, default_resource: str = "core"):
+        '''
+        Updates the quota of the token from a GitHub response (requests or httpx).
+        '''
+        headers = response.headers
+        now = time.time()
+        with self._condition:
+            state = self._state(token_fingerprint(token))
+            remaining = headers.get("X-RateLimit-Remaining")
+            if remaining is not None:
+                resource = headers.get("X-RateLimit-Resource", default_resource)
+                quota = state.quotas.setdefault(resource, _Quota())
+                quota.remaining = int(remaining)
+                quota.limit = int(headers.get("X-RateLimit-Limit", quota.limit or 0)) or None
+                quota.used = int(headers["X-RateLimit-Used"]) if headers.get("X-RateLimit-Used") else quota.used
+                quota.reset_at = float(headers["X-RateLimit-Reset"]) if headers.get("X-RateLimit-Reset") else quota.reset_at
+                quota.updated_at = now
+
+            if response.status_code in (403, 429):
+                block_for = self._block_seconds(response, now)
+                if block_for > 0:
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + block_for)
+                    self._stats["blocked_responses"] += 1
+            self._notify()
+
+    @staticmethod
+    def _block_seconds(response, now: float) -> float:
+        '''
+        How long GitHub asks us to back off after a 403/429, following its documented order:
+        Retry-After, then an exhausted X-RateLimit-Reset, then one minute for secondary limits.
+        '''
+        headers = response.headers
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                return 60.0
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            return max(0.0, float(headers["X-RateLimit-Reset"]) - now)
+        if response.status_code == 429 or b"secondary rate limit" in (response.content or b"").lower():
+            return 60.0
+        return 0.0
+
+    # ----- introspection
+
+    def getQuota(self, token: str) -> dict:
+        '''
+        Current quota state of one token: per resource limits plus scheduler queue state.
+        '''
+        with self._condition:
+            state = self._tokens.get(token_fingerprint(token))
+            if state is None:
+                return {"resources": {}, "blocked_for": 0.0, "in_flight": 0, "interactive_waiting": 0, "background_waiting": 0}
+            return self._describe(state)
+
+    @staticmethod
+    def _describe(state: _TokenState) -> dict:
+        return {
+            "resources": {name: quota.to_dict() for name, quota in state.quotas.items()},
+            "blocked_for": max(0.0, state.blocked_until - time.monotonic()),
+            "in_flight": state.in_flight,
+            "interactive_waiting": state.interactive_waiting,
+            "background_waiting": state.background_waiting,
+        }
+
+    def getStats(self) -> dict:
+        with self._condition:
+            stats = dict(self._stats)
+            stats["tokens"] = {fingerprint: self._describe(state) for fingerprint, state in self._tokens.items()}
+            return stats
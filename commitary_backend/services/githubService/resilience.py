@@ -0,0 +1,284 @@
+import contextvars
+import json as jsonlib
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+from urllib.parse import urlparse
+
+import requests
+from flask import current_app
+
+
+# Monotonic time by which the current logical operation (route, insight job) must be done.
+_operation_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("github_operation_deadline", default=None)
+
+
+@contextmanager
+def operation_deadline(seconds: float | None, detach: bool = False):
+    '''
+    Bounds the total time GitHub calls may take inside the block (retries and backoff included).
+    Nested deadlines keep the earliest one, unless `detach` starts an independent budget
+    (e.g. a background job started from a request). `None` means no deadline.
+    Usable as a decorator.
+    '''
+    new_deadline = None if seconds is None else time.monotonic() + seconds
+    current = _operation_deadline.get()
+    if not detach and current is not None and (new_deadline is None or current < new_deadline):
+        new_deadline = current
+    reset_token = _operation_deadline.set(new_deadline)
+    try:
+        yield
+    finally:
+        _operation_deadline.reset(reset_token)
+
+
+def deadline_remaining() -> float | None:
+    '''Seconds left for the current operation, or None without a deadline.'''
+    deadline = _operation_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class GithubUnavailableError(requests.exceptions.HTTPError):
+    '''
+    Raised without contacting GitHub: the endpoint's circuit is open or the operation ran out of time.
+    It carries a synthetic 503/504 response so existing `RequestException` handlers keep working.
+    '''
+
+    def __init__(self, message: str, url: str, status_code: int):
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = "Circuit Open" if status_code == 503 else "Deadline Exceeded"
+        response.url = url
+        response._content = jsonlib.dumps({"message": message}).encode("utf-8")
+        response.headers["Content-Type"] = "application/json"
+        super().__init__(message, response=response)
+
+
+def endpoint_key(method: str, url: str) -> str:
+    '''
+    Groups URLs by endpoint for the circuit breaker, e.g. "GET /repos/:owner/:repo/compare".
+    '''
+    path = urlparse(url).path
+    parts = [part for part in path.split("/") if part]
+    if parts[:1] == ["repos"] and len(parts) >= 3:
+        parts = ["repos", ":owner", ":repo"] + parts[3:4]
+    elif parts[:1] == ["repositories"] and len(parts) >= 2:
+        parts = ["repositories", ":id"]
+    else:
+        parts = parts[:1]
+    return f"{method} /" + "/".join(parts)
+
+
+class CircuitBreaker:
+    '''
+    Per-endpoint breaker. `failure_threshold` consecutive failures (5xx, timeouts, connection errors)
+    open the circuit for `reset_timeout` seconds; then one probe request is let through (half open).
+    '''
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, dict] = {}
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def _circuit(self, key: str) -> dict:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = {"state": "closed", "failures": 0, "opened_at": 0.0, "probing": False}
+        return circuit
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit["state"] == "closed":
+                return True
+            if circuit["state"] == "open" and time.monotonic() - circuit["opened_at"] >= self.reset_timeout:
+                circuit["state"] = "half_open"
+                circuit["probing"] = False
+            if circuit["state"] == "half_open" and not circuit["probing"]:
+                circuit["probing"] = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, key: str):
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit.update(state="closed", failures=0, probing=False)
+
+    def release(self, key: str):
+        '''Ends a probe that never reached GitHub (e.g. out of time), without judging the endpoint.'''
+        with self._lock:
+            self._circuit(key)["probing"] = False
+
+    def record_failure(self, key: str):
+        with self._lock:
+            circuit = self._circuit(key)
+            circuit["failures"] += 1
+            if circuit["state"] == "half_open" or circuit["failures"] >= self.failure_threshold:
+                if circuit["state"] != "open":
+                    self._stats["opened"] += 1
+                circuit.update(state="open", opened_at=time.monotonic(), probing=False)
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["circuits"] = {key: {"state": c["state"], "failures": c["failures"]}
+                                 for key, c in self._circuits.items() if c["state"] != "closed" or c["failures"]}
+            return stats
+
+
+class ResilientCaller:
+    '''
+    Shared retry / circuit breaker / deadline policy for GitHub calls.
+
+    - Retries 5xx, timeouts, connection errors, 429 and secondary-rate-limit 403s.
+    - Backoff is "full jitter" (uniform between 0 and the exponential step, capped); a Retry-After
+      header replaces it. A wait that would run past the operation deadline is not taken.
+    - Per-endpoint circuit breaker fails fast while GitHub is degraded.
+
+    Config (env):
+        GITHUB_RETRY_ATTEMPTS            attempts per request                      (default 4)
+        GITHUB_RETRY_BASE_DELAY          first backoff step in seconds             (default 0.5)
+        GITHUB_RETRY_MAX_DELAY           longest single backoff in seconds         (default 8)
+        GITHUB_CIRCUIT_FAILURES          consecutive failures opening a circuit    (default 5)
+        GITHUB_CIRCUIT_RESET_SECONDS     open time before a probe request          (default 30)
+    '''
+
+    SERVER_ERRORS = (500, 502, 503, 504)
+
+    def __init__(self):
+        self.max_attempts = int(os.getenv("GITHUB_RETRY_ATTEMPTS", "4"))
+        self.base_delay = float(os.getenv("GITHUB_RETRY_BASE_DELAY", "0.5"))
+        self.max_delay = float(os.getenv("GITHUB_RETRY_MAX_DELAY", "8"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("GITHUB_CIRCUIT_FAILURES", "5")),
+            reset_timeout=float(os.getenv("GITHUB_CIRCUIT_RESET_SECONDS", "30")),
+        )
+        self._lock = threading.Lock()
+        self._stats = {"attempts": 0, "retries": 0, "deadline_exceeded": 0, "retry_wait_ms": 0.0}
+
+    # ----- building blocks (also used by the async client)
+
+    def before_attempt(self, key: str, url: str, timeout: float) -> float:
+        '''
+        Checks the deadline and the circuit. Returns the timeout to use for this attempt.
+        '''
+        remaining = deadline_remaining()
+        if remaining is not None and remaining <= 0:
+            self._count("deadline_exceeded")
+            raise GithubUnavailableError(f"Deadline exceeded before calling {key}", url, 504)
+        if not self.breaker.allow(key):
+            raise GithubUnavailableError(f"Circuit open for {key}: GitHub is failing, not calling it", url, 503)
+        self._count("attempts")
+        return timeout if remaining is None else max(0.1, min(timeout, remaining))
+
+    def is_rate_limited(self, response) -> bool:
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        if response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Remaining") == "0":
+            return True
+        return b"rate limit" in (response.content or b"").lower()
+
+    def retry_delay(self, key: str, response, attempt: int) -> float | None:
+        '''
+        Delay before retrying `response`, or None when it must be returned to the caller as is.
+        Records the outcome in the circuit breaker.
+        '''
+        if response.status_code in self.SERVER_ERRORS:
+            self.breaker.record_failure(key)
+        else:
+            # 2xx/3xx/4xx: GitHub is answering, including rate limit responses.
+            self.breaker.record_success(key)
+            if not self.is_rate_limited(response):
+                return None
+        if attempt >= self.max_attempts - 1:
+            return None
+        retry_after = self._retry_after(response)
+        return self._fit_deadline(retry_after if retry_after is not None else self.backoff(attempt))
+
+    def error_delay(self, key: str, attempt: int) -> float | None:
+        '''
+        Delay before retrying after a timeout / connection error, or None to re-raise it.
+        '''
+        self.breaker.record_failure(key)
+        if attempt >= self.max_attempts - 1:
+            return None
+        return self._fit_deadline(self.backoff(attempt))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response) -> float | None:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            if response.headers.get("X-RateLimit-Remaining") == "0" and response.headers.get("X-RateLimit-Reset"):
+                return max(0.0, float(response.headers["X-RateLimit-Reset"]) - time.time())
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def _fit_deadline(self, delay: float) -> float | None:
+        remaining = deadline_remaining()
+        if remaining is not None and delay >= remaining:
+            self._count("deadline_exceeded")
+            return None
+        with self._lock:
+            self._stats["retries"] += 1
+            self._stats["retry_wait_ms"] += delay * 1000
+        return delay
+
+    # ----- sync driver
+
+    def call(self, method: str, url: str, send: Callable[[float], requests.Response], timeout: float) -> requests.Response:
+        '''
+        Runs `send(timeout)` with retries. Returns the last response; the caller checks its status.
+        '''
+        key = endpoint_key(method, url)
+        attempt = 0
+        while True:
+            attempt_timeout = self.before_attempt(key, url, timeout)
+            try:
+                response = send(attempt_timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = self.error_delay(key, attempt)
+                if delay is None:
+                    raise
+                current_app.logger.debug(f"WARN: {key} failed ({type(e).__name__}). Retrying in {delay:.2f} seconds...")
+            except GithubUnavailableError:
+                # Raised before reaching GitHub (rate limit wait past the deadline).
+                self.breaker.release(key)
+                raise
+            except BaseException:
+                # Any other failure (ChunkedEncodingError, CassetteMissError ...) still settles the attempt,
+                # otherwise a half-open probe would keep the circuit half open forever.
+                self.breaker.record_failure(key)
+                raise
+            else:
+                delay = self.retry_delay(key, response, attempt)
+                if delay is None:
+                    return response
+                current_app.logger.debug(f"WARN: Received status {response.status_code} from {key}. Retrying in {delay:.2f} seconds...")
+                # Discarded response: returns the connection of a stream=True call (tarball) to the pool.
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["circuit_breaker"] = self.breaker.getStats()
+        return stats
@@ -0,0 +1,323 @@
+import os
+import posixpath
+import tarfile
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from flask import current_app
+
+from commitary_backend.commitaryUtils.appContextExecutor import run_concurrently
+from commitary_backend.commitaryUtils.diskLruStore import DiskLRUStore
+from commitary_backend.dto.gitServiceDTO import CodeFileDTO, CodebaseDTO
+
+
+DEFAULT_SKIP_EXTENSIONS = (
+    ".png,.jpg,.jpeg,.gif,.bmp,.ico,.webp,.svg,.pdf,.zip,.gz,.tgz,.tar,.7z,.rar,.jar,.war,"
+    ".exe,.dll,.so,.dylib,.bin,.class,.pyc,.o,.a,.woff,.woff2,.ttf,.otf,.eot,"
+    ".mp3,.mp4,.mov,.avi,.wav,.ogg,.psd,.db,.sqlite,.pkl,.pt,.onnx,.h5,.npy,.lock"
+)
+
+
+class SnapshotEngine:
+    '''
+    Builds a full codebase snapshot of a revision.
+
+    1. tree   : one recursive git/trees call lists every file of the revision.
+    2. filter : blobs are dropped by byteSize / extension before any text is downloaded.
+    3. blobs  : texts are fetched in batched GraphQL queries (aliased `object(oid:)` lookups),
+                several batches in parallel.
+
+    Large repositories use the "archive" mode instead: the tarball of the revision is
+    downloaded once and extracted as a stream, filters are applied per tar member.
+
+    Config (env):
+        GITHUB_SNAPSHOT_BATCH_SIZE        blobs per GraphQL query                  (default 50)
+        GITHUB_SNAPSHOT_PARALLELISM       concurrent GraphQL queries               (default 4)
+        GITHUB_SNAPSHOT_MAX_BLOB_BYTES    skip blobs larger than this              (default 512KB)
+        GITHUB_SNAPSHOT_SKIP_EXTENSIONS   comma separated extensions to skip
+        GITHUB_SNAPSHOT_MODE              auto | api | archive                     (default auto)
+        GITHUB_SNAPSHOT_ARCHIVE_REPOS     comma separated owner/repo always using archive mode
+        GITHUB_SNAPSHOT_ARCHIVE_MIN_FILES auto mode: archive above this many files (default 1000)
+        GITHUB_SNAPSHOT_ARCHIVE_MIN_BYTES auto mode: archive above this many bytes (default 20MB)
+        GITHUB_BLOB_STORE_DIR             content-addressed blob text store ("" disables it)
+        GITHUB_BLOB_STORE_MAX_BYTES       size cap of the blob store on disk       (default 1GB)
+
+    Blob texts are kept in a local content-addressed store keyed by git blob SHA.
+    Blobs are immutable, so a weekly snapshot only downloads files that changed since the last one.
+    '''
+
+    MODES = ("auto", "api", "archive")
+
+    def __init__(self, service):
+        self.service = service
+        self.batch_size = int(os.getenv("GITHUB_SNAPSHOT_BATCH_SIZE", "50"))
+        self.parallelism = int(os.getenv("GITHUB_SNAPSHOT_PARALLELISM", "4"))
+        self.max_blob_bytes = int(os.getenv("GITHUB_SNAPSHOT_MAX_BLOB_BYTES", str(512 * 1024)))
+        self.skip_extensions = {
+            ext.strip().lower() for ext in os.getenv("GITHUB_SNAPSHOT_SKIP_EXTENSIONS", DEFAULT_SKIP_EXTENSIONS).split(",") if ext.strip()
+        }
+        self.mode = os.getenv("GITHUB_SNAPSHOT_MODE", "auto")
+        self.archive_repos = {
+            name.strip().lower() for name in os.getenv("GITHUB_SNAPSHOT_ARCHIVE_REPOS", "").split(",") if name.strip()
+        }
+        self.archive_min_files = int(os.getenv("GITHUB_SNAPSHOT_ARCHIVE_MIN_FILES", "1000"))
+        self.archive_min_bytes = int(os.getenv("GITHUB_SNAPSHOT_ARCHIVE_MIN_BYTES", str(20 * 1024 * 1024)))
+        blob_store_dir = os.getenv("GITHUB_BLOB_STORE_DIR", os.path.join(tempfile.gettempdir(), "commitary", "blobs"))
+        self.blob_store = DiskLRUStore(
+            blob_store_dir, max_bytes=int(os.getenv("GITHUB_BLOB_STORE_MAX_BYTES", str(1024 ** 3)))
+        ) if blob_store_dir else None
+        self._lock = threading.Lock()
+        self._stats = {"snapshots": 0, "archive_snapshots": 0, "files": 0, "skipped": 0, "blob_queries": 0, "stored_blobs": 0,
+                       "tree_ms": 0.0, "filter_ms": 0.0, "blobs_ms": 0.0, "archive_ms": 0.0}
+
+    # ----- phases
+
+    def list_tree(self, token: str, owner: str, repo: str, revision: str) -> Tuple[List[dict], bool]:
+        '''
+        Lists every entry of the revision's tree with one recursive call.
+        Returns (entries, truncated). GitHub truncates trees above ~100k entries.
+        '''
+        tree_data = self.service._make_request(
+            "GET", f"/repos/{owner}/{repo}/git/trees/{revision}", token, params={"recursive": "1"}
+        )
+        return tree_data.get("tree", []), bool(tree_data.get("truncated"))
+
+    def is_wanted(self, path: str, size: int | None) -> bool:
+        '''
+        True if a blob of this path and byte size should be part of the snapshot.
+        '''
+        if size is not None and size > self.max_blob_bytes:
+            return False
+        _, ext = posixpath.splitext(path.lower())
+        return ext not in self.skip_extensions
+
+    def select_blobs(self, entries: List[dict]) -> Tuple[List[dict], int]:
+        '''
+        Keeps the blob entries worth downloading. Returns (selected, skipped count).
+        '''
+        selected = []
+        skipped = 0
+        for entry in entries:
+            if entry.get("type") != "blob":
+                continue
+            if self.is_wanted(entry["path"], entry.get("size")):
+                selected.append(entry)
+            else:
+                skipped += 1
+        return selected, skipped
+
+    def fetch_blob_texts(self, token: str, owner: str, repo: str, blobs: List[dict]) -> Iterator[Tuple[dict, str]]:
+        '''
+        Yields (tree entry, text) for every blob that has a text representation.
+        Blobs found in the local blob store are served from disk, only unseen blobs are downloaded.
+        '''
+        missing = []
+        yield from self.iter_stored_blobs(blobs, missing)
+
+        def fetch_batch(batch: List[dict]) -> List[Tuple[dict, str]]:
+            return self._fetch_blob_batch(token, owner, repo, batch)
+
+        for results in run_concurrently(fetch_batch, self.batches(missing), self.parallelism):
+            for entry, text in results:
+                self.store_blob(entry, text)
+                yield entry, text
+
+    def iter_stored_blobs(self, blobs: List[dict], missing: List[dict]) -> Iterator[Tuple[dict, str]]:
+        '''
+        Yields (tree entry, text) of the blobs found in the blob store and appends the others to `missing`.
+        '''
+        for entry in blobs:
+            data = self.blob_store.get(entry["sha"]) if self.blob_store else None
+            if data is None:
+                missing.append(entry)
+                continue
+            with self._lock:
+                self._stats["stored_blobs"] += 1
+            yield entry, data.decode("utf-8")
+
+    def batches(self, blobs: List[dict]) -> List[List[dict]]:
+        return [blobs[i:i + self.batch_size] for i in range(0, len(blobs), self.batch_size)]
+
+    def store_blob(self, entry: dict, text: str):
+        if not self.blob_store:
+            return
+        try:
+            self.blob_store.put(entry["sha"], text.encode("utf-8"))
+        except OSError as e:
+            current_app.logger.debug(f"Warning: Could not write blob {entry['sha']} to the blob store: {e}")
+
+    def _fetch_blob_batch(self, token: str, owner: str, repo: str, batch: List[dict]) -> List[Tuple[dict, str]]:
+        query, variables = self.blob_batch_query(owner, repo, batch)
+        result = self.service._execute_graphql(query, variables, token)
+        return self.parse_blob_batch(result, batch)
+
+    def blob_batch_query(self, owner: str, repo: str, batch: List[dict]) -> Tuple[str, Dict[str, str]]:
+        '''
+        GraphQL query and variables fetching the texts of a batch of blobs with aliased `object(oid:)` lookups.
+        '''
+        declarations = ", ".join(f"$o{i}: GitObjectID!" for i in range(len(batch)))
+        selections = "\n".join(
+            f"b{i}: object(oid: $o{i}) {{ ... on Blob {{ isBinary text }} }}" for i in range(len(batch))
+        )
+        query = f"""
+        query GetBlobTexts($owner: String!, $name: String!, {declarations}) {{
+          repository(owner: $owner, name: $name) {{
+            {selections}
+          }}
+        }}
+        """
+        variables: Dict[str, str] = {"owner": owner, "name": repo}
+        variables.update({f"o{i}": entry["sha"] for i, entry in enumerate(batch)})
+        return query, variables
+
+    def parse_blob_batch(self, result: dict, batch: List[dict]) -> List[Tuple[dict, str]]:
+        '''
+        (tree entry, text) of every text blob in a GetBlobTexts result.
+        '''
+        with self._lock:
+            self._stats["blob_queries"] += 1
+
+        repository = (result.get("data") or {}).get("repository") or {}
+        texts = []
+        for i, entry in enumerate(batch):
+            blob = repository.get(f"b{i}") or {}
+            if blob.get("isBinary") or blob.get("text") is None:
+                continue
+            texts.append((entry, blob["text"]))
+        return texts
+
+    # ----- archive mode
+
+    def iter_archive_files(self, token: str, owner: str, repo: str, revision: str) -> Iterator[Tuple[str, str]]:
+        '''
+        Downloads the tarball of `revision` once and yields (path, text) while extracting it as a stream.
+        Nothing is written to disk and members are filtered before their content is read.
+        '''
+        headers = {"Authorization": f"bearer {token}", "Accept": "application/vnd.github.v3+json"}
+        url = f"{self.service.api_base_url}/repos/{owner}/{repo}/tarball/{revision}"
+        response = self.service.resilience.call("GET", url, lambda timeout: self.service._pooled_request(
+            token, "core", "GET", url, headers=headers, stream=True, timeout=(timeout, 300)
+        ), timeout=15)
+        try:
+            response.raise_for_status()
+            with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Members are prefixed with a "<owner>-<repo>-<sha>/" directory.
+                    path = member.name.split("/", 1)[1] if "/" in member.name else member.name
+                    if not self.is_wanted(path, member.size):
+                        with self._lock:
+                            self._stats["skipped"] += 1
+                        continue
+                    extracted = archive.extractfile(member)
+                    if extracted is None:
+                        continue
+                    content = extracted.read()
+                    if b"\0" in content:
+                        continue
+                    try:
+                        yield path, content.decode("utf-8")
+                    except UnicodeDecodeError:
+                        continue
+        finally:
+            response.close()
+
+    def mode_for(self, owner: str, repo: str) -> str:
+        '''
+        Configured snapshot mode of a repository.
+        '''
+        if f"{owner}/{repo}".lower() in self.archive_repos:
+            return "archive"
+        return self.mode if self.mode in self.MODES else "auto"
+
+    def prefers_archive(self, blobs: List[dict], truncated: bool) -> bool:
+        '''
+        Auto mode: the archive is cheaper than batched blob queries for large trees.
+        '''
+        total_bytes = sum(entry.get("size") or 0 for entry in blobs)
+        return truncated or len(blobs) > self.archive_min_files or total_bytes > self.archive_min_bytes
+
+    # ----- snapshot
+
+    def iter_snapshot(self, token: str, owner: str, repo: str, revision: str, mode: str | None = None) -> Iterator[CodeFileDTO]:
+        '''
+        Lazily yields every text file of `revision` (commit SHA or branch name).
+        mode: "api" (tree + batched blobs), "archive" (tarball stream) or "auto".
+        '''
+        mode = mode or self.mode_for(owner, repo)
+        started = time.perf_counter()
+        files = 0
+
+        if mode != "archive":
+            entries, truncated = self.list_tree(token, owner, repo, revision)
+            tree_done = time.perf_counter()
+            blobs, skipped = self.select_blobs(entries)
+            filter_done = time.perf_counter()
+
+            if mode == "api" or not self.prefers_archive(blobs, truncated):
+                if truncated:
+                    current_app.logger.debug(f"Warning: Tree of {owner}/{repo}@{revision} is truncated by GitHub. The snapshot is partial.")
+                for entry, text in self.fetch_blob_texts(token, owner, repo, blobs):
+                    files += 1
+                    yield self.code_file(entry["path"], text)
+
+                timings = {
+                    "tree_ms": (tree_done - started) * 1000,
+                    "filter_ms": (filter_done - tree_done) * 1000,
+                    "blobs_ms": (time.perf_counter() - filter_done) * 1000,
+                }
+                self._record(timings, files=files, skipped=skipped)
+                current_app.logger.debug(
+                    f"DEBUG: Snapshot {owner}/{repo}@{revision}: {files} files, {skipped} skipped. "
+                    f"tree {timings['tree_ms']:.0f}ms, filter {timings['filter_ms']:.0f}ms, blobs {timings['blobs_ms']:.0f}ms"
+                )
+                return
+
+            current_app.logger.debug(f"DEBUG: {owner}/{repo}@{revision} has {len(blobs)} files. Using archive mode.")
+
+        archive_started = time.perf_counter()
+        for path, text in self.iter_archive_files(token, owner, repo, revision):
+            files += 1
+            yield self.code_file(path, text)
+        timings = {"archive_ms": (time.perf_counter() - archive_started) * 1000}
+        self._record(timings, files=files, skipped=0, archive=True)
+        current_app.logger.debug(
+            f"DEBUG: Snapshot {owner}/{repo}@{revision} (archive): {files} files. archive {timings['archive_ms']:.0f}ms"
+        )
+
+    def snapshot(self, token: str, owner: str, repo: str, revision: str, mode: str | None = None) -> CodebaseDTO:
+        '''
+        Returns every text file of `revision` (commit SHA or branch name), sorted by path.
+        '''
+        parsed_files = sorted(self.iter_snapshot(token, owner, repo, revision, mode=mode), key=lambda f: f.path)
+        return CodebaseDTO(repository_name=f"{owner}/{repo}", files=parsed_files)
+
+    @staticmethod
+    def code_file(path: str, text: str) -> CodeFileDTO:
+        return CodeFileDTO(
+            filename=posixpath.basename(path),
+            path=path,
+            code_content=text,
+            last_modified_at=datetime.now()
+        )
+
+    def _record(self, timings: dict, files: int, skipped: int, archive: bool = False):
+        with self._lock:
+            self._stats["snapshots"] += 1
+            if archive:
+                self._stats["archive_snapshots"] += 1
+            self._stats["files"] += files
+            self._stats["skipped"] += skipped
+            for phase, elapsed in timings.items():
+                self._stats[phase] += elapsed
+
+    def getStats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        if self.blob_store:
+            stats["blob_store"] = self.blob_store.getStats()
+        return stats
@@ -1,10 +1,11 @@
 import os
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import psycopg2
 import tiktoken
 from commitary_backend.services.githubService.GithubServiceObject import gb_service
+from commitary_backend.services.githubService.resilience import operation_deadline
 from commitary_backend.services.insightService.RAGService import rag_service
 from commitary_backend.dto.insightDTO import DailyInsightDTO, DailyInsightListDTO, InsightItemDTO
 from commitary_backend.dto.gitServiceDTO import CodebaseDTO, CodeFileDTO, CommitListDTO, DiffDTO, RepoDTO
@@ -104,53 +105,85 @@ class InsightService():
     embeddings=self.embeddings,
     collection_name="codebase_snapshots"
 )
-    def _embed_and_store_codebase(self, codebase_dto: CodebaseDTO, commitary_id: int, branch: str, repo_id: int,snapshot_week_id:str):
+    def _embed_and_store_codebase(self, repository_name: str, files: Iterable[CodeFileDTO], commitary_id: int, branch: str, repo_id: int,snapshot_week_id:str, conn=None) -> int:
         """
         Chunks, embeds, and stores the codebase snapshot in the vector database.
+        `files` may be a lazy iterator: documents are embedded batch by batch while files keep arriving,
+        so a large snapshot never sits fully in memory. Returns the number of stored chunks.
+
+        Chunks are written with `snapshot_complete: false` and flagged complete only after the last batch.
+        If the iterator fails part way (deadline, open circuit, HTTP error) the chunks written so far are
+        deleted and the error is re-raised, so a partial snapshot is never taken for the week's context.
         """
         current_app.logger.debug(f"embed_and_store_codebase")
+        # Process documents in batches to avoid timeouts and memory issues.
+        batch_size = 16
         documents = []
-        for file in codebase_dto.files:
-            chunks = self.text_splitter.split_text(file.code_content)
-            for i, chunk in enumerate(chunks):
-                doc = Document(
-                    page_content=chunk,
-                    metadata={
-                        "commitary_user": commitary_id,
-                        "repo_name": codebase_dto.repository_name,
-                        "repo_id": repo_id,
-                        "target_branch": branch,
-                        "filepath": file.path,
-                        "type": "codebase",
-                        "lastModifiedTime": file.last_modified_at.isoformat(),
-                        "snapshot_week_id": snapshot_week_id,
-                        "chunk_id": f"{repo_id}_{branch}_{file.path}_{i}"
-                    }
-                )
-                documents.append(doc)
-        
-        if documents:
-            current_app.logger.debug(f"Attempting to embed and store {len(documents)} document chunks for codebase snapshot.")
-            
-            # Process documents in batches to avoid timeouts and memory issues.
-            batch_size = 16
+        stored_ids = []
+        try:
             with get_openai_callback() as cb:
-                for i in range(0, len(documents), batch_size):
-                    batch = documents[i:i + batch_size]
-                    self.vector_store.add_documents(batch)
-                    current_app.logger.debug(f"  - Successfully processed batch {i//batch_size + 1}/{(len(documents) + batch_size - 1)//batch_size}")
+                for file in files:
+                    chunks = self.text_splitter.split_text(file.code_content)
+                    for i, chunk in enumerate(chunks):
+                        doc = Document(
+                            page_content=chunk,
+                            metadata={
+                                "commitary_user": commitary_id,
+                                "repo_name": repository_name,
+                                "repo_id": repo_id,
+                                "target_branch": branch,
+                                "filepath": file.path,
+                                "type": "codebase",
+                                "lastModifiedTime": file.last_modified_at.isoformat(),
+                                "snapshot_week_id": snapshot_week_id,
+                                "snapshot_complete": False,
+                                "chunk_id": f"{repo_id}_{branch}_{file.path}_{i}"
+                            }
+                        )
+                        documents.append(doc)
+                        if len(documents) >= batch_size:
+                            stored_ids.extend(self.vector_store.add_documents(documents))
+                            current_app.logger.debug(f"  - Successfully processed batch {len(stored_ids) // batch_size} ({len(stored_ids)} chunks so far)")
+                            documents = []
+
+                if documents:
+                    stored_ids.extend(self.vector_store.add_documents(documents))
                 current_app.logger.debug(f"OpenAI Token Usage for Embedding: {cb}")
-
-            current_app.logger.debug(f"Successfully embedded and stored all document chunks.")
+        except Exception:
+            if stored_ids:
+                current_app.logger.debug(f"ERROR: Snapshot stream failed after {len(stored_ids)} chunks. Discarding the partial snapshot.")
+                try:
+                    self.vector_store.delete(ids=stored_ids)
+                except Exception as e:
+                    # Left flagged incomplete; createDailyInsight removes them before the next attempt.
+                    current_app.logger.debug(f"ERROR: Could not discard the partial snapshot: {e}")
+            raise
+
+        if stored_ids:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE langchain_pg_embedding
+                    SET cmetadata = cmetadata || '{"snapshot_complete": true}'::jsonb
+                    WHERE id = ANY(%s)
+                    """,
+                    (list(stored_ids),)
+                )
+            conn.commit()
+            current_app.logger.debug(f"Successfully embedded and stored {len(stored_ids)} document chunks for codebase snapshot.")
         else:
             current_app.logger.debug("No documents to embed for this codebase snapshot.")
+        return len(stored_ids)
             
     
     @with_db_connection
+    @operation_deadline(float(os.getenv("GITHUB_INSIGHT_DEADLINE", "300")), detach=True)
     def createDailyInsight(self,  commitary_id: int, repo_id: int, start_datetime: datetime, branch: str, user_token: str,conn=None) -> int:
         """
         Creates a daily insight for a specific branch using a RAG system. It fetches a snapshot from the previous Monday,
         embeds it if it doesn't exist, and then uses it as context to analyze the diff for the given day.
+        Runs on the /createInsight request thread, so its GitHub calls keep interactive priority. The snapshot
+        and diff get their own GITHUB_INSIGHT_DEADLINE budget instead of the route's shorter one.
         """
         current_app.logger.debug(f"{datetime.now()} debug code")
 
@@ -191,6 +224,7 @@ class InsightService():
                     AND cmetadata->>'target_branch' = %s
                     AND cmetadata->>'snapshot_week_id' = %s
                     AND cmetadata->>'type' = 'codebase'
+                    AND COALESCE(cmetadata->>'snapshot_complete', 'true') = 'true'
                     LIMIT 1
                     """,
                     (str(repo_id), branch, snapshot_week_id_str) # Cast repo_id to string for JSONB query
@@ -198,6 +232,20 @@ class InsightService():
                 if cur.fetchone():
                     snapshot_exists = True
                     print(f"DEBUG: Codebase snapshot for week of {snapshot_week_id_str} already exists.")
+                else:
+                    # Leftovers of an interrupted snapshot of this week (e.g. the worker was killed mid-stream).
+                    cur.execute(
+                        """
+                        DELETE FROM langchain_pg_embedding
+                        WHERE cmetadata->>'repo_id' = %s
+                        AND cmetadata->>'target_branch' = %s
+                        AND cmetadata->>'snapshot_week_id' = %s
+                        AND cmetadata->>'type' = 'codebase'
+                        AND cmetadata->>'snapshot_complete' = 'false'
+                        """,
+                        (str(repo_id), branch, snapshot_week_id_str)
+                    )
+            conn.commit()
 
             repo_dto: RepoDTO = gb_service.getSingleRepoByID(user_token, repo_id)
             if not repo_dto:
@@ -206,12 +254,14 @@ class InsightService():
 
             if not snapshot_exists:
                 print(f"DEBUG: Fetching codebase snapshot for Monday: {monday_start_datetime}")
-                monday_snapshot: Optional[CodebaseDTO] = gb_service.getSnapshotByIdDatetime(user_token, repo_id, branch, monday_start_datetime)
+                monday_snapshot: Optional[Iterator[CodeFileDTO]] = gb_service.iterSnapshotByIdDatetime(user_token, repo_id, branch, monday_start_datetime)
 
-                if monday_snapshot and monday_snapshot.files:
+                # Files are streamed from GitHub straight into the chunking/embedding pipeline.
+                stored_chunks = 0
+                if monday_snapshot is not None:
                     # Pass the new stable ID when storing the snapshot
-                    self._embed_and_store_codebase(monday_snapshot, commitary_id, branch, repo_id, snapshot_week_id_str)
-                else:
+                    stored_chunks = self._embed_and_store_codebase(repo_dto.github_full_name, monday_snapshot, commitary_id, branch, repo_id, snapshot_week_id_str, conn=conn)
+                if not stored_chunks:
                     print("DEBUG: No codebase snapshot found for Monday. Proceeding without RAG context.")
 
 
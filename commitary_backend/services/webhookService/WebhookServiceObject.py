@@ -0,0 +1,175 @@
+import hashlib
+import hmac
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from commitary_backend.commitaryUtils.ttlCache import TTLCache
+from commitary_backend.services.githubService.GithubServiceObject import gb_service
+from commitary_backend.services.githubService.rateLimitScheduler import background_priority
+from commitary_backend.services.githubService.resilience import operation_deadline
+
+
+class WebhookService:
+    '''
+    Ingests GitHub webhooks (push, create, delete, pull_request) so local state is fresh before the next read.
+
+    - Deliveries are verified with the X-Hub-Signature-256 HMAC of the raw body.
+    - Accepted deliveries go to an in-process queue drained by one worker thread; the route answers at once.
+    - A delivery id (X-GitHub-Delivery) is processed once per worker process. The id is forgotten again
+      when processing fails, so GitHub's redelivery is accepted. Handlers only invalidate or fast-forward
+      local state, so a delivery seen by two processes is harmless.
+    - Caches live in each worker process, and only the process that receives a delivery invalidates
+      them. Other workers keep serving their entries until the TTLs expire (see README).
+    - With GITHUB_WEBHOOK_TOKEN set, a push also precomputes the day's commit list and diff of the branch
+      as background work, warming the commit mirror, the timeline and the compare cache.
+
+    Config (env):
+        GITHUB_WEBHOOK_SECRET      shared secret of the webhook (required, deliveries are refused without it)
+        GITHUB_WEBHOOK_TOKEN       token used for precomputation (default none: no precomputation)
+        GITHUB_WEBHOOK_QUEUE_SIZE  deliveries waiting for the worker (default 1000)
+    '''
+
+    EVENTS = ("push", "create", "delete", "pull_request")
+
+    def __init__(self):
+        self.secret = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+        self.precompute_token = os.getenv("GITHUB_WEBHOOK_TOKEN", "")
+        self._queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("GITHUB_WEBHOOK_QUEUE_SIZE", "1000")))
+        self._deliveries = TTLCache(ttl=24 * 3600, max_entries=100_000)
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._pid = None
+        self._stats = {"received": 0, "duplicates": 0, "ignored": 0, "rejected": 0, "processed": 0,
+                       "failed": 0, "precomputed": 0, "dropped": 0}
+
+    # ----- receiving
+
+    def verify(self, body: bytes, signature: str | None) -> bool:
+        valid = bool(self.secret and signature and signature.startswith("sha256=")) and hmac.compare_digest(
+            hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest(), signature[len("sha256="):]
+        )
+        if not valid:
+            self._count("rejected")
+        return valid
+
+    def enqueue(self, event: str, delivery_id: str, payload: dict) -> str:
+        '''
+        Queues one verified delivery. Returns "queued", "duplicate", "ignored" or "busy".
+        '''
+        self._count("received")
+        if event not in self.EVENTS:
+            self._count("ignored")
+            return "ignored"
+        with self._lock:
+            if self._deliveries.get(delivery_id) is not TTLCache.MISSING:
+                self._stats["duplicates"] += 1
+                return "duplicate"
+            self._deliveries.set(delivery_id, True)
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((event, delivery_id, payload))
+        except queue.Full:
+            self._deliveries.invalidate(delivery_id)
+            self._count("dropped")
+            return "busy"
+        return "queued"
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+                app = current_app._get_current_object()
+                self._worker = threading.Thread(target=self._run, args=(app,), name="commitary-webhooks", daemon=True)
+                self._pid = os.getpid()
+                self._worker.start()
+
+    def _run(self, app):
+        while True:
+            event, delivery_id, payload = self._queue.get()
+            try:
+                with app.app_context():
+                    self.process(event, payload)
+                self._count("processed")
+            except Exception as e:
+                self._deliveries.invalidate(delivery_id)
+                self._count("failed")
+                with app.app_context():
+                    current_app.logger.debug(f"ERROR: Webhook delivery {delivery_id} ({event}) failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self, timeout: float | None = None) -> bool:
+        '''Waits until every queued delivery is processed. Returns False on timeout.'''
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        return done.wait(timeout)
+
+    # ----- processing
+
+    def process(self, event: str, payload: dict):
+        repository = payload.get("repository") or {}
+        owner = (repository.get("owner") or {}).get("login") or (repository.get("owner") or {}).get("name")
+        repo = repository.get("name")
+        repo_id = repository.get("id")
+        if not owner or not repo or repo_id is None:
+            return
+        current_app.logger.debug(f"DEBUG: Webhook {event} for {owner}/{repo}")
+
+        if event == "push":
+            self._on_push(owner, repo, int(repo_id), payload)
+        elif event in ("create", "delete") and payload.get("ref_type") == "branch":
+            gb_service.invalidateRepo(repo_id)
+            gb_service.commit_timeline.invalidate(owner, repo, payload["ref"])
+            gb_service.local_git.mark_stale(owner, repo)
+            if event == "delete":
+                gb_service.commit_mirror.forget_branch(int(repo_id), payload["ref"])
+        elif event == "pull_request":
+            pull_request = payload.get("pull_request") or {}
+            if payload.get("action") == "closed" and pull_request.get("merged"):
+                gb_service.invalidateMergedPullRequests(owner, repo)
+
+    def _on_push(self, owner: str, repo: str, repo_id: int, payload: dict):
+        ref = payload.get("ref", "")
+        if not ref.startswith("refs/heads/"):
+            return
+        branch = ref[len("refs/heads/"):]
+        gb_service.invalidateRepo(repo_id)
+        gb_service.local_git.mark_stale(owner, repo)
+        if payload.get("deleted"):
+            gb_service.commit_timeline.invalidate(owner, repo, branch)
+            return
+        gb_service.commit_timeline.apply_push(
+            owner, repo, branch, payload.get("before"), payload.get("after"),
+            payload.get("commits") or [], bool(payload.get("forced"))
+        )
+        if self.precompute_token:
+            self._precompute(repo_id, branch)
+
+    @background_priority()
+    @operation_deadline(float(os.getenv("GITHUB_BACKGROUND_DEADLINE", "1800")), detach=True)
+    def _precompute(self, repo_id: int, branch: str):
+        '''
+        Warms what the day's /githubCommits2, /diff and /createInsight requests of the branch read.
+        '''
+        now = datetime.now(timezone.utc)
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        token = self.precompute_token
+        gb_service.getCommitMsgs2(repo_id, token, branch, day_start.isoformat(), now.isoformat())
+        gb_service.getDiffByIdTime3(user_token=token, repo_id=repo_id, branch=branch,
+                                    datetime_from=day_start, datetime_to=now)
+        self._count("precomputed")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize(), precompute=bool(self.precompute_token))
+
+
+# Singleton instance
+webhook_service = WebhookService()
@@ -0,0 +1,23 @@
+import pytest
+from flask import Flask
+
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+
+
+pytest_plugins = ["test_codes.perfRegression"]
+
+
+@pytest.fixture
+def app_context():
+    """GithubService logs through flask.current_app, so unit tests need an app context."""
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def github_service(app_context, tmp_path, monkeypatch):
+    """A fresh GithubService instance, isolated from the module-level singleton and from on-disk caches."""
+    monkeypatch.setenv("GITHUB_BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare"))
+    return GithubService()
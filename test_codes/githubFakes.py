@@ -0,0 +1,43 @@
+import io
+import json as jsonlib
+
+import requests
+
+
+# Offline stand-ins for GitHub used by the unit tests.
+
+
+def make_response(status: int = 200, body=None, headers: dict | None = None, url: str = "") -> requests.Response:
+    """Builds a requests.Response as if it came from the GitHub API."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = jsonlib.dumps(body).encode("utf-8") if body is not None else b""
+    response.raw = io.BytesIO(response._content)
+    response.headers.update(headers or {})
+    response.headers.setdefault("Content-Type", "application/json")
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+
+class FakeHttpPool:
+    """
+    Replaces GithubService.http_pool. `handler(method, url, kwargs)` returns a Response.
+    Every call is recorded in `calls` as (method, url, kwargs).
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        response = self.handler(method, url, kwargs)
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    def getStats(self) -> dict:
+        return {"requests": len(self.calls)}
+
+    def close(self):
+        pass
@@ -0,0 +1,96 @@
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+
+# Performance regression gate for replayed GitHub scenarios.
+#
+#     with perf_scenario("commit_list_2_weeks", service):
+#         service.getCommitMsgs2(...)
+#
+# measures the upstream calls (resilience attempts, retries included) and the wall time of the
+# block, and fails the test when either exceeds the baseline in perf_baselines.json:
+#     calls  > baseline * (1 + --perf-calls-tolerance)
+#     wall   > baseline * (1 + --perf-time-tolerance) + --perf-time-slack-ms
+# `pytest --perf-update` rewrites the baselines of the scenarios that ran.
+
+DEFAULT_BASELINES = Path(__file__).with_name("perf_baselines.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "performance regression gate")
+    group.addoption("--perf-baselines", default=str(DEFAULT_BASELINES), help="baseline file of the perf scenarios")
+    group.addoption("--perf-update", action="store_true", help="write the measured values as new baselines")
+    group.addoption("--perf-calls-tolerance", type=float, default=0.0, help="allowed relative increase of upstream calls")
+    group.addoption("--perf-time-tolerance", type=float, default=0.5, help="allowed relative increase of wall time")
+    group.addoption("--perf-time-slack-ms", type=float, default=50.0, help="absolute wall time slack (timer noise)")
+
+
+def pytest_configure(config):
+    config._perf_results = {}
+
+
+def _load_baselines(config) -> dict:
+    path = Path(config.getoption("--perf-baselines"))
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def regressions(measured: dict, baseline: dict, calls_tolerance: float, time_tolerance: float, slack_ms: float) -> list:
+    problems = []
+    if measured["calls"] > baseline["calls"] * (1 + calls_tolerance):
+        problems.append(f"upstream calls {measured['calls']} > baseline {baseline['calls']}")
+    allowed_ms = baseline["wall_ms"] * (1 + time_tolerance) + slack_ms
+    if measured["wall_ms"] > allowed_ms:
+        problems.append(f"wall time {measured['wall_ms']:.1f} ms > {allowed_ms:.1f} ms (baseline {baseline['wall_ms']:.1f} ms)")
+    return problems
+
+
+@pytest.fixture
+def perf_scenario(request):
+    config = request.config
+    baselines = _load_baselines(config)
+
+    @contextmanager
+    def scenario(name: str, service):
+        attempts_before = service.resilience.getStats()["attempts"]
+        start = time.perf_counter()
+        yield
+        measured = {
+            "calls": service.resilience.getStats()["attempts"] - attempts_before,
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        config._perf_results[name] = measured
+        if config.getoption("--perf-update") or name not in baselines:
+            return
+        problems = regressions(measured, baselines[name], config.getoption("--perf-calls-tolerance"),
+                               config.getoption("--perf-time-tolerance"), config.getoption("--perf-time-slack-ms"))
+        if problems:
+            pytest.fail(f"Performance regression in scenario '{name}': " + "; ".join(problems), pytrace=False)
+
+    return scenario
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    results = getattr(config, "_perf_results", {})
+    if not results or not config.getoption("--perf-update"):
+        return
+    path = Path(config.getoption("--perf-baselines"))
+    baselines = _load_baselines(config)
+    baselines.update(results)
+    path.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, "_perf_results", {})
+    if not results:
+        return
+    baselines = _load_baselines(config)
+    terminalreporter.section("perf scenarios")
+    for name, measured in sorted(results.items()):
+        baseline = baselines.get(name)
+        reference = f"(baseline {baseline['calls']} calls, {baseline['wall_ms']} ms)" if baseline else "(no baseline)"
+        terminalreporter.write_line(f"{name}: {measured['calls']} calls, {measured['wall_ms']} ms {reference}")
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from commitary_backend.services.githubService.AsyncGithubServiceObject import AsyncGithubService
+
+
+def repo_json(repo_id):
+    return {"id": repo_id, "node_id": f"R_{repo_id}", "name": f"repo{repo_id}", "owner": {"id": 7, "login": "owner"},
+            "html_url": "https://github.com/owner/repo", "url": "https://api.github.com/repos/owner/repo",
+            "full_name": f"owner/repo{repo_id}", "description": None}
+
+
+BRANCH_REFS = {"data": {"repository": {"refs": {
+    "pageInfo": {"hasNextPage": False, "endCursor": None},
+    "nodes": [{"name": "main", "target": {"oid": "a" * 40, "committedDate": "2025-09-15T00:00:00Z", "author": {"date": "2025-09-15T00:00:00Z"}}}]}}}}
+
+
+@pytest.fixture
+def async_service(github_service):
+    requests_seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        if request.url.path.startswith("/repositories/"):
+            repo_id = int(request.url.path.rsplit("/", 1)[1])
+            if repo_id == 404:
+                return httpx.Response(404, json={"message": "Not Found"})
+            return httpx.Response(200, json=repo_json(repo_id))
+        if request.url.path == "/graphql":
+            assert "GetBranchRefs" in json.loads(request.content)["query"]
+            return httpx.Response(200, json=BRANCH_REFS)
+        raise AssertionError(f"unexpected request {request.url}")
+
+    service = AsyncGithubService(github_service, transport=httpx.MockTransport(handler))
+    service.requests_seen = requests_seen
+    return service
+
+
+def test_gather_branches_for_several_repositories(async_service):
+    branches = asyncio.run(async_service.gatherBranchesByRepoIds("token", [1, 2, 404]))
+
+    assert [b.name for b in branches[1].branchList] == ["main"]
+    assert branches[2].branchList[0].repo_name == "repo2"
+    assert branches[404].branchList == []
+    # Repository metadata lands in the cache shared with the sync service.
+    assert async_service.sync.getSingleRepoByID("token", 2).github_name == "repo2"
+    assert len(async_service.requests_seen) == 5
+
+
+def test_run_sync_bridges_to_background_loop(async_service):
+    repos = async_service.run_sync(async_service.gatherReposByIds, "token", [3, 4], timeout=10)
+
+    assert [repo.github_id for repo in repos] == [3, 4]
+    assert async_service.getStats()["requests"] == 2
+    async_service.bridge.close()
+
+
+def test_diff_by_id_time3_matches_sync_output(github_service, async_service):
+    nodes = [{"oid": "c" * 40, "parents": {"nodes": [{"oid": "b" * 40}]}},
+             {"oid": "b" * 40, "parents": {"nodes": [{"oid": "a" * 40}]}}]
+    compare = {"base_commit": {"sha": "a" * 40}, "merge_base_commit": {"sha": "a" * 40},
+               "files": [{"filename": "app.py", "status": "modified", "additions": 1, "deletions": 0, "changes": 1, "patch": "@@"}]}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/repositories/"):
+            return httpx.Response(200, json=repo_json(42))
+        if request.url.path == "/graphql":
+            return httpx.Response(200, json={"data": {"repository": {"ref": {"target": {"history": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": nodes}}}}}})
+        return httpx.Response(200, json=compare)
+
+    service = AsyncGithubService(github_service, transport=httpx.MockTransport(handler))
+    diffs = asyncio.run(service.gatherDiffsByBranches("token", 42, ["main", "dev"],
+                                                      datetime(2025, 9, 15, tzinfo=timezone.utc), datetime(2025, 9, 16, tzinfo=timezone.utc)))
+
+    assert diffs["main"].commit_before_sha == "a" * 40 and diffs["dev"].branch_after == "dev"
+    assert [f.filename for f in diffs["main"].files] == ["app.py"]
+
+
+def test_async_requests_take_rate_limit_slots(async_service):
+    asyncio.run(async_service.gatherReposByIds("token", [5, 6]))
+    assert async_service.sync.rate_limiter.getStats()["requests"] == 2
+    assert async_service.sync.rate_limiter.getQuota("token")["in_flight"] == 0
@@ -45,4 +45,296 @@ def test_github_getuser():
 #     assert userMetadata.github_id is not None
 #     assert userMetadata.github_username is not None
     
-     
\ No newline at end of file
+     
+
+# ----- Offline tests (fake HTTP pool, no token needed)
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+REPO_JSON = {
+    "id": 42, "node_id": "R_42", "name": "commitary_prj",
+    "owner": {"id": 7, "login": "YangYounghwa"},
+    "html_url": "https://github.com/YangYounghwa/commitary_prj",
+    "url": "https://api.github.com/repos/YangYounghwa/commitary_prj",
+    "full_name": "YangYounghwa/commitary_prj", "description": None,
+}
+
+
+def test_getSingleRepoByID_is_cached_per_token(github_service):
+    github_service.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, REPO_JSON))
+
+    first = github_service.getSingleRepoByID("token-a", 42)
+    second = github_service.getSingleRepoByID("token-a", "42")
+    github_service.getSingleRepoByID("token-b", 42)
+
+    assert first is second
+    assert len(github_service.http_pool.calls) == 2
+
+
+def test_getSingleRepoByID_negative_cache_and_invalidation(github_service):
+    github_service.http_pool = FakeHttpPool(lambda m, u, k: make_response(404, {"message": "Not Found"}))
+
+    assert github_service.getSingleRepoByID("token-a", 404) is None
+    assert github_service.getSingleRepoByID("token-a", 404) is None
+    assert len(github_service.http_pool.calls) == 1
+
+    assert github_service.invalidateRepo(404) == 1
+    github_service.getSingleRepoByID("token-a", 404)
+    assert len(github_service.http_pool.calls) == 2
+
+
+def test_getSingleRepoByID_treats_invalid_ids_as_not_found(github_service):
+    github_service.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, REPO_JSON))
+
+    assert github_service.getSingleRepoByID("token-a", "abc") is None
+    assert github_service.getSingleRepoByID("token-a", None) is None
+    assert github_service.getBranchesByRepoId("token-a", "abc").branchList == []
+    assert github_service.http_pool.calls == []
+
+
+def test_list_branches_pages_graphql_refs(github_service):
+    pages = {
+        None: {"hasNextPage": True, "endCursor": "c1", "nodes": [{"name": "main", "target": {"oid": "a", "committedDate": "2025-09-15T00:00:00Z", "author": {"date": "2025-09-14T00:00:00Z"}}}]},
+        "c1": {"hasNextPage": False, "endCursor": None, "nodes": [{"name": "dev", "target": {"oid": "b", "committedDate": "2025-09-16T00:00:00Z", "author": None}}]},
+    }
+
+    def handler(method, url, kwargs):
+        page = pages[kwargs["json"]["variables"]["cursor"]]
+        return make_response(200, {"data": {"repository": {"refs": {
+            "pageInfo": {"hasNextPage": page["hasNextPage"], "endCursor": page["endCursor"]},
+            "nodes": page["nodes"]}}}})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    branches = github_service.getBranches(None, "token", "YangYounghwa", "commitary_prj").branchList
+
+    assert [b.name for b in branches] == ["main", "dev"]
+    assert branches[0].last_modification.day == 14
+    assert branches[1].last_modification.day == 16
+    assert len(github_service.http_pool.calls) == 2
+
+
+def _rest_commit(sha, parents=1):
+    return {
+        "sha": sha, "author": {"id": 1, "login": "dev"},
+        "parents": [{"sha": f"p{i}"} for i in range(parents)],
+        "commit": {"message": f"msg {sha}", "author": {"name": "dev", "email": "dev@example.com", "date": "2025-09-15T10:00:00Z"}},
+    }
+
+
+def test_iterCommitMsgs_follows_link_header(github_service):
+    def handler(method, url, kwargs):
+        if "/repositories/42" in url:
+            return make_response(200, REPO_JSON)
+        if "page=2" in url:
+            return make_response(200, [_rest_commit("c3")])
+        next_url = "https://api.github.com/repos/YangYounghwa/commitary_prj/commits?page=2"
+        return make_response(200, [_rest_commit("c1"), _rest_commit("c2", parents=2)],
+                             headers={"Link": f'<{next_url}>; rel="next"'})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    commits = github_service.getCommitMsgs(42, "token", "main", "2025-09-15T00:00:00Z", "2025-09-16T00:00:00Z").commitList
+
+    assert [c.sha for c in commits] == ["c1", "c2", "c3"]
+    first_page_params = github_service.http_pool.calls[1][2]["params"]
+    assert first_page_params["per_page"] == 100
+    assert github_service.http_pool.calls[2][2]["params"] is None
+
+
+def test_getCommitMsgs_only_hides_commit_request_failures(github_service):
+    def handler(method, url, kwargs):
+        if "/repositories/" in url:
+            return make_response(200 if url.endswith("/42") else 401, REPO_JSON if url.endswith("/42") else {"message": "Bad credentials"})
+        return make_response(422, {"message": "No commit found for SHA: gone"})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    assert github_service.getCommitMsgs(42, "token", "gone", "2025-09-15T00:00:00Z", "2025-09-16T00:00:00Z").commitList == []
+    with pytest.raises(requests.exceptions.HTTPError) as raised:
+        github_service.getCommitMsgs(43, "token", "main", "2025-09-15T00:00:00Z", "2025-09-16T00:00:00Z")
+    assert raised.value.response.status_code == 401
+
+
+def _graphql_node(oid):
+    return {"oid": oid, "message": oid, "committedDate": "2025-09-15T10:00:00Z",
+            "author": {"name": "dev", "email": "dev@example.com", "user": None},
+            "associatedPullRequests": {"nodes": []}}
+
+
+def test_iterCommitMsgs2_follows_page_info(github_service):
+    pages = {None: (["n1", "n2"], True, "cur"), "cur": (["n3"], False, None)}
+
+    def handler(method, url, kwargs):
+        if "/repositories/42" in url:
+            return make_response(200, REPO_JSON)
+        variables = kwargs["json"]["variables"]
+        oids, has_next, end = pages[variables["cursor"]]
+        assert variables["first"] == 2
+        return make_response(200, {"data": {"repository": {"ref": {"target": {"history": {
+            "pageInfo": {"hasNextPage": has_next, "endCursor": end},
+            "nodes": [_graphql_node(o) for o in oids]}}}}}})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    stream = github_service.iterCommitMsgs2(42, "token", "main", "2025-09-15T00:00:00Z", "2025-09-16T00:00:00Z", page_size=2)
+
+    assert next(stream).sha == "n1"
+    assert len(github_service.http_pool.calls) == 2  # repo lookup + first page only
+    assert [c.sha for c in stream] == ["n2", "n3"]
+
+
+COMPARE_JSON = {
+    "base_commit": {"sha": "a" * 40}, "merge_base_commit": {"sha": "a" * 40},
+    "files": [{"filename": "app.py", "status": "modified", "additions": 1, "deletions": 0, "changes": 1, "patch": "@@ +1 @@"}],
+}
+
+
+def test_getDiffBySHA_caches_full_sha_pairs(github_service):
+    github_service.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, COMPARE_JSON))
+
+    first = github_service.getDiffBySHA(None, "token-a", "owner", "repo", "a" * 40, "b" * 40)
+    second = github_service.getDiffBySHA(None, "token-b", "owner", "repo", "a" * 40, "b" * 40)
+    github_service.getDiffBySHA(None, "token-a", "owner", "repo", "main", "b" * 40)
+
+    assert second == first and second is not first
+    assert len(github_service.http_pool.calls) == 2  # branch names are never cached
+    stats = github_service.compare_cache.getStats()
+    assert stats["hits"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_getDiffByIdTime3_resolves_range_in_one_history_query(github_service):
+    nodes = [{"oid": "c" * 40, "parents": {"nodes": [{"oid": "b" * 40}]}},
+             {"oid": "b" * 40, "parents": {"nodes": [{"oid": "a" * 40}]}}]
+
+    def handler(method, url, kwargs):
+        if "/repositories/42" in url:
+            return make_response(200, REPO_JSON)
+        if url.endswith("/graphql"):
+            assert "parents(first: 1)" in kwargs["json"]["query"]
+            return make_response(200, {"data": {"repository": {"ref": {"target": {"history": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": nodes}}}}}})
+        assert url.endswith("/compare/" + "a" * 40 + "..." + "c" * 40)
+        return make_response(200, COMPARE_JSON)
+
+    github_service.http_pool = FakeHttpPool(handler)
+    diff = github_service.getDiffByIdTime3("token", 42, "main",
+                                           datetime(2025, 9, 15, tzinfo=timezone.utc), datetime(2025, 9, 16, tzinfo=timezone.utc))
+
+    assert diff.repo_id == 42 and diff.branch_after == "main"
+    assert len(diff.files) == 1
+    assert len(github_service.http_pool.calls) == 3
+
+
+def test_getDiffBySHA_diffs_the_trees_when_compare_is_truncated(github_service):
+    def file(name, patch=None):
+        entry = {"filename": name, "status": "modified", "additions": 1, "deletions": 0, "changes": 1}
+        if patch is not None:
+            entry["patch"] = patch
+        return entry
+
+    compare_files = [file("big.py"), file("app.py", patch="@@ full @@")] + [file(f"f{i}.py", patch="@@") for i in range(298)]
+    big_1, big_2, new, moved, same, app_1, app_2 = (str(i) * 40 for i in range(1, 8))
+    blobs = {big_1: "a = 1\nb = 2\n", big_2: "a = 1\nb = 3\n", new: "new\n", moved: "moved\n", same: "same\n"}
+    base_tree = {"big.py": big_1, "app.py": app_1, "old_name.py": moved, "reverted.py": same}
+    head_tree = {"big.py": big_2, "app.py": app_2, "new_name.py": moved, "reverted.py": same, "new.py": new}
+
+    def handler(method, url, kwargs):
+        if "/compare/" in url:
+            return make_response(200, {"base_commit": {"sha": "a" * 40}, "merge_base_commit": {"sha": "c" * 40},
+                                       "total_commits": 3, "commits": [], "files": compare_files})
+        if "/git/trees/" in url:
+            tree = base_tree if url.endswith("c" * 40) else head_tree
+            return make_response(200, {"truncated": False, "tree": [{"path": p, "type": "blob", "sha": b} for p, b in tree.items()]})
+        variables = kwargs["json"]["variables"]
+        repository = {f"b{i}": {"isBinary": False, "text": blobs[variables[f"o{i}"]]}
+                      for i in range(len(variables) - 2)}
+        return make_response(200, {"data": {"repository": repository}})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    diff = github_service.getDiffBySHA(None, "token", "owner", "repo", "a" * 40, "b" * 40)
+
+    files = {f.filename: f for f in diff.files}
+    # Net changes only: the reverted file and the renamed file's old path are not reported.
+    assert len(files) == 302 and "reverted.py" not in files and "old_name.py" not in files
+    assert files["app.py"].patch == "@@ full @@"
+    assert files["big.py"].patch == "@@ -1,2 +1,2 @@\n a = 1\n-b = 2\n+b = 3"
+    assert (files["big.py"].additions, files["big.py"].deletions, files["big.py"].changes) == (1, 1, 2)
+    assert files["new.py"].status == "added" and files["new.py"].patch == "@@ -0,0 +1 @@\n+new"
+    assert files["new_name.py"].status == "renamed" and files["new_name.py"].changes == 0
+    assert github_service.diff_assembler.getStats()["truncated_diffs"] == 1
+    assert github_service.diff_assembler.getStats()["tree_diff_files"] == 3
+
+
+def test_merged_branch_lookup_uses_pull_requests_and_caches(github_service):
+    def handler(method, url, kwargs):
+        assert url.endswith("/graphql")
+        assert kwargs["json"]["variables"]["head"] == "feature"
+        return make_response(200, {"data": {"repository": {"pullRequests": {
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [{"mergedAt": "2025-09-10T00:00:00Z", "headRefOid": "old", "mergeCommit": {"oid": "m1"}},
+                      {"mergedAt": "2025-09-20T00:00:00Z", "headRefOid": "new", "mergeCommit": {"oid": "m2"}}]}}}})
+
+    github_service.http_pool = FakeHttpPool(handler)
+    lookup = github_service._get_sha_by_datetime_after_merge
+
+    assert lookup("token", "owner", "repo", "main", "feature", datetime(2025, 9, 30, tzinfo=timezone.utc)) == "new"
+    assert lookup("token", "owner", "repo", "main", "feature", datetime(2025, 9, 15)) == "old"
+    assert len(github_service.http_pool.calls) == 1
+
+
+def test_merged_branch_lookup_falls_back_to_merge_commit_scan(github_service):
+    def handler(method, url, kwargs):
+        if url.endswith("/graphql"):
+            return make_response(200, {"data": {"repository": {"pullRequests": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": []}}}})
+        return make_response(200, [{"sha": "m", "parents": [{"sha": "p1"}, {"sha": "p2"}],
+                                    "commit": {"message": "Merge branch 'feature' into main"}}])
+
+    github_service.http_pool = FakeHttpPool(handler)
+    sha = github_service._get_sha_by_datetime_after_merge("token", "owner", "repo", "main", "feature",
+                                                          datetime(2025, 9, 30, tzinfo=timezone.utc))
+    assert sha == "p2"
+
+
+def test_merged_branch_lookup_scans_merge_commits_when_graphql_reports_errors(github_service):
+    def handler(method, url, kwargs):
+        if url.endswith("/graphql"):
+            return make_response(200, {"data": None, "errors": [
+                {"type": "FORBIDDEN", "message": "Resource not accessible by integration"}]})
+        return make_response(200, [{"sha": "m", "parents": [{"sha": "p1"}, {"sha": "p2"}],
+                                    "commit": {"message": "Merge branch 'feature' into main"}}])
+
+    github_service.http_pool = FakeHttpPool(handler)
+    sha = github_service._get_sha_by_datetime_after_merge("token", "owner", "repo", "main", "feature",
+                                                          datetime(2025, 9, 30, tzinfo=timezone.utc))
+    assert sha == "p2"
+
+
+def test_identical_concurrent_requests_are_coalesced(github_service):
+    def handler(method, url, kwargs):
+        # Hold the first call until the second identical request is waiting on it.
+        deadline = time.monotonic() + 5
+        while github_service.single_flight.getStats()["coalesced"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return make_response(200, REPO_JSON)
+
+    github_service.http_pool = FakeHttpPool(handler)
+    app = current_app._get_current_object()
+    results = []
+
+    def fetch():
+        with app.app_context():
+            results.append(github_service.getSingleRepoByID("token", 42))
+
+    threads = [threading.Thread(target=fetch) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(github_service.http_pool.calls) == 1
+    assert results[0] == results[1]
+    assert github_service.getServiceStats()["single_flight"]["coalesced"] == 1
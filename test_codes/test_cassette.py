@@ -0,0 +1,83 @@
+import gzip
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.fakeGithubServer import FakeGithubServer, SyntheticRepo
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+TOKEN = "ghp_" + "a" * 36
+
+
+def _offline_pool():
+    def handler(method, url, kwargs):
+        raise AssertionError(f"Replay reached the network: {method} {url}")
+    return FakeHttpPool(handler)
+
+
+def _service(monkeypatch, mode, path, **env):
+    monkeypatch.setenv("GITHUB_CASSETTE_MODE", mode)
+    monkeypatch.setenv("GITHUB_CASSETTE_PATH", str(path))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return GithubService()
+
+
+def test_recorded_exchanges_replay_without_network_and_are_scrubbed(github_service, tmp_path, monkeypatch):
+    cassette_path = tmp_path / "user.jsonl.gz"
+    recorder = _service(monkeypatch, "record", cassette_path, GITHUB_CASSETTE_SCRUB=r"[\w.]+@example\.com")
+    recorder.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, {
+        "id": 7, "login": "octo", "email": "octo@example.com", "note": f"leaked {TOKEN}",
+    }, headers={"ETag": '"v1"', "Set-Cookie": "session=secret"}))
+    recorded = recorder._make_request("GET", "/user", TOKEN)
+    recorder.cassette.close()
+
+    raw = gzip.open(cassette_path, "rt").read()
+    assert TOKEN not in raw and "octo@example.com" not in raw and "session=secret" not in raw
+    assert '"ETag"' in raw
+
+    replayer = _service(monkeypatch, "replay", cassette_path)
+    replayer.http_pool = _offline_pool()
+    replayed = replayer._make_request("GET", "/user", "another-token")
+    assert replayed == dict(recorded, email="<scrubbed>", note="leaked <scrubbed>")
+    assert replayer.cassette.getStats()["replayed"] == 1
+
+
+@pytest.fixture
+def recorded_fake_github(app_context, tmp_path, monkeypatch):
+    """A cassette of a commit list + same-branch diff recorded against the fake GitHub server."""
+    monkeypatch.setenv("GITHUB_BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare"))
+    repo = SyntheticRepo(commits=60, branches=2, files=20)
+    server = FakeGithubServer([repo], latency=0.01).start()
+    monkeypatch.setenv("GITHUB_API_URL", server.url)
+    main = repo.history(repo.branches["main"])
+    window = (main[20]["date"] - timedelta(minutes=1), main[0]["date"])
+
+    def scenario(service):
+        commits = service.getCommitMsgs2(repo.repo_id, "token", "main", window[0].isoformat(), window[1].isoformat())
+        diff = service.getDiffByIdTime3(user_token="token", repo_id=repo.repo_id, branch="main",
+                                        datetime_from=window[0], datetime_to=window[1])
+        return [c.sha for c in commits.commitList], sorted(f.filename for f in diff.files)
+
+    cassette_path = tmp_path / "scenario.jsonl.gz"
+    recorder = _service(monkeypatch, "record", cassette_path)
+    expected = scenario(recorder)
+    recorder.cassette.close()
+    server.stop()
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare-replay"))
+    return cassette_path, scenario, expected
+
+
+def test_replayed_scenario_stays_within_its_baseline(recorded_fake_github, monkeypatch, perf_scenario):
+    cassette_path, scenario, expected = recorded_fake_github
+    service = _service(monkeypatch, "replay", cassette_path, GITHUB_CASSETTE_TIMING="zero")
+    service.http_pool = _offline_pool()
+
+    with perf_scenario("fake_repo_commit_list_and_diff", service):
+        result = scenario(service)
+
+    assert result == expected
+    assert service.cassette.getStats()["misses"] == 0
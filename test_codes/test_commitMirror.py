@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from commitary_backend.services.githubService import commitMirror
+from commitary_backend.services.githubService.commitMirror import CommitMirror
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+SEP_1 = datetime(2025, 9, 1, tzinfo=timezone.utc)
+SEP_15 = datetime(2025, 9, 15, tzinfo=timezone.utc)
+
+
+def test_plan_only_fetches_what_the_mirror_lacks():
+    assert CommitMirror.plan(None, SEP_15) == ["full"]
+    assert CommitMirror.plan(("a" * 40, SEP_1), SEP_15) == ["tail"]
+    assert CommitMirror.plan(("a" * 40, SEP_15), SEP_1) == ["tail", "backfill"]
+
+
+def test_rows_match_both_commit_list_flavors(github_service):
+    mirror = github_service.commit_mirror
+    merge_row = ("m" * 40, ["p1", "p2"], 1, "dev", "Dev", "dev@example.com", SEP_1, SEP_15,
+                 "Merge pull request #3 from YangYounghwa/feature", "feature")
+
+    rest = mirror._commit_dto(merge_row, 42, "YangYounghwa", "commitary_prj", "main", flavor="rest")
+    graphql = mirror._commit_dto(merge_row, 42, "YangYounghwa", "commitary_prj", "main", flavor="graphql")
+
+    assert rest.branch_sha == "feature" and rest.commit_datetime == SEP_1
+    assert graphql.branch_sha == "feature" and graphql.commit_datetime == SEP_15
+    assert rest.author_name == "dev" and rest.author_github_id == 1
+
+
+def test_mirror_is_skipped_without_database(github_service):
+    assert github_service.commit_mirror.iter_commits("token", 42, "o", "r", "main", SEP_1, SEP_15, "rest") is None
+
+
+class FakeMirrorDb:
+    """In-memory stand-in for the mirror tables. Understands the statements CommitMirror sends."""
+
+    def __init__(self):
+        self.commits = {}
+        self.membership = set()
+        self.state = {}
+        self.in_transaction = False
+        self.on_lock = None
+
+    def cursor(self):
+        return FakeMirrorCursor(self)
+
+    def commit(self):
+        self.in_transaction = False
+
+    def rollback(self):
+        self.in_transaction = False
+
+    def branch(self, repo_id=42, branch="main"):
+        return {sha for r, b, sha in self.membership if (r, b) == (repo_id, branch)}
+
+
+class FakeMirrorCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.db.in_transaction = True
+        if "pg_advisory_xact_lock" in sql:
+            if self.db.on_lock:
+                self.db.on_lock()
+        elif sql.startswith("SELECT head_sha"):
+            state = self.db.state.get(params)
+            self.result = (state[0], state[1]) if state else None
+        elif sql.startswith("DELETE FROM commit_mirror_branch"):
+            self.db.membership = {row for row in self.db.membership if row[:2] != params}
+        elif "INSERT INTO commit_mirror_state" in sql:
+            repo_id, branch, head_sha, covered_since = params
+            self.db.state[(repo_id, branch)] = (head_sha, covered_since)
+        else:
+            raise AssertionError(f"unexpected statement {sql}")
+
+    def fetchone(self):
+        return self.result
+
+    def insert(self, sql, rows):
+        self.db.in_transaction = True
+        if "commit_mirror_branch" in sql:
+            self.db.membership.update((repo_id, branch, sha) for repo_id, branch, sha, _ in rows)
+        else:
+            self.db.commits.update((row[1], row) for row in rows)
+
+
+def node(sha, day, parent=None):
+    return {"oid": sha, "message": f"commit {sha}", "committedDate": f"2025-{day}T10:00:00Z",
+            "parents": {"nodes": [{"oid": parent}] if parent else []},
+            "author": {"name": "dev", "email": "dev@example.com", "date": f"2025-{day}T10:00:00Z", "user": None},
+            "associatedPullRequests": {"nodes": []}}
+
+
+@pytest.fixture
+def mirror(github_service, monkeypatch):
+    """CommitMirror on a FakeMirrorDb, reading a branch history (newest first) kept in `mirror.history`."""
+    monkeypatch.setattr(commitMirror, "execute_values", lambda cur, sql, rows: cur.insert(sql, rows))
+    mirror = github_service.commit_mirror
+    mirror.db = FakeMirrorDb()
+    mirror.history = []
+
+    def github(method, url, kwargs):
+        assert not mirror.db.in_transaction, "GitHub was called inside a mirror transaction"
+        variables = kwargs["json"]["variables"]
+        since, until = (datetime.fromisoformat(variables[k]) if variables[k] else None for k in ("since", "until"))
+        nodes = [n for n in mirror.history
+                 if (since is None or commitMirror._parse_dt(n["committedDate"]) >= since)
+                 and (until is None or commitMirror._parse_dt(n["committedDate"]) <= until)]
+        start = int(variables["cursor"] or 0)
+        page = nodes[start:start + variables["first"]]
+        has_next = start + len(page) < len(nodes)
+        return make_response(200, {"data": {"repository": {"ref": {"target": {"history": {
+            "pageInfo": {"hasNextPage": has_next, "endCursor": str(start + len(page))}, "nodes": page}}}}}})
+
+    github_service.http_pool = FakeHttpPool(github)
+    mirror.sync_branch = lambda since: mirror.sync(mirror.db, "token", 42, "o", "r", "main", since)
+    return mirror
+
+
+def test_sync_stores_the_history_then_only_fetches_the_tail(mirror):
+    mirror.history = [node("c3", "09-10", "c2"), node("c2", "09-09", "c1"), node("c1", "09-08")]
+    mirror.sync_branch(SEP_1)
+    assert mirror.db.branch() == {"c1", "c2", "c3"}
+    assert mirror.db.state[(42, "main")] == ("c3", SEP_1)
+
+    mirror.history.insert(0, node("c4", "09-11", "c3"))
+    requests_before = len(mirror.service.http_pool.calls)
+    mirror.sync_branch(SEP_15)
+
+    assert len(mirror.service.http_pool.calls) - requests_before == 1
+    assert mirror.service.http_pool.calls[-1][2]["json"]["variables"]["first"] == CommitMirror.TAIL_PAGE_SIZE
+    assert mirror.db.branch() == {"c1", "c2", "c3", "c4"}
+    assert mirror.db.state[(42, "main")] == ("c4", SEP_1)
+    assert mirror.getStats()["tail_syncs"] == 1
+
+
+def test_force_push_rebuilds_the_branch_membership(mirror):
+    mirror.history = [node("c3", "09-10", "c2"), node("c2", "09-09", "c1"), node("c1", "09-08")]
+    mirror.sync_branch(SEP_1)
+
+    mirror.history = [node("x3", "09-12", "x2"), node("x2", "09-11", "c1"), node("c1", "09-08")]
+    mirror.sync_branch(SEP_1)
+
+    assert mirror.db.branch() == {"c1", "x2", "x3"}
+    # Commit rows stay: other branches may still contain them.
+    assert {"c2", "c3"} <= set(mirror.db.commits)
+    assert mirror.db.state[(42, "main")] == ("x3", SEP_1)
+    assert mirror.getStats()["rewrites"] == 1
+
+
+def test_reads_before_the_covered_window_backfill_and_widen_it(mirror):
+    mirror.history = [node("c2", "09-16", "c1"), node("c1", "09-15", "c0"), node("c0", "08-30")]
+    mirror.sync_branch(SEP_15)
+    assert mirror.db.branch() == {"c1", "c2"}
+
+    mirror.sync_branch(SEP_1 - timedelta(days=5))
+
+    assert mirror.db.branch() == {"c0", "c1", "c2"}
+    assert mirror.db.state[(42, "main")] == ("c2", SEP_1 - timedelta(days=5))
+    assert mirror.getStats()["backfills"] == 1
+
+
+def test_a_sync_racing_another_worker_refetches_from_the_new_state(mirror):
+    mirror.history = [node("c2", "09-09", "c1"), node("c1", "09-08")]
+
+    def other_worker_syncs_first():
+        mirror.db.on_lock = None
+        mirror.db.state[(42, "main")] = ("c1", SEP_1)
+        mirror.db.membership.add((42, "main", "c1"))
+    mirror.db.on_lock = other_worker_syncs_first
+
+    mirror.sync_branch(SEP_1)
+
+    assert mirror.getStats()["conflicts"] == 1
+    assert mirror.db.branch() == {"c1", "c2"}
+    assert mirror.db.state[(42, "main")] == ("c2", SEP_1)
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _history_handler(branch_commits):
+    """GraphQL history of one branch; `branch_commits` is a list of (oid, datetime) newest first, read at call time."""
+    def handler(method, url, kwargs):
+        variables = kwargs["json"]["variables"]
+        since = datetime.fromisoformat(variables["since"]) if variables["since"] else None
+        until = datetime.fromisoformat(variables["until"]) if variables["until"] else None
+        nodes = [{"oid": oid, "committedDate": date.isoformat().replace("+00:00", "Z")}
+                 for oid, date in branch_commits
+                 if (since is None or date >= since) and (until is None or date <= until)]
+        nodes = nodes[:variables["first"]]
+        return make_response(200, {"data": {"repository": {"ref": {"target": {"history": {
+            "pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": nodes}}}}}})
+    return handler
+
+
+def test_datetime_lookups_are_answered_from_the_timeline(github_service):
+    commits = [("c3", NOW - timedelta(days=1)), ("c2", NOW - timedelta(days=5)), ("c1", NOW - timedelta(days=10))]
+    github_service.http_pool = FakeHttpPool(_history_handler(commits))
+
+    assert github_service._get_sha_by_datetime("token", "o", "r", "main", NOW - timedelta(days=3)) == "c2"
+    assert github_service._get_sha_by_datetime("token", "o", "r", "main", NOW - timedelta(days=7)) == "c1"
+    assert github_service._get_first_commit_sha_after_datetime("token", "o", "r", "main", NOW - timedelta(days=7)) == "c3"
+    assert len(github_service.http_pool.calls) == 1
+
+
+def test_fast_forward_appends_and_force_push_rebuilds(github_service):
+    commits = [("c2", NOW - timedelta(days=5)), ("c1", NOW - timedelta(days=10))]
+    github_service.http_pool = FakeHttpPool(_history_handler(commits))
+    timeline = github_service.commit_timeline
+    timeline.ttl = 0
+
+    assert timeline.sha_until("token", "o", "r", "main", NOW) == "c2"
+
+    commits.insert(0, ("c3", NOW - timedelta(days=1)))
+    assert timeline.sha_until("token", "o", "r", "main", NOW) == "c3"
+    assert timeline.getStats()["rewrites"] == 0
+
+    commits[:] = [("x2", NOW - timedelta(days=2)), ("c1", NOW - timedelta(days=10))]
+    assert timeline.sha_until("token", "o", "r", "main", NOW - timedelta(days=3)) == "c1"
+    assert timeline.getStats()["rewrites"] == 1
+
+
+def test_push_webhook_fast_forwards_a_loaded_timeline(github_service):
+    commits = [("c1", NOW - timedelta(days=10))]
+    github_service.http_pool = FakeHttpPool(_history_handler(commits))
+    timeline = github_service.commit_timeline
+    timeline.sha_until("token", "o", "r", "main", NOW)
+
+    pushed = [{"id": "c2", "timestamp": (NOW - timedelta(hours=1)).isoformat()}]
+    assert timeline.apply_push("o", "r", "main", "c1", "c2", pushed, forced=False) == "applied"
+    assert timeline.sha_until("token", "o", "r", "main", NOW) == "c2"
+    assert len(github_service.http_pool.calls) == 1
+
+    assert timeline.apply_push("o", "r", "main", "c2", "x1", [], forced=True) == "invalidated"
+    assert timeline.apply_push("o", "r", "dev", "a", "b", pushed, forced=False) == "ignored"
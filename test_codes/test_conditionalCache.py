@@ -0,0 +1,44 @@
+from commitary_backend.services.githubService.conditionalCache import ConditionalRequestCache
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+REPO_PAYLOAD = {"id": 1, "name": "commitary_prj"}
+
+
+def test_304_serves_cached_body(github_service):
+    def handler(method, url, kwargs):
+        if kwargs["headers"].get("If-None-Match") == '"v1"':
+            return make_response(304, headers={"ETag": '"v1"'})
+        return make_response(200, REPO_PAYLOAD, headers={"ETag": '"v1"'})
+
+    github_service.http_pool = FakeHttpPool(handler)
+
+    first = github_service._make_request("GET", "/repositories/1", "token-a")
+    second = github_service._make_request("GET", "/repositories/1", "token-a")
+
+    assert first == second == REPO_PAYLOAD
+    assert github_service.http_pool.calls[1][2]["headers"]["If-None-Match"] == '"v1"'
+    stats = github_service.etag_cache.getStats()
+    assert (stats["misses"], stats["hits"], stats["not_modified"]) == (1, 1, 1)
+
+
+def test_entries_are_scoped_by_token_and_params(github_service):
+    github_service.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, [], headers={"ETag": '"x"'}))
+
+    github_service._make_request("GET", "/user/repos", "token-a", params={"page": 1})
+    github_service._make_request("GET", "/user/repos", "token-b", params={"page": 1})
+    github_service._make_request("GET", "/user/repos", "token-a", params={"page": 2})
+
+    assert all("If-None-Match" not in call[2]["headers"] for call in github_service.http_pool.calls)
+    assert github_service.etag_cache.getStats()["entries"] == 3
+
+
+def test_lru_eviction_by_bytes():
+    cache = ConditionalRequestCache(max_entries=10, max_bytes=40)
+    for i in range(3):
+        response = make_response(200, {"payload": "x" * 5}, headers={"ETag": f'"{i}"'})
+        cache.store(cache.make_key("t", f"/r/{i}", None), response, {"i": i})
+
+    assert cache.get(cache.make_key("t", "/r/0", None)) is None
+    assert cache.get(cache.make_key("t", "/r/2", None)).body == {"i": 2}
+    assert cache.getStats()["evictions"] >= 1
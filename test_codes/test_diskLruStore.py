@@ -0,0 +1,45 @@
+import os
+import time
+
+from commitary_backend.commitaryUtils.diskLruStore import DiskLRUStore
+from test_codes.githubFakes import FakeHttpPool
+from test_codes.test_snapshotEngine import snapshot_handler
+
+
+def test_roundtrip_and_sharding(tmp_path):
+    store = DiskLRUStore(str(tmp_path), max_bytes=1024 * 1024)
+    store.put("ab" + "0" * 38, b"hello")
+
+    assert store.get("AB" + "0" * 38) == b"hello"
+    assert os.path.exists(tmp_path / "ab" / ("0" * 38 + ".z"))
+    assert store.get("cd" + "0" * 38) is None
+    assert store.getStats()["hits"] == 1
+
+
+def test_lru_eviction_keeps_recently_read(tmp_path):
+    store = DiskLRUStore(str(tmp_path), max_bytes=10_000)
+    keys = [f"{i:02x}" + "f" * 38 for i in range(4)]
+    payload = os.urandom(3000)  # incompressible
+    for i, key in enumerate(keys[:3]):
+        store.put(key, payload)
+        os.utime(store._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+
+    store.get(keys[0])  # bump the oldest
+    store.put(keys[3], payload)
+
+    assert store.contains(keys[0])
+    assert not store.contains(keys[1])
+    assert store.getStats()["evictions"] >= 1
+
+
+def test_snapshot_downloads_only_unseen_blobs(github_service):
+    github_service.http_pool = FakeHttpPool(snapshot_handler)
+    github_service.getSnapshotBySHA(None, "token", "owner", "repo", "week1")
+    first_queries = github_service.snapshot_engine.getStats()["blob_queries"]
+
+    codebase = github_service.getSnapshotBySHA(None, "token", "owner", "repo", "week2")
+
+    stats = github_service.snapshot_engine.getStats()
+    assert stats["blob_queries"] == first_queries
+    assert stats["stored_blobs"] == 3
+    assert [f.code_content for f in codebase.files] == ["text of " + "1" * 40, "text of " + "2" * 40, "text of " + "3" * 40]
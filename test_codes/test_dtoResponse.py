@@ -0,0 +1,42 @@
+import json
+from datetime import datetime, timezone
+
+from flask import Flask
+
+from commitary_backend.commitaryUtils.dtoResponse import dto_response, ndjson_response
+from commitary_backend.dto.gitServiceDTO import BranchDTO, BranchListDTO
+
+
+def test_dto_response_is_the_json_dump_with_iso_datetimes(app_context):
+    branches = BranchListDTO(branchList=[BranchDTO(
+        repo_id=1, repo_name="r", owner_name="o", branch_name="main",
+        last_modification=datetime(2025, 9, 1, 10, 0, tzinfo=timezone.utc),
+    )])
+
+    response = dto_response(branches)
+
+    assert response.status_code == 200 and response.mimetype == "application/json"
+    body = json.loads(response.get_data())
+    assert body == branches.model_dump(mode="json")
+    assert body["branchList"][0]["last_modification"] == "2025-09-01T10:00:00Z"
+
+
+def test_ndjson_response_streams_header_items_and_a_final_error():
+    app = Flask(__name__)
+
+    def items():
+        yield BranchDTO(repo_id=1, repo_name="r", owner_name="o", branch_name="main",
+                        last_modification=datetime(2025, 9, 1, 10, 0, tzinfo=timezone.utc))
+        raise RuntimeError("upstream went away")
+
+    @app.route("/stream")
+    def stream():
+        return ndjson_response({"repo_id": 1}, items())
+
+    response = app.test_client().get("/stream")
+
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {"repo_id": 1}
+    assert lines[1]["name"] == "main"
+    assert lines[2] == {"error": "upstream went away"}
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.fakeGithubServer import FakeGithubServer, SyntheticRepo
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+
+
+@pytest.fixture
+def fake_github(app_context, tmp_path, monkeypatch):
+    """A GithubService talking HTTP to the offline fake instead of api.github.com."""
+    repo = SyntheticRepo(commits=40, branches=2, files=10)
+    server = FakeGithubServer([repo]).start()
+    monkeypatch.setenv("GITHUB_API_URL", server.url)
+    monkeypatch.setenv("GITHUB_BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare"))
+    yield GithubService(), server, repo
+    server.stop()
+
+
+def test_service_reads_branches_commits_and_snapshots_from_the_fake(fake_github):
+    service, server, repo = fake_github
+    main = repo.history(repo.branches["main"])
+
+    branches = service.getBranchesByRepoId("token", repo.repo_id).branchList
+    assert sorted(b.name for b in branches) == ["feature/000", "feature/001", "main"]
+
+    since, until = main[9]["date"], main[0]["date"]
+    commits = service.getCommitMsgs2(repo.repo_id, "token", "main", since.isoformat(), until.isoformat()).commitList
+    assert [c.sha for c in commits] == [c["sha"] for c in main[:10]]
+
+    snapshot = service.getSnapshotBySHA(None, "token", repo.owner, repo.name, main[0]["sha"])
+    assert len(snapshot.files) == 10
+
+    counts = server.counts()
+    assert counts["POST /graphql GetBranchRefs"] == 1
+    assert counts["GET /repositories/:id"] == 1
+
+
+def test_same_branch_diff_matches_the_synthetic_history(fake_github):
+    service, server, repo = fake_github
+    main = repo.history(repo.branches["main"])
+
+    diff = service.getDiffByIdTime3(user_token="token", repo_id=repo.repo_id, branch="main",
+                                    datetime_from=main[5]["date"] - timedelta(minutes=1), datetime_to=main[0]["date"])
+    assert diff.commit_before_sha == main[6]["sha"]
+    assert {f.filename for f in diff.files} == {f"src/module_{i % 10:04d}.py" for i in range(34, 40)}
+    assert server.total() > 0
+
+
+def test_streamed_diffs_match_the_materialized_ones(fake_github):
+    service, server, repo = fake_github
+    main = repo.history(repo.branches["main"])
+    window = dict(datetime_from=main[5]["date"] - timedelta(minutes=1), datetime_to=main[0]["date"])
+
+    expected = service.getDiffByIdTime3(user_token="token", repo_id=repo.repo_id, branch="main", **window)
+    header, files = service.iterDiffByIdTime3(user_token="token", repo_id=repo.repo_id, branch="main", **window)
+    assert header.files == [] and header.branch_before == "main" and header.repo_id == repo.repo_id
+    assert [f.filename for f in files] == [f.filename for f in expected.files]
+
+    header, files = service.iterDiffByIdTime2(user_token="token", repo_id=repo.repo_id, branch_from="feature/001",
+                                              branch_to="main", **window)
+    assert (header.branch_before, header.branch_after) == ("feature/001", "main")
+    streamed = list(files)
+    assert streamed and streamed == service.getDiffByIdTime2(user_token="token", repo_id=repo.repo_id, branch_from="feature/001",
+                                                   branch_to="main", **window).files
+
+
+def test_diffs_past_the_compare_file_cap_come_from_the_trees(app_context, tmp_path, monkeypatch):
+    repo = SyntheticRepo(commits=400, branches=0, files=400)
+    server = FakeGithubServer([repo]).start()
+    monkeypatch.setenv("GITHUB_API_URL", server.url)
+    monkeypatch.setenv("GITHUB_BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare"))
+    try:
+        main = repo.history(repo.branches["main"])
+        base, head = main[-1]["sha"], main[0]["sha"]
+        diff = GithubService().getDiffBySHA(None, "token", repo.owner, repo.name, base, head)
+    finally:
+        server.stop()
+
+    expected = repo.tree_diff(base, head)
+    assert len(expected) == 399
+    assert sorted((f.filename, f.status) for f in diff.files) == [(f["filename"], f["status"]) for f in expected]
+    # Files past the cap: patches computed from the blobs at both sides.
+    listed = {f["filename"] for f in expected[:300]}
+    recovered = [f for f in diff.files if f.filename not in listed]
+    assert len(recovered) == 99
+    assert all((f.additions, f.deletions) == (1, 1) and "\n-VALUE = " in f.patch for f in recovered)
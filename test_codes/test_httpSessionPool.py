@@ -0,0 +1,85 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from urllib3.util.retry import Retry
+
+from commitary_backend.services.githubService.httpSessionPool import GithubSessionPool
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    failures_left = 0
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        if _KeepAliveHandler.failures_left > 0:
+            _KeepAliveHandler.failures_left -= 1
+            self.send_response(503)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(local_server):
+    pool = GithubSessionPool(pool_size=2, pool_hosts=1)
+    for _ in range(5):
+        assert pool.request("GET", f"{local_server}/repos").json() == {"ok": True}
+
+    stats = pool.getStats()
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    pool.close()
+
+
+def test_threads_share_one_adapter(local_server):
+    pool = GithubSessionPool(pool_size=4, pool_hosts=1)
+    sessions = []
+
+    def worker():
+        session = pool.session()
+        sessions.append(session)
+        session.get(f"{local_server}/user")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(s) for s in sessions}) == 4
+    assert all(s.get_adapter(local_server) is pool.adapter for s in sessions)
+    assert pool.getStats()["requests"] == 4
+    pool.close()
+
+
+def test_a_retried_request_is_counted_once(local_server, monkeypatch):
+    monkeypatch.setattr(_KeepAliveHandler, "failures_left", 1)
+    pool = GithubSessionPool(pool_size=1, pool_hosts=1)
+    pool.adapter.max_retries = Retry(total=1, status_forcelist=[503], backoff_factor=0)
+
+    assert pool.request("GET", f"{local_server}/repos").json() == {"ok": True}
+    assert _KeepAliveHandler.failures_left == 0
+
+    stats = pool.getStats()
+    assert stats["requests"] == 1
+    assert stats["new_connections"] == 1
+    pool.close()
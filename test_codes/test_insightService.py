@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+pytest.importorskip("langchain_postgres")
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from commitary_backend.dto.gitServiceDTO import CodeFileDTO
+from commitary_backend.services.insightService.InsightServiceObject import InsightService
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.rows = {}
+
+    def add_documents(self, documents):
+        ids = [str(len(self.rows) + i) for i in range(len(documents))]
+        self.rows.update(zip(ids, documents))
+        return ids
+
+    def delete(self, ids=None):
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                connection.statements.append((sql, params))
+        return Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+
+def code_file(index: int) -> CodeFileDTO:
+    return CodeFileDTO(filename=f"module_{index}.py", path=f"src/module_{index}.py", code_content=f"value_{index} = {index}\n" * 20,
+                       last_modified_at=datetime(2025, 9, 15, tzinfo=timezone.utc))
+
+
+@pytest.fixture
+def insight_service(app_context):
+    # No OpenAI or PGVector connection: only the chunking pipeline and a fake store.
+    service = InsightService.__new__(InsightService)
+    service.text_splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0, length_function=len)
+    service.vector_store = FakeVectorStore()
+    return service
+
+
+def test_snapshot_stream_failure_discards_the_written_chunks(insight_service):
+    def snapshot():
+        for index in range(10):
+            yield code_file(index)
+        raise TimeoutError("deadline exceeded")
+
+    conn = RecordingConnection()
+    with pytest.raises(TimeoutError):
+        insight_service._embed_and_store_codebase("o/r", snapshot(), 1, "main", 42, "2025-09-15", conn=conn)
+    assert insight_service.vector_store.rows == {}
+    assert conn.statements == []
+
+
+def test_complete_snapshot_is_flagged_after_the_last_batch(insight_service):
+    conn = RecordingConnection()
+    stored = insight_service._embed_and_store_codebase("o/r", (code_file(i) for i in range(10)), 1, "main", 42, "2025-09-15", conn=conn)
+
+    rows = insight_service.vector_store.rows
+    assert stored == len(rows) > 16
+    assert all(doc.metadata["snapshot_complete"] is False for doc in rows.values())
+    [(sql, params)] = conn.statements
+    assert "snapshot_complete" in sql and sorted(params[0]) == sorted(rows)
+    assert conn.commits == 1
@@ -0,0 +1,57 @@
+import decimal
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from flask import Flask, jsonify, request, session
+
+from commitary_backend.commitaryUtils import jsonCodec
+from commitary_backend.commitaryUtils.jsonCodec import FastJSONProvider
+
+
+DOCUMENT = {
+    "b": [1, 2.5, None, True, "한글"],
+    "a": {
+        "utc": datetime(2025, 9, 1, 10, 0, tzinfo=timezone.utc),
+        "kst": datetime(2025, 9, 1, 19, 0, 0, 123000, tzinfo=timezone(timedelta(hours=9))),
+        "naive": datetime(2025, 9, 1, 10, 0),
+        "day": date(2025, 9, 1),
+        "price": decimal.Decimal("1.50"),
+    },
+}
+
+
+@pytest.mark.parametrize("codec", ["orjson", "stdlib"])
+def test_both_codecs_produce_the_same_document(monkeypatch, codec):
+    monkeypatch.setattr(jsonCodec, "CODEC", codec)
+
+    encoded = jsonCodec.dumps(DOCUMENT, sort_keys=True)
+
+    assert encoded == (
+        '{"a":{"day":"2025-09-01","kst":"2025-09-01T19:00:00.123000+09:00","naive":"2025-09-01T10:00:00",'
+        '"price":"1.50","utc":"2025-09-01T10:00:00Z"},"b":[1,2.5,null,true,"한글"]}'
+    ).encode("utf-8")
+    assert jsonCodec.loads(encoded)["b"] == [1, 2.5, None, True, "한글"]
+    with pytest.raises(ValueError):
+        jsonCodec.loads(b"{not json")
+
+
+def test_flask_provider_serves_jsonify_get_json_and_sessions():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.json = FastJSONProvider(app)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        session["seen"] = request.get_json()["x"]
+        return jsonify(at=DOCUMENT["a"]["utc"], x=session["seen"])
+
+    @app.route("/seen")
+    def seen():
+        return jsonify(seen=session.get("seen"))
+
+    client = app.test_client()
+    response = client.post("/echo", json={"x": 1})
+
+    assert response.mimetype == "application/json"
+    assert response.get_data() == b'{"at":"2025-09-01T10:00:00Z","x":1}\n'
+    assert client.get("/seen").get_json() == {"seen": 1}
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import subprocess
+
+import httpx
+import pytest
+
+from commitary_backend.services.githubService.AsyncGithubServiceObject import AsyncGithubService
+from commitary_backend.services.githubService.GithubServiceObject import GithubService
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+REPO_JSON = {
+    "id": 42, "node_id": "R_42", "name": "r",
+    "owner": {"id": 7, "login": "o"},
+    "html_url": "https://github.com/o/r", "url": "https://api.github.com/repos/o/r",
+    "full_name": "o/r", "description": None,
+}
+
+GIT_ENV = dict(os.environ, GIT_AUTHOR_NAME="dev", GIT_AUTHOR_EMAIL="dev@example.com",
+               GIT_COMMITTER_NAME="dev", GIT_COMMITTER_EMAIL="dev@example.com")
+
+
+def _git(cwd, *args, date=None):
+    env = dict(GIT_ENV, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date) if date else GIT_ENV
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(work, files: dict, message: str, date: str) -> str:
+    for path, content in files.items():
+        full = os.path.join(work, path)
+        if content is None:
+            os.remove(full)
+            continue
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+    _git(work, "add", "-A")
+    _git(work, "commit", "-q", "-m", message, date=date)
+    _git(work, "push", "-q", "origin", "main")
+    return _git(work, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def local_repo(app_context, tmp_path, monkeypatch):
+    """A GitHub-less repository: an "upstream" bare repo plus a working copy pushing to it."""
+    upstream = tmp_path / "upstream" / "o" / "r.git"
+    subprocess.run(["git", "init", "--bare", "-q", "-b", "main", str(upstream)], check=True)
+    work = tmp_path / "work"
+    subprocess.run(["git", "clone", "-q", str(upstream), str(work)], check=True, capture_output=True)
+    _git(work, "checkout", "-q", "-b", "main")
+
+    monkeypatch.setenv("GITHUB_LOCAL_GIT_REPOS", "o/r")
+    monkeypatch.setenv("GITHUB_LOCAL_GIT_DIR", str(tmp_path / "clones"))
+    monkeypatch.setenv("GITHUB_LOCAL_GIT_REMOTE", str(tmp_path / "upstream" / "{owner}" / "{repo}.git"))
+    monkeypatch.setenv("GITHUB_LOCAL_GIT_FETCH_INTERVAL", "0")
+    monkeypatch.setenv("GITHUB_BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("GITHUB_COMPARE_CACHE_DIR", str(tmp_path / "compare"))
+    service = GithubService()
+    service.http_pool = FakeHttpPool(lambda m, u, k: make_response(200, REPO_JSON))
+    return service, work
+
+
+def test_commit_list_and_snapshot_come_from_the_clone(local_repo):
+    service, work = local_repo
+    _commit(work, {"src/app.py": "print('a')\n", "logo.png": "binary"}, "first", "2025-09-10T10:00:00+00:00")
+    second = _commit(work, {"src/app.py": "print('b')\n"}, "second", "2025-09-12T10:00:00+00:00")
+
+    commits = service.getCommitMsgs(42, "token", "main", "2025-09-11T00:00:00Z", "2025-09-13T00:00:00Z").commitList
+    assert [(c.sha, c.commit_msg, c.author_name) for c in commits] == [(second, "second", "dev")]
+
+    snapshot = service.getSnapshotBySHA(None, "token", "o", "r", second)
+    assert [(f.path, f.code_content) for f in snapshot.files] == [("src/app.py", "print('b')\n")]
+    # Only the repository metadata call went to GitHub.
+    assert len(service.http_pool.calls) == 1
+
+
+def test_diff_matches_compare_shape_and_fetches_new_commits(local_repo):
+    service, work = local_repo
+    base = _commit(work, {"a.txt": "one\ntwo\n", "old.txt": "keep me\n" * 5}, "base", "2025-09-10T10:00:00+00:00")
+    service.getSnapshotBySHA(None, "token", "o", "r", base)
+
+    _git(work, "mv", "old.txt", "new.txt")
+    head = _commit(work, {"a.txt": "one\nthree\n", "b.txt": "new\n"}, "change", "2025-09-11T10:00:00+00:00")
+
+    diff = service.getDiffBySHA(None, "token", "o", "r", base, head)
+    files = {f.filename: f for f in diff.files}
+
+    assert diff.commit_before_sha == base
+    assert files["a.txt"].status == "modified"
+    assert (files["a.txt"].additions, files["a.txt"].deletions, files["a.txt"].changes) == (1, 1, 2)
+    assert files["a.txt"].patch.startswith("@@") and "+three" in files["a.txt"].patch
+    assert files["b.txt"].status == "added"
+    assert files["new.txt"].status == "renamed"
+    assert service.local_git.getStats()["fetches"] >= 1
+    assert service.http_pool.calls == []
+
+
+def test_missing_objects_mid_snapshot_continue_from_github(local_repo, monkeypatch):
+    service, work = local_repo
+    head = _commit(work, {"a.py": "a = 1\n", "b.py": "b = 2\n"}, "files", "2025-09-10T10:00:00+00:00")
+    service.getSnapshotBySHA(None, "token", "o", "r", head)  # creates the clone
+    git_dir = service.local_git._path("o", "r")
+    blob = _git(work, "rev-parse", f"{head}:b.py")
+    select_blobs = service.local_git._select_blobs
+
+    def lose_blob_after_listing(listing):
+        # The object disappears between ls-tree and cat-file.
+        selected = select_blobs(listing)
+        os.remove(os.path.join(git_dir, "objects", blob[:2], blob[2:]))
+        return selected
+    monkeypatch.setattr(service.local_git, "_select_blobs", lose_blob_after_listing)
+
+    def github(method, url, kwargs):
+        if "/git/trees/" in url:
+            return make_response(200, {"truncated": False, "tree": [
+                {"path": "a.py", "type": "blob", "sha": _git(work, "rev-parse", f"{head}:a.py"), "size": 6},
+                {"path": "b.py", "type": "blob", "sha": blob, "size": 6}]})
+        variables = kwargs["json"]["variables"]
+        texts = {blob: "b = 2\n"}
+        return make_response(200, {"data": {"repository": {
+            f"b{i}": {"isBinary": False, "text": texts.get(variables[f"o{i}"], "from github\n")} for i in range(len(variables) - 2)}}})
+
+    service.http_pool = FakeHttpPool(github)
+    snapshot = service.getSnapshotBySHA(None, "token", "o", "r", head)
+    assert [(f.path, f.code_content) for f in snapshot.files] == [("a.py", "a = 1\n"), ("b.py", "b = 2\n")]
+    assert service.local_git.getStats()["errors"] == 1
+
+
+def test_short_git_diff_continues_from_github(local_repo, monkeypatch):
+    service, work = local_repo
+    base = _commit(work, {"a.txt": "one\n", "b.txt": "two\n"}, "base", "2025-09-10T10:00:00+00:00")
+    head = _commit(work, {"a.txt": "uno\n", "b.txt": "dos\n"}, "change", "2025-09-11T10:00:00+00:00")
+    real_blocks = service.local_git._iter_diff_blocks
+    monkeypatch.setattr(service.local_git, "_iter_diff_blocks", lambda stream: iter(list(real_blocks(stream))[:1]))
+    service.http_pool = FakeHttpPool(lambda method, url, kwargs: make_response(200, {
+        "base_commit": {"sha": base}, "merge_base_commit": {"sha": base}, "files": [
+            {"filename": name, "status": "modified", "additions": 1, "deletions": 1, "changes": 2, "patch": "@@ github @@"}
+            for name in ("a.txt", "b.txt")]}))
+
+    diff = service.getDiffBySHA(None, "token", "o", "r", base, head)
+    assert [(f.filename, f.patch.startswith("@@ -1")) for f in diff.files] == [("a.txt", True), ("b.txt", False)]
+    assert service.local_git.getStats()["errors"] == 1
+
+
+def test_async_client_reads_the_clone_like_the_sync_service(local_repo):
+    service, work = local_repo
+    base = _commit(work, {"a.txt": "one\n"}, "base", "2025-09-10T10:00:00+00:00")
+    head = _commit(work, {"a.txt": "two\n"}, "change", "2025-09-11T10:00:00+00:00")
+    sync_commits = service.getCommitMsgs2(42, "token", "main", "2025-09-09T00:00:00Z", "2025-09-12T00:00:00Z")
+    sync_diff = service.getDiffBySHA(None, "token", "o", "r", base, head)
+    service.compare_cache.store = None
+
+    def no_github(request):
+        raise AssertionError(f"unexpected request {request.url}")
+    async_service = AsyncGithubService(service, transport=httpx.MockTransport(no_github))
+
+    async def read():
+        commits = await async_service.getCommitMsgs2(42, "token", "main", "2025-09-09T00:00:00Z", "2025-09-12T00:00:00Z")
+        diff = await async_service.getDiffBySHA(None, "token", "o", "r", base, head)
+        snapshot = await async_service.getSnapshotBySHA(None, "token", "o", "r", head)
+        return commits, diff, snapshot
+
+    commits, diff, snapshot = asyncio.run(read())
+    assert commits == sync_commits
+    assert diff == sync_diff
+    assert [(f.path, f.code_content) for f in snapshot.files] == [("a.txt", "two\n")]
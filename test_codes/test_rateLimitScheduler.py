@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from commitary_backend.services.githubService.rateLimitScheduler import RateLimitScheduler, background_priority
+from commitary_backend.services.githubService.resilience import GithubUnavailableError, operation_deadline
+from test_codes.githubFakes import make_response
+
+
+def quota_headers(remaining, limit=5000, reset_in=3600, resource="core"):
+    return {"X-RateLimit-Remaining": str(remaining), "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Reset": str(int(time.time() + reset_in)), "X-RateLimit-Resource": resource}
+
+
+def test_quota_is_tracked_per_token_and_resource(app_context):
+    scheduler = RateLimitScheduler()
+    scheduler.record("token-a", make_response(200, {}, headers=quota_headers(4321)))
+    scheduler.record("token-a", make_response(200, {}, headers=quota_headers(4990, resource="graphql")))
+
+    quota = scheduler.getQuota("token-a")
+    assert quota["resources"]["core"]["remaining"] == 4321
+    assert quota["resources"]["graphql"]["limit"] == 5000
+    assert scheduler.getQuota("token-b")["resources"] == {}
+
+
+def test_retry_after_blocks_the_token(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_MAX_WAIT", "0.2")
+    scheduler = RateLimitScheduler()
+    scheduler.record("token", make_response(429, {}, headers={"Retry-After": "0.1"}))
+    assert scheduler.getQuota("token")["blocked_for"] > 0
+
+    started = time.monotonic()
+    with scheduler.slot("token"):
+        pass
+    assert time.monotonic() - started >= 0.09
+    assert scheduler.getStats()["waits"] == 1
+
+
+def test_background_calls_keep_the_reserve_for_interactive_calls(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_MAX_BACKGROUND_WAIT", "0.2")
+    scheduler = RateLimitScheduler()
+    scheduler.record("token", make_response(200, {}, headers=quota_headers(100, reset_in=60)))
+
+    started = time.monotonic()
+    with scheduler.slot("token"):
+        pass
+    interactive_wait = time.monotonic() - started
+
+    started = time.monotonic()
+    with background_priority():
+        with scheduler.slot("token"):
+            pass
+    background_wait = time.monotonic() - started
+
+    assert interactive_wait < 0.05
+    assert background_wait >= 0.19
+
+
+def test_interactive_calls_are_admitted_before_waiting_background_calls(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_CONCURRENCY", "1")
+    scheduler = RateLimitScheduler()
+    order = []
+    app = app_context
+
+    def call(name, background):
+        with app.app_context():
+            if background:
+                with background_priority(), scheduler.slot("token"):
+                    order.append(name)
+            else:
+                with scheduler.slot("token"):
+                    order.append(name)
+
+    with scheduler.slot("token"):
+        background = threading.Thread(target=call, args=("background", True))
+        background.start()
+        while scheduler.getQuota("token")["background_waiting"] == 0:
+            time.sleep(0.005)
+        interactive = threading.Thread(target=call, args=("interactive", False))
+        interactive.start()
+        while scheduler.getQuota("token")["interactive_waiting"] == 0:
+            time.sleep(0.005)
+    background.join(5)
+    interactive.join(5)
+
+    assert order == ["interactive", "background"]
+
+
+def test_waits_end_at_the_operation_deadline(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_MAX_BACKGROUND_WAIT", "900")
+    scheduler = RateLimitScheduler()
+    scheduler.record("token", make_response(429, {}, headers={"Retry-After": "600"}))
+
+    started = time.monotonic()
+    with operation_deadline(0.1), background_priority():
+        with pytest.raises(GithubUnavailableError) as raised:
+            with scheduler.slot("token"):
+                pass
+    assert raised.value.response.status_code == 504
+    assert time.monotonic() - started < 1
+    assert scheduler.getQuota("token")["background_waiting"] == 0
+
+
+def test_async_slots_share_the_token_state(app_context):
+    scheduler = RateLimitScheduler()
+    scheduler.record("token", make_response(429, {}, headers={"Retry-After": "0.1"}))
+
+    async def call():
+        async with scheduler.async_slot("token"):
+            return scheduler.getQuota("token")["in_flight"]
+
+    started = time.monotonic()
+    assert asyncio.run(call()) == 1
+    assert time.monotonic() - started >= 0.09
+    assert scheduler.getQuota("token")["in_flight"] == 0 and scheduler.getStats()["waits"] == 1
+
+
+def test_async_waiters_are_woken_when_a_slot_is_released(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RATE_LIMIT_CONCURRENCY", "2")
+    scheduler = RateLimitScheduler()
+
+    async def call():
+        async with scheduler.async_slot("token"):
+            await asyncio.sleep(0.02)
+
+    async def fan_out():
+        await asyncio.gather(*(call() for _ in range(16)))
+
+    started = time.monotonic()
+    asyncio.run(fan_out())
+    # 8 rounds of 20 ms. Polling for a free slot would take about a second per round.
+    assert time.monotonic() - started < 0.5
+    assert scheduler.getQuota("token")["in_flight"] == 0
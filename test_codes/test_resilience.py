@@ -0,0 +1,113 @@
+import pytest
+import requests
+
+from commitary_backend.services.githubService.resilience import (
+    GithubUnavailableError, ResilientCaller, endpoint_key, operation_deadline,
+)
+from test_codes.githubFakes import make_response
+
+
+@pytest.fixture
+def caller(app_context, monkeypatch):
+    monkeypatch.setenv("GITHUB_RETRY_BASE_DELAY", "0.001")
+    monkeypatch.setenv("GITHUB_CIRCUIT_FAILURES", "3")
+    monkeypatch.setenv("GITHUB_CIRCUIT_RESET_SECONDS", "60")
+    return ResilientCaller()
+
+
+def sequence(*responses):
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        response = responses[len(calls) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return send, calls
+
+
+def test_endpoint_key_groups_repository_urls():
+    assert endpoint_key("GET", "https://api.github.com/repos/o/r/compare/a...b") == "GET /repos/:owner/:repo/compare"
+    assert endpoint_key("GET", "https://api.github.com/repositories/42") == "GET /repositories/:id"
+    assert endpoint_key("POST", "https://api.github.com/graphql") == "POST /graphql"
+
+
+def test_server_errors_and_connection_errors_are_retried(caller):
+    send, calls = sequence(requests.exceptions.ConnectionError("reset"), make_response(502), make_response(200, {}))
+    assert caller.call("GET", "https://api.github.com/user", send, timeout=15).status_code == 200
+    assert len(calls) == 3 and caller.getStats()["retries"] == 2
+
+
+def test_retry_after_is_honoured_for_secondary_limits(caller, monkeypatch):
+    slept = []
+    monkeypatch.setattr("commitary_backend.services.githubService.resilience.time.sleep", slept.append)
+    send, calls = sequence(make_response(403, {"message": "You have exceeded a secondary rate limit"}, headers={"Retry-After": "7"}),
+                           make_response(200, {}))
+    caller.call("GET", "https://api.github.com/user", send, timeout=15)
+    assert slept == [7.0]
+
+
+def test_plain_client_errors_are_not_retried(caller):
+    send, calls = sequence(make_response(404), make_response(200))
+    assert caller.call("GET", "https://api.github.com/repositories/1", send, timeout=15).status_code == 404
+    assert len(calls) == 1
+
+
+def test_circuit_opens_after_consecutive_failures_and_fails_fast(caller, monkeypatch):
+    monkeypatch.setenv("GITHUB_RETRY_ATTEMPTS", "1")
+    caller = ResilientCaller()
+    url = "https://api.github.com/repos/o/r/commits"
+    for _ in range(3):
+        send, _ = sequence(make_response(503))
+        caller.call("GET", url, send, timeout=15)
+
+    send, calls = sequence(make_response(200))
+    with pytest.raises(GithubUnavailableError) as raised:
+        caller.call("GET", url, send, timeout=15)
+    assert raised.value.response.status_code == 503 and calls == []
+    # Other endpoints are not affected.
+    send, _ = sequence(make_response(200))
+    assert caller.call("GET", "https://api.github.com/user", send, timeout=15).status_code == 200
+    assert caller.getStats()["circuit_breaker"]["circuits"]["GET /repos/:owner/:repo/commits"]["state"] == "open"
+
+
+def test_operation_deadline_caps_timeouts_and_backoff(caller):
+    with operation_deadline(5):
+        send, calls = sequence(make_response(200))
+        caller.call("GET", "https://api.github.com/user", send, timeout=15)
+        assert calls[0] <= 5
+
+        # A Retry-After longer than the remaining budget returns the response instead of sleeping.
+        send, calls = sequence(make_response(429, headers={"Retry-After": "30"}), make_response(200))
+        assert caller.call("GET", "https://api.github.com/user", send, timeout=15).status_code == 429
+
+    with operation_deadline(0):
+        with pytest.raises(GithubUnavailableError) as raised:
+            caller.call("GET", "https://api.github.com/user", sequence(make_response(200))[0], timeout=15)
+    assert raised.value.response.status_code == 504
+
+
+def test_unexpected_probe_errors_do_not_leave_the_circuit_half_open(caller, monkeypatch):
+    monkeypatch.setenv("GITHUB_RETRY_ATTEMPTS", "1")
+    monkeypatch.setenv("GITHUB_CIRCUIT_FAILURES", "1")
+    monkeypatch.setenv("GITHUB_CIRCUIT_RESET_SECONDS", "0")
+    caller = ResilientCaller()
+    url = "https://api.github.com/repos/o/r/tarball/main"
+    with pytest.raises(requests.exceptions.ConnectionError):
+        caller.call("GET", url, sequence(requests.exceptions.ConnectionError("reset"))[0], timeout=15)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        caller.call("GET", url, sequence(requests.exceptions.ChunkedEncodingError("cut"))[0], timeout=15)
+
+    send, calls = sequence(make_response(200))
+    assert caller.call("GET", url, send, timeout=15).status_code == 200
+    assert caller.getStats()["circuit_breaker"]["circuits"] == {}
+
+
+def test_retried_responses_are_closed(caller):
+    retried = make_response(502)
+    closed = []
+    retried.close = lambda: closed.append(True)
+    send, _ = sequence(retried, make_response(200, {}))
+    caller.call("GET", "https://api.github.com/user", send, timeout=15)
+    assert closed == [True]
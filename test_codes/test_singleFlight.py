@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+
+from commitary_backend.commitaryUtils.singleFlight import SingleFlight
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def work():
+        executions.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.getStats()["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    stats = flight.getStats()
+    assert stats["executions"] == 1 and stats["in_flight"] == 0 and stats["coalesce_rate"] == 0.75
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("upstream")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: flight.getStats()["coalesced"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 2
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_coroutines_and_threads_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    async def work():
+        executions.append(1)
+        await asyncio.to_thread(release.wait, 5)
+        return {"value": 42}
+
+    thread_results = []
+    thread = threading.Thread(target=lambda: _wait_for(lambda: executions) or thread_results.append(flight.do("key", lambda: "sync")))
+
+    async def main():
+        thread.start()
+        waiter = asyncio.ensure_future(flight.do_async("key", work))
+        leader = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.to_thread(_wait_for, lambda: flight.getStats()["coalesced"] == 2)
+        release.set()
+        return await asyncio.gather(waiter, leader)
+
+    results = asyncio.run(main())
+    thread.join()
+
+    assert len(executions) == 1
+    assert results[0] is results[1] is thread_results[0]
+    assert flight.getStats()["in_flight"] == 0
@@ -0,0 +1,97 @@
+from test_codes.githubFakes import FakeHttpPool, make_response
+
+
+TREE = {
+    "truncated": False,
+    "tree": [
+        {"path": "README.md", "type": "blob", "sha": "1" * 40, "size": 10},
+        {"path": "src", "type": "tree", "sha": "t-src"},
+        {"path": "src/app.py", "type": "blob", "sha": "2" * 40, "size": 20},
+        {"path": "src/pkg/util.py", "type": "blob", "sha": "3" * 40, "size": 30},
+        {"path": "docs/logo.png", "type": "blob", "sha": "4" * 40, "size": 40},
+        {"path": "data/huge.csv", "type": "blob", "sha": "5" * 40, "size": 10_000_000},
+    ],
+}
+
+
+def snapshot_handler(method, url, kwargs):
+    if "/git/trees/" in url:
+        assert kwargs["params"] == {"recursive": "1"}
+        return make_response(200, TREE)
+    variables = kwargs["json"]["variables"]
+    repository = {}
+    for name, oid in variables.items():
+        if name[1:].isdigit():
+            repository[f"b{name[1:]}"] = {"isBinary": False, "text": f"text of {oid}"}
+    return make_response(200, {"data": {"repository": repository}})
+
+
+def test_snapshot_includes_nested_files_and_filters_before_download(github_service):
+    github_service.http_pool = FakeHttpPool(snapshot_handler)
+    engine = github_service.snapshot_engine
+    engine.batch_size = 2
+    engine.parallelism = 2
+
+    codebase = github_service.getSnapshotBySHA(None, "token", "owner", "repo", "abc123")
+
+    assert [f.path for f in codebase.files] == ["README.md", "src/app.py", "src/pkg/util.py"]
+    assert codebase.files[2].filename == "util.py"
+    assert codebase.files[2].code_content == "text of " + "3" * 40
+
+    requested_oids = [v for _, _, kw in github_service.http_pool.calls if kw.get("json")
+                      for k, v in kw["json"]["variables"].items() if k[1:].isdigit()]
+    assert sorted(requested_oids) == ["1" * 40, "2" * 40, "3" * 40]
+    stats = engine.getStats()
+    assert stats["blob_queries"] == 2
+    assert stats["skipped"] == 2
+
+
+def _tarball(files: dict) -> bytes:
+    import io
+    import tarfile
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, content in files.items():
+            info = tarfile.TarInfo(f"owner-repo-abc123/{path}")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def test_archive_mode_streams_and_filters(github_service):
+    import io
+
+    archive_bytes = _tarball({
+        "main.py": b"print('hi')",
+        "pkg/mod.py": b"x = 1",
+        "img/logo.png": b"\x89PNG",
+        "blob.dat": b"\x00\x01binary",
+    })
+
+    def handler(method, url, kwargs):
+        assert url.endswith("/repos/owner/repo/tarball/abc123")
+        assert kwargs["stream"] is True
+        response = make_response(200)
+        response.raw = io.BytesIO(archive_bytes)
+        return response
+
+    github_service.http_pool = FakeHttpPool(handler)
+    files = github_service.iterSnapshotBySHA(None, "token", "owner", "repo", "abc123", mode="archive")
+
+    first = next(files)
+    assert first.path == "main.py" and first.code_content == "print('hi')"
+    assert [f.path for f in files] == ["pkg/mod.py"]
+    assert github_service.snapshot_engine.getStats()["archive_snapshots"] == 1
+
+
+def test_auto_mode_switches_to_archive_for_large_trees(github_service):
+    engine = github_service.snapshot_engine
+    engine.archive_min_files = 2
+    assert engine.prefers_archive([{"size": 1}] * 3, truncated=False)
+    assert not engine.prefers_archive([{"size": 1}] * 2, truncated=False)
+    assert engine.prefers_archive([], truncated=True)
+
+    engine.archive_repos = {"owner/bigrepo"}
+    assert engine.mode_for("Owner", "BigRepo") == "archive"
+    assert engine.mode_for("owner", "small") == "auto"
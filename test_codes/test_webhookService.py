@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+
+from commitary_backend.services.githubService.GithubServiceObject import gb_service
+from commitary_backend.services.webhookService.WebhookServiceObject import WebhookService
+
+
+def _signature(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def test_signature_is_checked_against_the_raw_body(monkeypatch):
+    monkeypatch.setenv("GITHUB_WEBHOOK_SECRET", "s3cret")
+    webhooks = WebhookService()
+    body = b'{"zen": "Keep it logically awesome."}'
+
+    assert webhooks.verify(body, _signature("s3cret", body))
+    assert not webhooks.verify(body + b" ", _signature("s3cret", body))
+    assert not webhooks.verify(body, _signature("other", body))
+    assert not webhooks.verify(body, None)
+    assert webhooks.getStats()["rejected"] == 3
+
+
+def test_deliveries_are_processed_once_in_the_background(app_context):
+    webhooks = WebhookService()
+    gb_service.merged_pr_cache.set(("fp", "o", "r", "feature", "main"), [])
+    payload = {"action": "closed", "pull_request": {"merged": True},
+               "repository": {"id": 42, "name": "r", "owner": {"login": "o"}}}
+
+    assert webhooks.enqueue("pull_request", "delivery-1", payload) == "queued"
+    assert webhooks.enqueue("pull_request", "delivery-1", payload) == "duplicate"
+    assert webhooks.enqueue("issues", "delivery-2", payload) == "ignored"
+    assert webhooks.drain(timeout=5)
+
+    assert webhooks.getStats()["processed"] == 1
+    assert gb_service.merged_pr_cache.get(("fp", "o", "r", "feature", "main")) is gb_service.merged_pr_cache.MISSING
+
+
+def test_failed_deliveries_are_accepted_again(app_context, monkeypatch):
+    webhooks = WebhookService()
+    payload = {"repository": {"id": 42, "name": "r", "owner": {"login": "o"}}}
+
+    def fail(event, payload):
+        raise RuntimeError("github is down")
+    monkeypatch.setattr(webhooks, "process", fail)
+    assert webhooks.enqueue("push", "delivery-1", payload) == "queued"
+    assert webhooks.drain(timeout=5)
+    assert webhooks.getStats()["failed"] == 1
+
+    monkeypatch.setattr(webhooks, "process", lambda event, payload: None)
+    assert webhooks.enqueue("push", "delivery-1", payload) == "queued"
+    assert webhooks.drain(timeout=5)
+    assert webhooks.getStats()["processed"] == 1